@@ -0,0 +1,233 @@
+"""End-to-end benchmark of the main request paths against the AWS fakes.
+
+    python benchmarks/run.py --requests 50 --bedrock-latency 0.3 -o results.json
+    python benchmarks/run.py --scenarios search_documents,ai_search --baseline results.json
+
+Reports, per scenario: p50/p95/p99 latency, throughput, remote calls per
+request (by service and operation) and peak RSS, as JSON. With --baseline,
+any scenario whose remote calls per request grew is listed and the exit
+status is 1, so call fan-out regressions show up in review.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+STUBBED_SERVICES = ['bedrock-runtime', 's3', 'dynamodb']
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def stub_clients():
+    from document_app import aws_clients
+    return {service: aws_clients.get_client(service) for service in STUBBED_SERVICES}
+
+
+def call_snapshot(clients):
+    return Counter({f"{service}.{operation}": count
+                    for service, client in clients.items() for operation, count in client.calls.items()})
+
+
+def wait_for_background_work(timeout=120):
+    """upload_files hands ingestion to threads; let them finish so their
+    remote calls are attributed to the upload scenario"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any('process_and_store' in thread.name for thread in threading.enumerate()):
+            return
+        time.sleep(0.01)
+
+
+@contextmanager
+def quiet(enabled):
+    """Silence the app's stdout prints at the file-descriptor level"""
+    if not enabled:
+        yield
+        return
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def run_scenario(name, scenario, clients, handler, requests, concurrency, warmup):
+    from django.test import Client
+
+    local = threading.local()
+
+    def timed(i):
+        if not hasattr(local, 'client'):
+            # One client (cookie jar) per thread, one handler for the process,
+            # as under a threaded WSGI server
+            local.client = Client()
+            local.client.handler = handler
+        start = time.perf_counter()
+        response = scenario(local.client, i)
+        return time.perf_counter() - start, response.status_code
+
+    for i in range(warmup):
+        timed(i)
+    wait_for_background_work()
+
+    before = call_snapshot(clients)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(warmup, warmup + requests)))
+    elapsed = time.perf_counter() - started
+    background_started = time.perf_counter()
+    wait_for_background_work()
+    background = time.perf_counter() - background_started
+    calls = call_snapshot(clients) - before
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    report = {
+        'requests': requests,
+        'errors': sum(1 for _, status in results if status >= 400),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else None,
+        'remote_calls_per_request': {key: round(count / requests, 3) for key, count in sorted(calls.items())},
+        'remote_calls_total_per_request': round(sum(calls.values()) / requests, 3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if background > 0.01:
+        report['background_seconds'] = round(background, 3)
+    return report
+
+
+def compare_with_baseline(results, baseline_path):
+    """Scenarios whose remote calls per request increased"""
+    baseline = json.loads(Path(baseline_path).read_text())['scenarios']
+    regressions = {}
+    for name, report in results['scenarios'].items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        grown = {key: {'baseline': previous['remote_calls_per_request'].get(key, 0), 'current': value}
+                 for key, value in report['remote_calls_per_request'].items()
+                 if value > previous['remote_calls_per_request'].get(key, 0) + 1e-9}
+        if grown:
+            regressions[name] = grown
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenarios', default='all', help='Comma-separated scenario names (default: all)')
+    parser.add_argument('--requests', type=int, default=30, help='Measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='Concurrent client threads')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per scenario')
+    parser.add_argument('--corpus', type=int, default=40, help='Documents ingested before measuring')
+    parser.add_argument('--files', type=int, default=5, help='Files per upload_files request')
+    parser.add_argument('--bedrock-latency', type=float, default=0.0, help='Seconds per Bedrock call')
+    parser.add_argument('--s3-latency', type=float, default=0.0, help='Seconds per S3 call')
+    parser.add_argument('--dynamodb-latency', type=float, default=0.0, help='Seconds per DynamoDB call')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to check call fan-out against')
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's console output")
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.test.client import ClientHandler
+    from benchmarks.scenarios import build_scenarios, seed_corpus
+
+    with quiet(not args.verbose):
+        call_command('migrate', verbosity=0)
+        clients = stub_clients()
+        seed_started = time.perf_counter()
+        document_ids = seed_corpus(args.corpus, seed=args.seed)
+        seed_seconds = time.perf_counter() - seed_started
+
+        # Latency is injected after seeding so only measured requests pay it
+        clients['bedrock-runtime'].latency = args.bedrock_latency
+        clients['s3'].latency = args.s3_latency
+        clients['dynamodb'].latency = args.dynamodb_latency
+
+        scenarios = build_scenarios(document_ids, files_per_upload=args.files, seed=args.seed)
+        selected = list(scenarios) if args.scenarios == 'all' else [s.strip() for s in args.scenarios.split(',')]
+        unknown = [name for name in selected if name not in scenarios]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)} (available: {', '.join(scenarios)})")
+
+        handler = ClientHandler(enforce_csrf_checks=False)
+        reports = {}
+        for name in selected:
+            reports[name] = run_scenario(name, scenarios[name], clients, handler,
+                                         args.requests, args.concurrency, args.warmup)
+
+    results = {
+        'config': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'warmup': args.warmup,
+            'corpus': args.corpus,
+            'files_per_upload': args.files,
+            'latency_seconds': {
+                'bedrock-runtime': args.bedrock_latency,
+                's3': args.s3_latency,
+                'dynamodb': args.dynamodb_latency,
+            },
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+        },
+        'seed_seconds': round(seed_seconds, 3),
+        'scenarios': reports,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline)
+        if regressions:
+            print(json.dumps({'call_fanout_regressions': regressions}, indent=2), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Corpus seeding and the request scenarios the runner measures.
+
+Each scenario is a callable taking (client, iteration) and returning the
+response; the runner times it and attributes remote calls to it.
+"""
+import json
+import random
+import uuid
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+CATEGORY_VOCABULARY = {
+    'policies_guidelines': ['policy', 'guideline', 'compliance', 'procedure', 'leave', 'conduct', 'safety',
+                            'approval', 'employee', 'travel'],
+    'operations_production': ['production', 'operation', 'process', 'quality', 'workflow', 'shift', 'line',
+                              'throughput', 'inspection', 'batch'],
+    'maintenance_technical': ['maintenance', 'technical', 'repair', 'equipment', 'manual', 'pump', 'bearing',
+                              'lubrication', 'calibration', 'valve'],
+    'training_knowledge': ['training', 'course', 'learning', 'onboarding', 'tutorial', 'module', 'assessment',
+                           'certificate', 'mentor', 'induction'],
+}
+FILLER = ['the', 'of', 'and', 'for', 'with', 'all', 'must', 'each', 'team', 'site', 'review', 'annual', 'record']
+
+SEARCH_QUERIES = ['safety policy', 'pump bearing maintenance', 'production quality inspection',
+                  'training onboarding course', 'leave approval procedure', 'equipment calibration manual']
+CHAT_MESSAGES = ['find the safety policy', 'show me maintenance manuals for pumps',
+                 'what training courses are available?', 'hello', 'search for production workflow documents']
+
+
+def document_text(rng, category, words=200):
+    vocabulary = CATEGORY_VOCABULARY[category]
+    return ' '.join(rng.choice(vocabulary) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(words))
+
+
+def seed_corpus(size, seed=0):
+    """Store `size` documents in S3, DynamoDB, the search backend and the
+    vector index; returns their IDs.
+
+    The pipeline's storage steps are used directly with known text and
+    category, since PDF text extraction needs real PDF files.
+    """
+    from django.conf import settings
+    from document_app.aws_document_pipeline.pipeline import DocumentPipeline
+
+    rng = random.Random(seed)
+    pipeline = DocumentPipeline()
+    document_ids = []
+    for i in range(size):
+        category = rng.choice(list(CATEGORY_VOCABULARY))
+        document_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        filename = f"{category}_{i}.pdf"
+        s3_key = f"documents/{document_id}/{filename}"
+        text = document_text(rng, category)
+        keywords = rng.sample(CATEGORY_VOCABULARY[category], 5)
+
+        pipeline.s3_client.put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=s3_key,
+                                      Body=text, ContentType='application/pdf')
+        pipeline.dynamodb_storage.store_document(document_id, filename, text, category, keywords,
+                                                 s3_key, 1024, 'application/pdf', confidence=0.9)
+        pipeline.search_backend.store_document(document_id, filename, text, category, keywords,
+                                               s3_key, 1024, 'application/pdf')
+        pipeline._index_vectors(document_id, filename, 1024, 'application/pdf', s3_key, {
+            'document_text': text, 'extracted_text': text, 'category': category, 'keywords': keywords
+        })
+        document_ids.append(document_id)
+    return document_ids
+
+
+def build_scenarios(document_ids, files_per_upload=5, seed=0):
+    rng = random.Random(seed)
+
+    def upload_files(client, i):
+        files = []
+        for n in range(files_per_upload):
+            category = rng.choice(list(CATEGORY_VOCABULARY))
+            files.append(SimpleUploadedFile(f"upload_{i}_{n}.pdf", document_text(rng, category).encode('utf-8'),
+                                            content_type='application/pdf'))
+        return client.post('/api/upload-files/', {'files': files})
+
+    def search_documents(client, i):
+        return client.post('/api/search/', json.dumps({'query': SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}),
+                           content_type='application/json')
+
+    def ai_search(client, i):
+        return client.post('/api/ai-search/', json.dumps({'query': SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}),
+                           content_type='application/json')
+
+    def view_document(client, i):
+        return client.get('/api/documents/view/', {'id': document_ids[i % len(document_ids)]})
+
+    def download_document(client, i):
+        return client.get('/api/documents/download/', {'id': document_ids[i % len(document_ids)]})
+
+    def chatbot_api(client, i):
+        return client.post('/api/chatbot/', json.dumps({'message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}),
+                           content_type='application/json')
+
+    def get_folder_structure(client, i):
+        return client.get('/api/folder-structure/')
+
+    return {
+        'upload_files': upload_files,
+        'search_documents': search_documents,
+        'ai_search': ai_search,
+        'view_document': view_document,
+        'download_document': download_document,
+        'chatbot_api': chatbot_api,
+        'get_folder_structure': get_folder_structure,
+    }
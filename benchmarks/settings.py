@@ -0,0 +1,55 @@
+"""Settings for the offline benchmark suite.
+
+Everything AWS is replaced by the in-process fakes and Kendra by the SQLite
+search backend; all state lives in a scratch directory (BENCH_WORKDIR).
+Per-service latency is injected through BENCH_*_LATENCY (seconds per call).
+"""
+import os
+import tempfile
+from pathlib import Path
+
+from document_project.settings import *  # noqa: F401,F403
+
+WORKDIR = Path(os.environ.get('BENCH_WORKDIR') or tempfile.mkdtemp(prefix='docapp-bench-'))
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver', 'localhost']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': WORKDIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': 30},
+    }
+}
+
+AWS_STUBS = True
+AWS_STUB_S3_ROOT = WORKDIR / 's3'
+AWS_STUB_LATENCY = {
+    'bedrock-runtime': float(os.environ.get('BENCH_BEDROCK_LATENCY', 0)),
+    's3': float(os.environ.get('BENCH_S3_LATENCY', 0)),
+    'dynamodb': float(os.environ.get('BENCH_DYNAMODB_LATENCY', 0)),
+}
+AWS_S3_BUCKET_NAME = 'benchmark-documents'
+BEDROCK_MODEL_ID = 'amazon.nova-lite-v1:0'
+
+SEARCH_BACKEND = 'document_app.aws_document_pipeline.sqlite_search.SQLiteSearchBackend'
+SEARCH_SQLITE_PATH = WORKDIR / 'search_index.sqlite3'
+VECTOR_INDEX_DIR = WORKDIR / 'vector_index'
+# Seeding would otherwise schedule a pool refresh that lands mid-measurement
+SUGGESTION_REFRESH_ON_INGEST = False
+CACHE_REDIS_URL = None
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': WORKDIR / 'django_cache',
+        'KEY_PREFIX': 'apadocs',
+    }
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+}
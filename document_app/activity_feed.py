@@ -0,0 +1,217 @@
+"""Materialized recent-activity feeds and trending documents.
+
+Maintained from the activity stream: after activity_writer writes a batch
+of RecentView rows, update_feeds() prepends them to the per-session feed
+and the global feed (ACTIVITY_FEED_SIZE entries each, already formatted for
+the home page) and adds them to the trending scores, all in the shared
+cache. Trending scores are exponentially decayed view/download counts with
+a half-life of TRENDING_HALF_LIFE_HOURS, kept relative to a reference time
+so an update only rescales once.
+
+Reads are one cache get. A missing feed or trending list is rebuilt from
+the database on first read; updates skip missing entries for the same
+reason, since the rebuild will include the rows.
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from django.utils.timesince import timesince
+
+from .cache import Namespace
+from .models import HOME_PAGE_FIELDS, RecentView, activity_writer
+
+logger = logging.getLogger(__name__)
+
+feeds = Namespace('activity_feed')
+
+FEED_TTL = 7 * 86400
+GLOBAL_FEED = 'global'
+TRENDING_KEY = 'trending'
+UPDATE_LEASE_KEY = 'activity_feed:update-lease'
+ACTION_WEIGHTS = {'view': 1.0, 'download': 2.0}
+TRENDING_TRACKED = 200  # Documents kept in the trending scores
+
+
+@lru_cache(maxsize=256)
+def file_icon(file_type):
+    """Font Awesome icon class for a file type"""
+    file_type = (file_type or '').lower()
+    if not file_type:
+        return 'fas fa-file'
+    if 'pdf' in file_type:
+        return 'fas fa-file-pdf'
+    if any(word in file_type for word in ['word', 'doc']):
+        return 'fas fa-file-word'
+    if any(word in file_type for word in ['excel', 'sheet']):
+        return 'fas fa-file-excel'
+    if any(word in file_type for word in ['powerpoint', 'presentation']):
+        return 'fas fa-file-powerpoint'
+    if any(word in file_type for word in ['image', 'png', 'jpg', 'jpeg']):
+        return 'fas fa-file-image'
+    if any(word in file_type for word in ['text', 'txt']):
+        return 'fas fa-file-alt'
+    return 'fas fa-file'
+
+
+def feed_entry(view):
+    return {
+        'id': str(view.id),
+        'document_id': view.document_id,
+        'document_title': view.document_title,
+        'document_category': view.document_category,
+        'action_type': view.action_type,
+        'timestamp': view.timestamp,
+        'file_type': view.file_type,
+        'file_size': view.file_size,
+        'file_icon': file_icon(view.file_type),
+    }
+
+
+def _feed_size():
+    return getattr(settings, 'ACTIVITY_FEED_SIZE', 20)
+
+
+def _session_key(user_session):
+    return f'session:{user_session}' if user_session else GLOBAL_FEED
+
+
+def recent_feed(user_session=None, limit=10):
+    """Latest activity entries, for one session or everybody, newest first.
+
+    Includes rows still queued in this process, so a view shows up before
+    it is written. time_ago is filled in at read time.
+    """
+    if limit > _feed_size():
+        entries = [feed_entry(view) for view in RecentView.get_recent_views(limit, user_session)]
+    else:
+        feed = feeds.get_or_set(_session_key(user_session), lambda: _load_feed(user_session), FEED_TTL)
+        entries = feed['entries'] if feed else []
+        queued = activity_writer.pending(lambda view: not user_session or view.user_session == user_session)
+        if queued:
+            seen = {entry['id'] for entry in entries}
+            fresh = [feed_entry(view) for view in reversed(queued) if str(view.id) not in seen]
+            entries = fresh + entries
+        entries = entries[:limit]
+    return [{**entry, 'timestamp': entry['timestamp'].isoformat(), 'time_ago': timesince(entry['timestamp'])}
+            for entry in entries]
+
+
+def _load_feed(user_session):
+    queryset = RecentView.objects.only(*HOME_PAGE_FIELDS).order_by('-timestamp')
+    if user_session:
+        queryset = queryset.filter(user_session=user_session)
+    # Wrapped so an empty feed is cached too
+    return {'entries': [feed_entry(view) for view in queryset[:_feed_size()]]}
+
+
+def trending_documents(limit=None):
+    """Most active documents by decayed view/download count"""
+    limit = limit or getattr(settings, 'TRENDING_SIZE', 10)
+    state = feeds.get_or_set(TRENDING_KEY, _load_trending, FEED_TTL)
+    if not state:
+        return []
+    # Scores are relative to as_of; decay them to now (the order is unchanged)
+    factor = _decay(time.time() - state['as_of'])
+    ranked = sorted(state['scores'].items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [{**state['documents'][document_id], 'document_id': document_id, 'score': round(score * factor, 3)}
+            for document_id, score in ranked]
+
+
+def _decay(seconds):
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24) * 3600
+    return math.pow(0.5, seconds / half_life)
+
+
+def _load_trending():
+    """Trending scores rebuilt from the last week of RecentView rows"""
+    now = time.time()
+    since = timezone.now() - timedelta(days=7)
+    buckets = (RecentView.objects.filter(timestamp__gte=since)
+               .annotate(hour=TruncHour('timestamp'))
+               .values_list('document_id', 'action_type', 'hour')
+               .annotate(count=Count('id'))
+               .order_by())
+    scores = {}
+    for document_id, action_type, hour, count in buckets:
+        weight = ACTION_WEIGHTS.get(action_type, 1.0) * count
+        scores[document_id] = scores.get(document_id, 0.0) + weight * _decay(now - hour.timestamp())
+    scores = dict(sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:TRENDING_TRACKED])
+    documents = {}
+    for view in (RecentView.objects.filter(document_id__in=list(scores), timestamp__gte=since)
+                 .only('document_id', 'document_title', 'document_category', 'file_type')
+                 .order_by('timestamp')):
+        documents[view.document_id] = _document_details(view)
+    return {'as_of': now, 'scores': scores, 'documents': documents}
+
+
+def _document_details(view):
+    return {
+        'document_title': view.document_title,
+        'document_category': view.document_category,
+        'file_type': view.file_type,
+        'file_icon': file_icon(view.file_type),
+    }
+
+
+def update_feeds(rows):
+    """Fold newly written RecentView rows into the feeds and trending scores"""
+    if not rows:
+        return
+    # Read-modify-write of shared entries: one updater at a time across processes
+    # (best-effort on FileBasedCache, where an overlapping update can be lost
+    # until the feed expires or is rebuilt)
+    deadline = time.monotonic() + 5
+    while not cache.add(UPDATE_LEASE_KEY, 1, 30):
+        if time.monotonic() > deadline:
+            logger.warning('Activity feed busy; dropping %d rows from the feeds until they are rebuilt', len(rows))
+            feeds.clear()
+            return
+        time.sleep(0.05)
+    try:
+        rows = sorted(rows, key=lambda view: view.timestamp)
+        by_session = {GLOBAL_FEED: rows}
+        for view in rows:
+            if view.user_session:
+                by_session.setdefault(_session_key(view.user_session), []).append(view)
+        for key, views in by_session.items():
+            feed = feeds.get(key)
+            if feed is None:
+                continue  # Rebuilt from the database on the next read
+            fresh = [feed_entry(view) for view in reversed(views)]
+            feeds.set(key, {'entries': (fresh + feed['entries'])[:_feed_size()]}, FEED_TTL)
+
+        state = feeds.get(TRENDING_KEY)
+        if state is not None:
+            now = time.time()
+            factor = _decay(now - state['as_of'])
+            scores = {document_id: score * factor for document_id, score in state['scores'].items()}
+            for view in rows:
+                weight = ACTION_WEIGHTS.get(view.action_type, 1.0) * _decay(now - view.timestamp.timestamp())
+                scores[view.document_id] = scores.get(view.document_id, 0.0) + weight
+                state['documents'][view.document_id] = _document_details(view)
+            scores = dict(sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:TRENDING_TRACKED])
+            documents = {document_id: state['documents'][document_id] for document_id in scores}
+            feeds.set(TRENDING_KEY, {'as_of': now, 'scores': scores, 'documents': documents}, FEED_TTL)
+    finally:
+        cache.delete(UPDATE_LEASE_KEY)
+
+
+def forget_feeds(user_session=None):
+    """Drop materialized feeds after activity was deleted: the session's
+    and the global one, or everything when no session is given"""
+    if user_session:
+        feeds.delete(_session_key(user_session))
+        feeds.delete(GLOBAL_FEED)
+    else:
+        feeds.clear()
+
+
+activity_writer.after_flush = update_feeds
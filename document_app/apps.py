@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class DocumentAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'document_app'
+
+    def ready(self):
+        # Connect the ingestion-event receivers
+        from .aws_document_pipeline import metadata_index  # noqa: F401
+        from .aws_ai_search import vector_index  # noqa: F401
+        from .aws_document_pipeline import search_backend  # noqa: F401
+        from . import corpus  # noqa: F401
+        from .aws_ai_search import suggestion_engine  # noqa: F401
+        from . import activity_feed  # noqa: F401
+        from .aws_chatbot import conversation  # noqa: F401
+        from . import query_cache  # noqa: F401
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from ..aws_clients import get_client
+from ..text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+class HashingEmbedder:
+    """Local, deterministic text embedding via signed feature hashing.
+
+    Unigrams and bigrams are hashed (blake2b, so vectors are stable across
+    processes) into `dim` buckets with sublinear term weighting, then
+    L2-normalised. No model or network call is needed, so documents are
+    searchable the moment they are ingested.
+    """
+
+    name = 'hashing-v1'
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _features(self, text):
+        # Fold plurals so "hats" and "hat" share a feature
+        tokens = [token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+                  for token in tokenize(text)]
+        yield from tokens
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                bucket = value % self.dim
+                sign = 1.0 if (value >> 63) & 1 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+            for bucket, count in counts.items():
+                matrix[row, bucket] = np.sign(count) * np.log1p(abs(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+
+class BedrockEmbedder:
+    """Titan text embeddings through Bedrock (one call per text)"""
+
+    def __init__(self, model_id, dim=512):
+        self.model_id = model_id
+        self.dim = dim
+        self.name = f"bedrock:{model_id}:{dim}"
+        self.bedrock_client = get_client('bedrock-runtime')
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            response = self.bedrock_client.invoke_model(
+                modelId=self.model_id,
+                body=json.dumps({'inputText': text[:8000], 'dimensions': self.dim, 'normalize': True})
+            )
+            matrix[row] = json.loads(response['body'].read())['embedding']
+        return matrix
+
+
+def get_embedder():
+    """Embedder selected by EMBEDDING_BACKEND ('hashing' or 'bedrock')"""
+    dim = getattr(settings, 'EMBEDDING_DIM', 512)
+    if getattr(settings, 'EMBEDDING_BACKEND', 'hashing') == 'bedrock':
+        return BedrockEmbedder(getattr(settings, 'EMBEDDING_MODEL_ID', 'amazon.titan-embed-text-v2:0'), dim)
+    return HashingEmbedder(dim)
@@ -0,0 +1,101 @@
+import numpy as np
+
+from ..text_utils import bm25_idf, bm25_term, tokenize
+
+# Centre of each Kendra confidence bucket on the 0-1 similarity scale
+BUCKET_PRIORS = {'VERY_HIGH': 0.95, 'HIGH': 0.85, 'MEDIUM': 0.75, 'LOW': 0.65}
+UNKNOWN_PRIOR = 0.5
+
+
+class HybridRanker:
+    """Rank Kendra results by blending its confidence bucket with BM25.
+
+    Kendra only reports a coarse bucket (VERY_HIGH/HIGH/MEDIUM/LOW). The
+    ranker computes a BM25F score of the query against each candidate's
+    title, keywords and excerpt, normalised to 0-1, and uses it to place the
+    result within its bucket: a bucket spans bucket_width around its prior,
+    so bucket order is kept while results inside a bucket are ordered by
+    how well they actually match the query.
+    """
+
+    FIELD_WEIGHTS = {'title': 2.0, 'keywords': 1.5, 'excerpt': 1.0}
+
+    def __init__(self, k1=1.2, b=0.75, bucket_width=0.1):
+        self.k1 = k1
+        self.b = b
+        self.bucket_width = bucket_width
+
+    @staticmethod
+    def _field_text(result, field):
+        if field == 'keywords':
+            keywords = result.get('attributes', {}).get('keywords', [])
+            return ' '.join(keywords) if isinstance(keywords, list) else str(keywords or '')
+        return result.get(field, '') or ''
+
+    def lexical_scores(self, query, results):
+        """BM25F score of each result, scaled to 0-1 (1 = saturated match)"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not results:
+            return np.zeros(len(results))
+        term_index = {term: i for i, term in enumerate(terms)}
+
+        n_docs, n_terms = len(results), len(terms)
+        weighted_tf = np.zeros((n_docs, n_terms))
+        present = np.zeros((n_docs, n_terms), dtype=bool)
+
+        for field, weight in self.FIELD_WEIGHTS.items():
+            counts = np.zeros((n_docs, n_terms))
+            lengths = np.zeros(n_docs)
+            for row, result in enumerate(results):
+                tokens = tokenize(self._field_text(result, field))
+                lengths[row] = len(tokens)
+                for token in tokens:
+                    column = term_index.get(token)
+                    if column is not None:
+                        counts[row, column] += 1
+            average_length = lengths.mean() or 1.0
+            norm = 1 - self.b + self.b * lengths / average_length
+            weighted_tf += weight * counts / norm[:, None]
+            present |= counts > 0
+
+        df = present.sum(axis=0)
+        idf = bm25_idf(n_docs, df)
+        scores = bm25_term(weighted_tf, idf, self.k1, self.k1).sum(axis=1)
+
+        # Upper bound: every term matched with unbounded frequency
+        max_score = (idf * (self.k1 + 1)).sum()
+        return scores / max_score if max_score > 0 else scores
+
+    @staticmethod
+    def bucket_prior(score):
+        """Kendra's score as a number: bucket centre, or the value if numeric"""
+        if isinstance(score, str):
+            return BUCKET_PRIORS.get(score.upper(), UNKNOWN_PRIOR)
+        try:
+            return min(max(float(score), 0.0), 1.0)
+        except (TypeError, ValueError):
+            return UNKNOWN_PRIOR
+
+    def score(self, query, results):
+        """Blended 0-1 relevance for each result"""
+        priors = np.array([self.bucket_prior(result.get('score', 0)) for result in results])
+        lexical = self.lexical_scores(query, results)
+        blended = priors - self.bucket_width / 2 + self.bucket_width * lexical
+        return np.clip(blended, 0.0, 1.0)
+
+    def rank(self, query, results, threshold=None):
+        """Annotate results with relevance_score/similarity_percentage, drop
+        those below threshold and return the rest best-first"""
+        if not results:
+            return []
+        scores = self.score(query, results)
+        ranked = []
+        for result, score in zip(results, scores.tolist()):
+            if threshold is not None and score < threshold:
+                continue
+            result['relevance_score'] = round(score, 4)
+            result['similarity_percentage'] = round(score * 100, 1)
+            ranked.append(result)
+        # Stable sort keeps Kendra's order for exact ties
+        ranked.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return ranked
@@ -1,42 +1,54 @@
-import boto3
 import json
+import logging
 from django.conf import settings
-from ..aws_document_pipeline.kendra_database import KendraDatabase
-from ..aws_credential_keys.config import (
-    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, 
-    BEDROCK_REGION, BEDROCK_MODEL_ID, AWS_KENDRA_INDEX_ID
-)
+from ..aws_document_pipeline.search_backend import get_search_backend
+from .ranking import HybridRanker
+from .vector_index import tiered_search
+from ..aws_clients import get_client
+from .. import llm_cache
+from ..query_cache import QueryCache
+
+logger = logging.getLogger(__name__)
+
+# Ranked results, reused for paraphrases of an answered query
+search_results_cache = QueryCache('ai_search')
 
 class AISearchEngine:
     def __init__(self):
-        self.kendra_db = KendraDatabase()
-        self.bedrock_client = boto3.client(
-            'bedrock-runtime',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=BEDROCK_REGION
-        )
+        self.search_backend = get_search_backend()
+        self.ranker = HybridRanker()
+        self.bedrock_client = get_client('bedrock-runtime')
 
     def perform_search(self, query, category_filter=None, max_results=5, min_similarity=0.8):
         """Performs an intelligent search and returns relevant documents."""
-        print(f"*** AI SEARCH: '{query}' ***")
+        logger.debug("AI search: '%s'", query)
+        scope = f'{category_filter}:{max_results}:{min_similarity}'
+        cached = search_results_cache.get(query, scope)
+        if cached is not None:
+            return cached['results'], cached['summary']
         try:
-            # Direct search with Kendra
-            search_results = self.kendra_db.search_documents(query, category_filter=category_filter, limit=max_results * 2)
+            # Kendra, with the local semantic tier per SEMANTIC_SEARCH_MODE
+            search_results = tiered_search(
+                query,
+                lambda: self.search_backend.search_documents(query, category_filter=category_filter, limit=max_results * 2),
+                category_filter=category_filter,
+                limit=max_results * 2
+            )
             
             if not search_results:
                 return [], "No documents found for your query."
             
             # Filter by similarity and rank results
-            filtered_results = self._filter_by_similarity(search_results, min_similarity)
+            filtered_results = self._filter_by_similarity(query, search_results, min_similarity)
             
             if not filtered_results:
                 return [], f"No documents found with similarity above {min_similarity * 100}%."
             
+            search_results_cache.set(query, {'results': filtered_results[:max_results], 'summary': ''}, scope)
             return filtered_results[:max_results], ""
             
         except Exception as e:
-            print(f"*** AI SEARCH ERROR: {e} ***")
+            logger.error('AI search error: %s', e)
             return [], f"Search failed: {str(e)}"
 
     def _extract_intelligent_search_terms(self, query):
@@ -54,8 +66,9 @@ Extract 3-5 key terms that would be most effective for finding relevant document
 Provide only the key terms separated by spaces, no explanations:"""
         
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+            response = llm_cache.invoke_model(
+                self.bedrock_client, 'search.search_terms', query,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -74,7 +87,7 @@ Provide only the key terms separated by spaces, no explanations:"""
             return terms if terms else query
             
         except Exception as e:
-            print(f"*** TERM EXTRACTION ERROR: {e} ***")
+            logger.error('Term extraction error: %s', e)
             # Fallback to original query
             return query
     
@@ -84,23 +97,23 @@ Provide only the key terms separated by spaces, no explanations:"""
         
         # Strategy 1: Direct search with extracted intelligent terms
         if search_terms and search_terms != original_query:
-            print(f"*** STRATEGY 1: Searching with intelligent terms: '{search_terms}' ***")
-            results = self.kendra_db.search_documents(search_terms, category_filter=category_filter, limit=max_results * 2)
-            print(f"*** STRATEGY 1 RESULTS: {len(results) if results else 0} ***")
+            logger.debug("Strategy 1: Searching with intelligent terms: '%s'", search_terms)
+            results = self.search_backend.search_documents(search_terms, category_filter=category_filter, limit=max_results * 2)
+            logger.debug('Strategy 1 results: %s', len(results) if results else 0)
         
         # Strategy 2: Enhanced query search if no results
         if not results:
             enhanced_query = self._enhance_search_query(original_query)
-            print(f"*** STRATEGY 2: Searching with enhanced query: '{enhanced_query}' ***")
-            results = self.kendra_db.search_documents(enhanced_query, category_filter=category_filter, limit=max_results * 2)
-            print(f"*** STRATEGY 2 RESULTS: {len(results) if results else 0} ***")
+            logger.debug("Strategy 2: Searching with enhanced query: '%s'", enhanced_query)
+            results = self.search_backend.search_documents(enhanced_query, category_filter=category_filter, limit=max_results * 2)
+            logger.debug('Strategy 2 results: %s', len(results) if results else 0)
         
         # Strategy 3: Broader search if still no results
         if not results:
             broader_query = self._create_broader_query(original_query)
-            print(f"*** STRATEGY 3: Searching with broader query: '{broader_query}' ***")
-            results = self.kendra_db.search_documents(broader_query, category_filter=category_filter, limit=max_results * 2)
-            print(f"*** STRATEGY 3 RESULTS: {len(results) if results else 0} ***")
+            logger.debug("Strategy 3: Searching with broader query: '%s'", broader_query)
+            results = self.search_backend.search_documents(broader_query, category_filter=category_filter, limit=max_results * 2)
+            logger.debug('Strategy 3 results: %s', len(results) if results else 0)
         
         return results or []
     
@@ -120,7 +133,7 @@ Create an enhanced version that:
 Enhanced query:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -139,7 +152,7 @@ Enhanced query:"""
             return enhanced if enhanced else query
             
         except Exception as e:
-            print(f"*** QUERY ENHANCEMENT ERROR: {e} ***")
+            logger.error('Query enhancement error: %s', e)
             return query
     
     def _create_broader_query(self, query):
@@ -156,7 +169,7 @@ Enhanced query:"""
             return 'document process procedure'
     
     def _intelligent_result_ranking(self, query, results):
-        """Use LLM to intelligently rank and select the best results."""
+        """Rank results by Kendra confidence blended with local BM25 scores."""
         if not results:
             return []
         
@@ -164,154 +177,22 @@ Enhanced query:"""
             results[0]['relevance_score'] = 1.0
             return results
         
-        # Use LLM to select the best results
-        try:
-            best_results = self._select_best_results_with_llm(query, results)
-            
-            # Add relevance scores
-            for i, result in enumerate(best_results):
-                # Higher score for earlier positions
-                result['relevance_score'] = 1.0 - (i * 0.1)
-            
-            return best_results
-            
-        except Exception as e:
-            print(f"*** INTELLIGENT RANKING ERROR: {e} ***")
-            # Fallback to simple ranking
-            return self._simple_result_ranking(query, results)
-    
-    def _select_best_results_with_llm(self, query, results):
-        """Use LLM to select and rank the most relevant results."""
-        if len(results) <= 3:
-            return results
-        
-        # Create summaries for LLM evaluation
-        result_summaries = []
-        for i, result in enumerate(results[:10]):  # Evaluate top 10
-            title = result.get('title', 'Unknown')
-            excerpt = result.get('excerpt', '')[:200]
-            category = result.get('attributes', {}).get('category', 'Unknown')
-            result_summaries.append(f"{i+1}. {title} (Category: {category}) - {excerpt}")
-        
-        ranking_prompt = f"""Given this user query and search results, rank the top 5 most relevant documents.
-
-User query: "{query}"
-
-Search results:
-{chr(10).join(result_summaries)}
-
-Rank the top 5 results by relevance to the user's query. Consider:
-- Direct relevance to the query
-- Document type appropriateness
-- Content quality and completeness
-
-Respond with only the numbers (e.g., "3 1 7 2 9"):"""
-        
-        try:
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
-                body=json.dumps({
-                    "messages": [{
-                        "role": "user",
-                        "content": [{"text": ranking_prompt}]
-                    }],
-                    "inferenceConfig": {
-                        "maxTokens": 30,
-                        "temperature": 0.1,
-                        "topP": 0.7
-                    }
-                })
-            )
-            
-            response_body = json.loads(response['body'].read())
-            ranking = response_body['output']['message']['content'][0]['text'].strip()
-            
-            # Parse ranking and reorder results
-            try:
-                indices = [int(x) - 1 for x in ranking.split() if x.isdigit()]
-                ranked_results = []
-                
-                for idx in indices:
-                    if 0 <= idx < len(results):
-                        ranked_results.append(results[idx])
-                
-                # Add any remaining results
-                for i, result in enumerate(results):
-                    if i not in indices and len(ranked_results) < len(results):
-                        ranked_results.append(result)
-                
-                return ranked_results[:10]  # Return top 10
-                
-            except (ValueError, IndexError):
-                pass
-                
-        except Exception as e:
-            print(f"*** LLM RANKING ERROR: {e} ***")
-        
-        # Fallback to original order
-        return results
-    
-    def _simple_result_ranking(self, query, results):
-        """Fallback simple ranking method."""
-        for result in results:
-            score = self._calculate_relevance_score(query, result)
-            result['relevance_score'] = score
-        
-        return sorted(results, key=lambda x: x['relevance_score'], reverse=True)
-    
-    def _calculate_relevance_score(self, query, result):
-        """Calculate basic relevance score."""
-        kendra_score = result.get('score', 0)
-        if isinstance(kendra_score, str):
-            score_map = {'VERY_HIGH': 1.0, 'HIGH': 0.8, 'MEDIUM': 0.6, 'LOW': 0.4}
-            kendra_score = score_map.get(kendra_score.upper(), 0.5)
-        
-        # Boost score if query keywords appear in title or excerpt
-        term_boost = 0
-        query_terms = set(query.lower().split())
-        title_terms = set(result.get('title', '').lower().split())
-        excerpt_terms = set(result.get('excerpt', '').lower().split())
-
-        if query_terms.intersection(title_terms):
-            term_boost += 0.2
-        if query_terms.intersection(excerpt_terms):
-            term_boost += 0.1
-
-        return kendra_score + term_boost
+        return self.ranker.rank(query, results)[:10]
     
-    def _filter_by_similarity(self, results, min_similarity=0.8):
-        """Filter results by similarity threshold (80% to 100%)"""
+    def _filter_by_similarity(self, query, results, min_similarity=0.8):
+        """Rank results and drop those below the similarity threshold"""
         if not results:
             return []
         
-        filtered_results = []
-        for result in results:
-            # Get Kendra score - it comes as 'score' field
-            kendra_score = result.get('score', 0)
-            
-            # Convert Kendra confidence scores to numeric
-            if isinstance(kendra_score, str):
-                score_map = {'VERY_HIGH': 0.95, 'HIGH': 0.85, 'MEDIUM': 0.75, 'LOW': 0.65}
-                relevance_score = score_map.get(kendra_score.upper(), 0.5)
-            else:
-                # If it's already numeric, use it directly but ensure it's in 0-1 range
-                relevance_score = min(max(float(kendra_score), 0.0), 1.0)
-            
-            print(f"*** DOCUMENT: '{result.get('title', 'Unknown')}' - Similarity: {relevance_score * 100:.1f}% ***")
-            
-            # Lower the threshold to 60% to show more results
-            actual_threshold = 0.6  # 60% instead of 80%
-            
-            if relevance_score >= actual_threshold:
-                result['relevance_score'] = relevance_score
-                result['similarity_percentage'] = round(relevance_score * 100, 1)
-                filtered_results.append(result)
-                print(f"*** INCLUDED: Above {actual_threshold * 100}% threshold ***")
-            else:
-                print(f"*** EXCLUDED: Below {actual_threshold * 100}% threshold ***")
+        # AI_SEARCH_SIMILARITY_THRESHOLD rather than min_similarity: Kendra's
+        # LOW bucket (60-70%) is still worth showing
+        actual_threshold = getattr(settings, 'AI_SEARCH_SIMILARITY_THRESHOLD', 0.6)
+        
+        filtered_results = self.ranker.rank(query, results, threshold=actual_threshold)
         
-        # Sort by relevance score (highest first)
-        filtered_results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+        for result in filtered_results:
+            logger.debug("Included: '%s' - Similarity: %.1f%%", result.get('title', 'Unknown'), result['similarity_percentage'])
+        logger.debug('%s results below %s%% threshold', len(results) - len(filtered_results), actual_threshold * 100)
         
         return filtered_results
     
@@ -350,7 +231,7 @@ Create a summary that:
 Summary:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -370,7 +251,7 @@ Summary:"""
             return summary if summary else f"Found {len(ranked_results)} relevant documents for your query about {query}."
             
         except Exception as e:
-            print(f"*** INTELLIGENT SUMMARY ERROR: {e} ***")
+            logger.error('Intelligent summary error: %s', e)
             return f"Found {len(ranked_results)} relevant documents matching your search for '{query}'."
     
     def _generate_helpful_no_results_response(self, query):
@@ -386,7 +267,7 @@ Summary:"""
 Response:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -404,7 +285,7 @@ Response:"""
             return response_body['output']['message']['content'][0]['text'].strip()
             
         except Exception as e:
-            print(f"*** NO RESULTS RESPONSE ERROR: {e} ***")
+            logger.error('No results response error: %s', e)
             return f"No documents found for '{query}'. Try using different keywords, broader terms, or check if documents have been uploaded to the system."
     
     def _generate_query_suggestions(self, query, top_results):
@@ -444,7 +325,7 @@ Format as:
 Suggestions:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -464,5 +345,5 @@ Suggestions:"""
             return suggestions if suggestions else None
             
         except Exception as e:
-            print(f"*** QUERY SUGGESTIONS ERROR: {e} ***")
+            logger.error('Query suggestions error: %s', e)
             return None
@@ -1,97 +1,160 @@
-import boto3
 import json
+import logging
 import random
+import re
 import hashlib
-from datetime import datetime, timedelta
+import threading
+import time
 from django.conf import settings
 from django.core.cache import cache
-from ..aws_document_pipeline.kendra_database import KendraDatabase
-from ..aws_credential_keys.config import (
-    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, 
-    BEDROCK_REGION, BEDROCK_MODEL_ID
-)
+from django.dispatch import receiver
+from ..aws_document_pipeline.search_backend import get_search_backend
+from ..aws_clients import get_client
+from ..cache import Namespace
+from ..corpus import corpus_version
+from ..interactions import interaction_analytics, pending_interactions, record_interaction
+from ..signals import document_deleted, document_stored
+
+logger = logging.getLogger(__name__)
+
+QUOTED_RE = re.compile(r'"([^"]*)"')
+
+POOL_KEY = 'pool'
+REFRESH_LEASE_KEY = 'suggestions:refresh-lease'
+
+_refresh_timer = None
+_refresh_lock = threading.Lock()
 
 class SuggestionEngine:
+    # Shared by all worker processes through the configured cache
+    suggestion_cache = Namespace('suggestions')
+
     def __init__(self):
-        self.kendra_db = KendraDatabase()
-        self.bedrock_client = boto3.client(
-            'bedrock-runtime',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=BEDROCK_REGION
-        )
+        self.search_backend = get_search_backend()
+        self.bedrock_client = get_client('bedrock-runtime')
         
     def generate_dynamic_suggestions(self, user_context=None, limit=3, use_cache=True):
-        """Generate dynamic search suggestions based on available documents and user context"""
+        """Dynamic search suggestions based on available documents and user context.
+
+        Served from the precomputed suggestion pool, so the request path is a
+        cache read; a stale or missing pool schedules a background refresh
+        (refresh_suggestion_pool) and is served as it is meanwhile.
+        """
         try:
-            print(f"*** GENERATING DYNAMIC SUGGESTIONS ***")
-            
-            # Create cache key based on document collection state and context
-            cache_key = self._generate_cache_key(user_context, limit)
-            
-            # Try to get cached suggestions first
-            if use_cache:
-                cached_suggestions = cache.get(cache_key)
-                if cached_suggestions:
-                    print(f"*** RETURNING {len(cached_suggestions)} CACHED SUGGESTIONS ***")
-                    return cached_suggestions
+            logger.debug('Generating dynamic suggestions')
             
-            # Get document insights (with caching)
-            document_insights = self._analyze_document_collection(use_cache=use_cache)
+            if not use_cache:
+                return self._compute_dynamic_suggestions(user_context, limit, use_cache=False)
             
-            # Generate AI-powered suggestions
-            suggestions = self._generate_ai_suggestions(document_insights, user_context, limit)
-            print(f"*** AI GENERATED SUGGESTIONS: {suggestions} ***")
+            pool = self.suggestion_cache.get(POOL_KEY)
+            refresh_after = getattr(settings, 'SUGGESTION_REFRESH_SECONDS', 1500)
+            if pool is None:
+                schedule_suggestion_refresh(delay=0)
+                return self._get_default_suggestions()[:limit]
+            if pool['version'] != corpus_version() or time.time() - pool['generated_at'] > refresh_after:
+                schedule_suggestion_refresh(delay=0)
             
-            # Add fallback suggestions if needed
-            if len(suggestions) < limit:
-                print(f"*** NEED MORE SUGGESTIONS: {len(suggestions)}/{limit}, ADDING FALLBACKS ***")
-                fallback_suggestions = self._get_fallback_suggestions(document_insights)
-                suggestions.extend(fallback_suggestions[:limit - len(suggestions)])
-                print(f"*** FINAL SUGGESTIONS WITH FALLBACKS: {suggestions} ***")
-            
-            # Cache the results for 30 minutes
-            final_suggestions = suggestions[:limit]
-            if use_cache and final_suggestions:
-                cache.set(cache_key, final_suggestions, 1800)  # 30 minutes
-            
-            print(f"*** GENERATED {len(final_suggestions)} DYNAMIC SUGGESTIONS ***")
-            return final_suggestions
+            return self._pick_from_pool(pool, user_context or {}, limit)
             
         except Exception as e:
-            print(f"*** SUGGESTION GENERATION ERROR: {e} ***")
+            logger.error('Suggestion generation error: %s', e)
             return self._get_default_suggestions()
     
-    def _generate_cache_key(self, user_context, limit):
-        """Generate a cache key based on document collection state and context"""
-        try:
-            # Get document collection stats for cache key
-            stats = self.kendra_db.get_category_stats()
-            stats_str = json.dumps(stats, sort_keys=True)
-            
-            # Include user context if available
-            context_str = json.dumps(user_context or {}, sort_keys=True)
-            
-            # Create hash of the combined data
-            cache_data = f"{stats_str}_{context_str}_{limit}"
-            cache_hash = hashlib.md5(cache_data.encode()).hexdigest()
-            
-            return f"dynamic_suggestions_{cache_hash}"
-            
-        except Exception as e:
-            print(f"*** CACHE KEY GENERATION ERROR: {e} ***")
-            # Fallback to simple cache key
-            return f"dynamic_suggestions_default_{limit}"
+    def _pick_from_pool(self, pool, user_context, limit):
+        """limit suggestions from the pool: the requested category's first,
+        then ones matching the user's common search terms, otherwise a
+        rotation chosen by session so users see different suggestions"""
+        category = user_context.get('category')
+        candidates = list(pool['categories'].get(category, [])) if category else []
+        candidates += [s for s in pool['general'] if s not in candidates]
+        if not candidates:
+            return self._get_default_suggestions()[:limit]
+        
+        terms = (user_context.get('preferences') or {}).get('common_terms') or []
+        if terms:
+            # Stable sort keeps pool order within each group
+            candidates.sort(key=lambda s: not any(term in s.lower() for term in terms))
+        elif not category and user_context.get('session'):
+            offset = int(hashlib.md5(str(user_context['session']).encode()).hexdigest(), 16) % len(candidates)
+            candidates = candidates[offset:] + candidates[:offset]
+        return candidates[:limit]
+    
+    def refresh_suggestion_pool(self, pool_size=None):
+        """Recompute the collection analysis and the suggestion pool (a
+        general list plus one per category) and store them in the cache"""
+        pool_size = pool_size or getattr(settings, 'SUGGESTION_POOL_SIZE', 12)
+        version = corpus_version()
+        
+        document_insights = self._compute_collection_analysis()
+        if document_insights is None:
+            return None
+        self.suggestion_cache.set(f'document_collection_analysis:{version}', document_insights, 900)
+        
+        general = self._generate_ai_suggestions(document_insights, None, pool_size)
+        for suggestion in self._get_fallback_suggestions(document_insights):
+            if len(general) >= pool_size:
+                break
+            if suggestion not in general:
+                general.append(suggestion)
+        
+        per_category = max(3, pool_size // 4)
+        categories = {}
+        for category, info in document_insights['categories'].items():
+            # The same prompt, with the collection narrowed to one category
+            focused = {
+                'categories': {category: info},
+                'common_keywords': list(dict.fromkeys(info['keywords']))[:10],
+                'document_types': document_insights['document_types'],
+                'total_documents': info['count'],
+            }
+            categories[category] = self._generate_ai_suggestions(focused, None, per_category)
+        
+        pool = {
+            'version': version,
+            'generated_at': time.time(),
+            'general': general,
+            'categories': categories,
+        }
+        self.suggestion_cache.set(POOL_KEY, pool, getattr(settings, 'SUGGESTION_POOL_TTL', 86400))
+        logger.info('Suggestion pool refreshed: %s general, %s categories (corpus version %s)',
+                    len(general), len(categories), version)
+        return pool
+    
+    def _compute_dynamic_suggestions(self, user_context, limit, use_cache=True):
+        """Generate suggestions with Bedrock (the uncached path)"""
+        # Get document insights (with caching)
+        document_insights = self._analyze_document_collection(use_cache=use_cache)
+        
+        # Generate AI-powered suggestions
+        suggestions = self._generate_ai_suggestions(document_insights, user_context, limit)
+        logger.debug('AI generated suggestions: %s', suggestions)
+        
+        # Add fallback suggestions if needed
+        if len(suggestions) < limit:
+            logger.debug('Need more suggestions: %s/%s, adding fallbacks', len(suggestions), limit)
+            fallback_suggestions = self._get_fallback_suggestions(document_insights)
+            suggestions.extend(fallback_suggestions[:limit - len(suggestions)])
+            logger.debug('Final suggestions with fallbacks: %s', suggestions)
+        
+        final_suggestions = suggestions[:limit]
+        logger.debug('Generated %s dynamic suggestions', len(final_suggestions))
+        return final_suggestions
     
     def _analyze_document_collection(self, use_cache=True):
         """Analyze the current document collection to understand what's available"""
+        if not use_cache:
+            analysis = self._compute_collection_analysis()
+        else:
+            # Fresh for 15 minutes, served stale for 15 more while it is recomputed
+            analysis = self.suggestion_cache.get_or_set(
+                f'document_collection_analysis:{corpus_version()}', self._compute_collection_analysis,
+                ttl=900, stale_ttl=900
+            )
+        return analysis or {'categories': {}, 'common_keywords': [], 'document_types': [], 'total_documents': 0}
+    
+    def _compute_collection_analysis(self):
+        """Sample each category; None on failure, so errors are not cached"""
         try:
-            # Try to get cached analysis first
-            if use_cache:
-                cached_analysis = cache.get('document_collection_analysis')
-                if cached_analysis:
-                    print(f"*** RETURNING CACHED DOCUMENT ANALYSIS ***")
-                    return cached_analysis
             # Get sample documents from different categories
             categories = ['policies_guidelines', 'operations_production', 'maintenance_technical', 'training_knowledge', 'others']
             document_insights = {
@@ -106,7 +169,7 @@ class SuggestionEngine:
             all_titles = []
             
             for category in categories:
-                docs = self.kendra_db.list_documents_by_category(category, limit=10)
+                docs = self.search_backend.list_documents_by_category(category, limit=10)
                 if docs:
                     document_insights['categories'][category] = {
                         'count': len(docs),
@@ -154,16 +217,12 @@ class SuggestionEngine:
             
             document_insights['document_types'] = list(document_types)
             
-            # Cache the analysis for 15 minutes
-            if use_cache:
-                cache.set('document_collection_analysis', document_insights, 900)  # 15 minutes
-            
-            print(f"*** DOCUMENT ANALYSIS: {document_insights['total_documents']} docs, {len(document_insights['common_keywords'])} keywords ***")
+            logger.debug('Document analysis: %s docs, %s keywords', document_insights['total_documents'], len(document_insights['common_keywords']))
             return document_insights
             
         except Exception as e:
-            print(f"*** DOCUMENT ANALYSIS ERROR: {e} ***")
-            return {'categories': {}, 'common_keywords': [], 'document_types': [], 'total_documents': 0}
+            logger.error('Document analysis error: %s', e)
+            return None
     
     def _generate_ai_suggestions(self, document_insights, user_context, limit=3):
         """Use AI to generate contextual search suggestions"""
@@ -195,7 +254,7 @@ class SuggestionEngine:
                 context_info.append("No documents currently available in the system")
             
             context_str = '\n'.join(context_info)
-            print(f"*** CONTEXT FOR AI: {context_str} ***")
+            logger.debug('Context for AI: %s', context_str)
             
             suggestion_prompt = f"""You are an AI assistant helping users discover documents in their collection. Based on the available documents, generate {limit} diverse, practical search suggestions that users would actually want to try.
 
@@ -217,7 +276,7 @@ Format each suggestion as a quoted search query, like:
 Suggestions:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -246,24 +305,23 @@ Suggestions:"""
                         suggestions.append(suggestion)
                 elif '"' in line:
                     # Try to extract quoted text
-                    import re
-                    matches = re.findall(r'"([^"]*)"', line)
+                    matches = QUOTED_RE.findall(line)
                     for match in matches:
                         if match and len(match) > 10:
                             suggestions.append(match)
             
-            print(f"*** AI GENERATED {len(suggestions)} SUGGESTIONS ***")
+            logger.debug('AI generated %s suggestions', len(suggestions))
             return suggestions[:limit]
             
         except Exception as e:
-            print(f"*** AI SUGGESTION ERROR: {e} ***")
+            logger.error('AI suggestion error: %s', e)
             return []
     
     def _get_fallback_suggestions(self, document_insights):
         """Generate fallback suggestions based on document analysis"""
         fallback_suggestions = []
         
-        print(f"*** GENERATING FALLBACK SUGGESTIONS FROM: {document_insights} ***")
+        logger.debug('Generating fallback suggestions from: %s', document_insights)
         
         # If we have documents, create document-aware suggestions
         if document_insights['total_documents'] > 0:
@@ -312,7 +370,7 @@ Suggestions:"""
                 "Learn about document management features"
             ]
         
-        print(f"*** GENERATED {len(fallback_suggestions)} FALLBACK SUGGESTIONS ***")
+        logger.debug('Generated %s fallback suggestions', len(fallback_suggestions))
         return fallback_suggestions
     
     def _get_default_suggestions(self):
@@ -324,69 +382,18 @@ Suggestions:"""
         ]
     
     def track_user_interaction(self, query, result_clicked=False, user_session=None):
-        """Track user interactions for future personalization"""
+        """Track user interactions for future personalization.
+
+        Queued for the interaction log (document_app/interactions.py), which
+        is written in batches and rolled up into the analytics counters in
+        the background.
+        """
         try:
-            interaction_data = {
-                'timestamp': datetime.now().isoformat(),
-                'query': query,
-                'result_clicked': result_clicked,
-                'user_session': user_session
-            }
-            
-            # Store in user's search history (cache-based for now)
-            if user_session:
-                history_key = f"user_search_history_{user_session}"
-                search_history = cache.get(history_key, [])
-                
-                # Add new interaction
-                search_history.append(interaction_data)
-                
-                # Keep only last 50 interactions
-                if len(search_history) > 50:
-                    search_history = search_history[-50:]
-                
-                # Store back in cache for 24 hours
-                cache.set(history_key, search_history, 86400)  # 24 hours
-            
-            # Update analytics
-            self._update_suggestion_analytics(query, result_clicked)
-            
-            print(f"*** USER INTERACTION TRACKED: {query} ***")
+            record_interaction(query, result_clicked=result_clicked, user_session=user_session)
+            logger.debug('User interaction tracked: %s', query)
             
         except Exception as e:
-            print(f"*** INTERACTION TRACKING ERROR: {e} ***")
-    
-    def _update_suggestion_analytics(self, query, result_clicked):
-        """Update suggestion analytics with new interaction data"""
-        try:
-            analytics = cache.get('suggestion_analytics', {
-                'total_searches': 0,
-                'total_clicks': 0,
-                'popular_queries': {},
-                'click_through_rate': 0
-            })
-            
-            # Update counters
-            analytics['total_searches'] += 1
-            if result_clicked:
-                analytics['total_clicks'] += 1
-            
-            # Update popular queries
-            if 'popular_queries' not in analytics:
-                analytics['popular_queries'] = {}
-            
-            query_lower = query.lower().strip()
-            analytics['popular_queries'][query_lower] = analytics['popular_queries'].get(query_lower, 0) + 1
-            
-            # Calculate click-through rate
-            if analytics['total_searches'] > 0:
-                analytics['click_through_rate'] = analytics['total_clicks'] / analytics['total_searches']
-            
-            # Store updated analytics
-            cache.set('suggestion_analytics', analytics, 86400)  # 24 hours
-            
-        except Exception as e:
-            print(f"*** ANALYTICS UPDATE ERROR: {e} ***")
+            logger.error('Interaction tracking error: %s', e)
     
     def get_personalized_suggestions(self, user_session=None, limit=3):
         """Get personalized suggestions based on user history"""
@@ -407,16 +414,26 @@ Suggestions:"""
                 return self.generate_dynamic_suggestions(user_context={'session': user_session}, limit=limit)
                 
         except Exception as e:
-            print(f"*** PERSONALIZED SUGGESTIONS ERROR: {e} ***")
+            logger.error('Personalized suggestions error: %s', e)
             return self.generate_dynamic_suggestions(user_context={'session': user_session}, limit=limit)
     
-    def _get_user_search_history(self, user_session):
-        """Get user's search history from cache"""
+    def _get_user_search_history(self, user_session, limit=50):
+        """User's last `limit` interactions from the interaction log, oldest first"""
+        from ..models import SearchInteraction
+
         if not user_session:
             return []
         
-        history_key = f"user_search_history_{user_session}"
-        return cache.get(history_key, [])
+        rows = list(SearchInteraction.objects.filter(user_session=user_session)
+                    .order_by('-timestamp')[:limit])
+        rows.reverse()
+        rows += pending_interactions(user_session)
+        return [{
+            'timestamp': row.timestamp.isoformat(),
+            'query': row.query,
+            'result_clicked': row.result_clicked,
+            'user_session': row.user_session,
+        } for row in rows[-limit:]]
     
     def _analyze_user_preferences(self, search_history):
         """Analyze user's search patterns to understand preferences"""
@@ -459,9 +476,8 @@ Suggestions:"""
                 'document_coverage': {}
             }
             
-            # Get analytics from cache (in a real implementation, this would be from a database)
-            cached_analytics = cache.get('suggestion_analytics', {})
-            analytics.update(cached_analytics)
+            # Precomputed from the interaction log
+            analytics.update(interaction_analytics())
             
             # Add current document collection stats
             document_insights = self._analyze_document_collection()
@@ -475,28 +491,60 @@ Suggestions:"""
             return analytics
             
         except Exception as e:
-            print(f"*** ANALYTICS ERROR: {e} ***")
+            logger.error('Analytics error: %s', e)
             return {'error': str(e)}
     
     def clear_suggestion_cache(self):
         """Clear all suggestion-related cache entries"""
         try:
-            # Clear document analysis cache
-            cache.delete('document_collection_analysis')
-            
-            # Clear suggestion caches (this is a simplified approach)
-            # In a real implementation, you'd track cache keys more systematically
-            cache_keys = [
-                'dynamic_suggestions_default_3',
-                'suggestion_analytics'
-            ]
+            # Bumping the namespace generation drops the suggestion pool and
+            # the document analysis in all worker processes; rebuild them now
+            self.suggestion_cache.clear()
+            schedule_suggestion_refresh(delay=0)
             
-            for key in cache_keys:
-                cache.delete(key)
-            
-            print("*** SUGGESTION CACHE CLEARED ***")
+            logger.debug('Suggestion cache cleared')
             return True
             
         except Exception as e:
-            print(f"*** CACHE CLEAR ERROR: {e} ***")
+            logger.error('Cache clear error: %s', e)
             return False
+
+
+def schedule_suggestion_refresh(delay=None):
+    """Refresh the suggestion pool in a background thread after `delay`
+    seconds (default SUGGESTION_REFRESH_DEBOUNCE). Requests made while a
+    refresh is pending are folded into it, so a burst of uploads costs one
+    refresh; a lease in the shared cache keeps workers from refreshing at
+    the same time."""
+    global _refresh_timer
+    if delay is None:
+        delay = getattr(settings, 'SUGGESTION_REFRESH_DEBOUNCE', 30)
+    with _refresh_lock:
+        if _refresh_timer is not None:
+            return
+        _refresh_timer = threading.Timer(delay, _run_scheduled_refresh)
+        _refresh_timer.daemon = True
+        _refresh_timer.name = 'suggestion-refresh'
+        _refresh_timer.start()
+
+
+def _run_scheduled_refresh():
+    global _refresh_timer
+    try:
+        if cache.add(REFRESH_LEASE_KEY, 1, 300):
+            try:
+                SuggestionEngine().refresh_suggestion_pool()
+            finally:
+                cache.delete(REFRESH_LEASE_KEY)
+    except Exception as e:
+        logger.error('Suggestion pool refresh failed: %s', e)
+    finally:
+        with _refresh_lock:
+            _refresh_timer = None
+
+
+@receiver(document_stored)
+@receiver(document_deleted)
+def _refresh_on_change(sender, document_id, **kwargs):
+    if getattr(settings, 'SUGGESTION_REFRESH_ON_INGEST', True):
+        schedule_suggestion_refresh()
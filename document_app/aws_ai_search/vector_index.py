@@ -0,0 +1,438 @@
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.dispatch import receiver
+
+from ..signals import document_deleted
+from .embeddings import get_embedder
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity -> Kendra-style confidence bucket, so local results flow
+# through the same scoring code as Kendra results
+SIMILARITY_BUCKETS = [(0.6, 'VERY_HIGH'), (0.45, 'HIGH'), (0.3, 'MEDIUM')]
+
+
+def chunk_text(text, words_per_chunk=120, overlap=30):
+    """Split text into overlapping word windows"""
+    words = (text or '').split()
+    if not words:
+        return []
+    step = max(words_per_chunk - overlap, 1)
+    return [' '.join(words[start:start + words_per_chunk])
+            for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+class VectorIndex:
+    """Append-only on-disk vector index over document chunks.
+
+    Layout of a generation directory:
+      vectors.f32   float32 matrix, one row per chunk, memory-mapped for search
+      rows.jsonl    sidecar with the document ID and display fields per row
+      deleted.txt   row numbers removed since the last compaction
+      ivf.npz       optional IVF partition (centroids + row assignments)
+
+    Generation 0 lives in `directory` itself, generation N in gen-N/, and
+    the `generation` file names the current one. Row numbers are only
+    meaningful within a generation: compact() writes a new generation and
+    switches the file atomically, and every process notices the switch on
+    its next search or write and reloads from the new files. The previous
+    generation is kept until the next compaction, for readers still on it.
+
+    Writers append under an exclusive file lock, so several worker processes
+    can share one directory; readers pick up new rows on their next search.
+    Small corpora are searched exhaustively with one matrix-vector product;
+    above ann_threshold rows an IVF index restricts the search to the
+    nprobe nearest partitions.
+    """
+
+    def __init__(self, directory, embedder, ann_threshold=20000, nprobe=8):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        # One directory per embedder, so vectors of different models never mix
+        self.directory = os.path.join(directory, embedder.name.replace(':', '_').replace('/', '_'))
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        os.makedirs(self.directory, exist_ok=True)
+        self.generation_path = os.path.join(self.directory, 'generation')
+        self.lock_path = os.path.join(self.directory, 'lock')
+
+        self._lock = threading.RLock()
+        self._building_ann = False
+        self._use_generation(self._current_generation())
+
+    # -- generations ------------------------------------------------------------
+
+    def _generation_dir(self, generation):
+        return self.directory if generation == 0 else os.path.join(self.directory, f'gen-{generation}')
+
+    def _current_generation(self):
+        try:
+            with open(self.generation_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _use_generation(self, generation):
+        """Point at a generation's files and forget what was loaded from another"""
+        self.generation = generation
+        directory = self._generation_dir(generation)
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.rows_path = os.path.join(directory, 'rows.jsonl')
+        self.deleted_path = os.path.join(directory, 'deleted.txt')
+        self.ivf_path = os.path.join(directory, 'ivf.npz')
+        self._rows = []
+        self._rows_offset = 0
+        self._deleted = set()
+        self._deleted_offset = 0
+        self._vectors = None
+        self._ivf = None
+        self._ivf_mtime = None
+        self._ivf_lists = None
+
+    def _remove_generation(self, generation):
+        if generation == 0:
+            for name in ('vectors.f32', 'rows.jsonl', 'deleted.txt', 'ivf.npz'):
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            shutil.rmtree(self._generation_dir(generation), ignore_errors=True)
+
+    # -- file locking ---------------------------------------------------------
+
+    def _exclusive(self):
+        index = self
+
+        class _FileLock:
+            def __enter__(self):
+                index._lock.acquire()
+                self.handle = open(index.lock_path, 'a')
+                if fcntl:
+                    fcntl.flock(self.handle, fcntl.LOCK_EX)
+
+            def __exit__(self, *exc):
+                if fcntl:
+                    fcntl.flock(self.handle, fcntl.LOCK_UN)
+                self.handle.close()
+                index._lock.release()
+
+        return _FileLock()
+
+    # -- loading ----------------------------------------------------------------
+
+    def _refresh(self):
+        """Pick up rows, deletions and IVF partitions written since last time"""
+        with self._lock:
+            generation = self._current_generation()
+            if generation != self.generation:
+                logger.info('Vector index: switching to generation %s', generation)
+                self._use_generation(generation)
+
+            if os.path.exists(self.rows_path) and os.path.getsize(self.rows_path) > self._rows_offset:
+                with open(self.rows_path, 'rb') as f:
+                    f.seek(self._rows_offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break  # Partially written by another process
+                        self._rows.append(json.loads(line))
+                        self._rows_offset += len(line)
+
+            if os.path.exists(self.deleted_path) and os.path.getsize(self.deleted_path) > self._deleted_offset:
+                with open(self.deleted_path, 'rb') as f:
+                    f.seek(self._deleted_offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break
+                        self._deleted.add(int(line))
+                        self._deleted_offset += len(line)
+
+            vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+            rows = min(vector_rows, len(self._rows))
+            if rows == 0:
+                self._vectors = None
+            elif self._vectors is None or self._vectors.shape[0] != rows:
+                self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+
+            if os.path.exists(self.ivf_path):
+                mtime = os.path.getmtime(self.ivf_path)
+                if mtime != self._ivf_mtime:
+                    with np.load(self.ivf_path) as data:
+                        self._ivf = {'centroids': data['centroids'], 'assignments': data['assignments']}
+                    self._ivf_mtime = mtime
+                    self._ivf_lists = None
+            return rows
+
+    # -- writing ----------------------------------------------------------------
+
+    def add_document(self, document_id, title, text, metadata=None):
+        """Embed and append a document's chunks; replaces earlier versions"""
+        chunks = chunk_text(text) or [title or '']
+        # The title is part of every chunk's embedding so short chunks keep context
+        vectors = self.embedder.embed([f"{title}\n{chunk}" for chunk in chunks]).astype(np.float32)
+        metadata = metadata or {}
+
+        with self._exclusive():
+            self._refresh()
+            self._mark_deleted(document_id)
+            # Align the vector file with the sidecar if a writer died mid-append
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(len(self._rows) * 4 * self.dim)
+                f.write(vectors.tobytes())
+            with open(self.rows_path, 'a', encoding='utf-8') as f:
+                for i, chunk in enumerate(chunks):
+                    f.write(json.dumps({
+                        'document_id': document_id,
+                        'chunk': i,
+                        'title': title,
+                        'text': chunk[:500],
+                        **metadata
+                    }) + '\n')
+            rows = self._refresh()
+
+        logger.info('Vector index: added %s chunks for %s', len(chunks), document_id)
+        self._maybe_build_ann(rows)
+        return len(chunks)
+
+    def remove_document(self, document_id):
+        with self._exclusive():
+            self._refresh()
+            self._mark_deleted(document_id)
+            self._refresh()
+
+    def _mark_deleted(self, document_id):
+        rows = [i for i, row in enumerate(self._rows)
+                if row['document_id'] == document_id and i not in self._deleted]
+        if rows:
+            with open(self.deleted_path, 'a') as f:
+                f.writelines(f"{i}\n" for i in rows)
+
+    # -- approximate index ----------------------------------------------------
+
+    def _maybe_build_ann(self, rows):
+        covered = len(self._ivf['assignments']) if self._ivf else 0
+        if rows < self.ann_threshold or covered * 2 > rows or self._building_ann:
+            return
+        self._building_ann = True
+        threading.Thread(target=self.build_ann, daemon=True, name='vector-index-ivf').start()
+
+    def build_ann(self, iterations=10, seed=0):
+        """Partition the vectors with spherical k-means (IVF)"""
+        try:
+            with self._lock:
+                rows = self._refresh()
+                if not rows:
+                    return
+                # The partition belongs to this generation, even if compaction switches meanwhile
+                ivf_path = self.ivf_path
+                vectors = np.asarray(self._vectors[:rows])
+            nlist = max(1, int(np.sqrt(rows)))
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(rows, min(rows, nlist * 64), replace=False)]
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = sample[assignment == c]
+                    if len(members):
+                        centroid = members.mean(axis=0)
+                        centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+            assignments = np.concatenate([
+                np.argmax(vectors[start:start + 8192] @ centroids.T, axis=1)
+                for start in range(0, rows, 8192)
+            ]).astype(np.int32)
+
+            tmp_path = ivf_path + '.tmp.npz'
+            np.savez(tmp_path, centroids=centroids, assignments=assignments)
+            os.replace(tmp_path, ivf_path)
+            logger.info('Vector index: built IVF with %s lists over %s rows', nlist, rows)
+        finally:
+            self._building_ann = False
+
+    def _ivf_candidates(self, query_vector, rows):
+        centroids = self._ivf['centroids']
+        assignments = self._ivf['assignments']
+        if self._ivf_lists is None or self._ivf_lists[0] != rows:
+            # Rows appended after the build are assigned on the fly
+            extra = np.empty(0, dtype=np.int32)
+            if rows > len(assignments):
+                extra = np.argmax(np.asarray(self._vectors[len(assignments):rows]) @ centroids.T, axis=1).astype(np.int32)
+            full = np.concatenate([assignments[:rows], extra])
+            order = np.argsort(full, kind='stable')
+            bounds = np.searchsorted(full[order], np.arange(len(centroids) + 1))
+            self._ivf_lists = (rows, order, bounds)
+        _, order, bounds = self._ivf_lists
+        probes = np.argsort(-(centroids @ query_vector))[:self.nprobe]
+        return np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probes])
+
+    # -- search -----------------------------------------------------------------
+
+    def search(self, query, category_filter=None, limit=10, min_score=0.15):
+        """Best-matching documents (best chunk per document), best first"""
+        # Outside the lock: with the Bedrock embedder this is a network call
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            rows = self._refresh()
+            if not rows:
+                return []
+
+            if self._ivf is not None and rows >= self.ann_threshold:
+                candidates = np.sort(self._ivf_candidates(query_vector, rows))
+                if len(candidates) == 0:
+                    return []
+                scores = np.asarray(self._vectors[candidates]) @ query_vector
+            else:
+                candidates = np.arange(rows)
+                scores = self._vectors[:rows] @ query_vector
+
+            valid = np.array([
+                i not in self._deleted and (not category_filter or self._rows[i].get('category') == category_filter)
+                for i in candidates.tolist()
+            ], dtype=bool)
+            scores = np.where(valid, scores, -np.inf)
+
+            # Over-fetch chunks since several may belong to the same document
+            k = min(len(scores), limit * 5)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results, seen = [], set()
+            for position in top.tolist():
+                score = float(scores[position])
+                if score < min_score:
+                    break
+                row = self._rows[int(candidates[position])]
+                if row['document_id'] in seen:
+                    continue
+                seen.add(row['document_id'])
+                results.append({**row, 'similarity': round(score, 4)})
+                if len(results) >= limit:
+                    break
+            return results
+
+    def document_ids(self):
+        """IDs of the documents with rows in the index"""
+        with self._lock:
+            self._refresh()
+            return {row['document_id'] for i, row in enumerate(self._rows) if i not in self._deleted}
+
+    def compact(self):
+        """Write the live rows to a new generation and switch to it"""
+        with self._exclusive():
+            rows = self._refresh()
+            keep = [i for i in range(rows) if i not in self._deleted]
+            vectors = np.asarray(self._vectors[keep]) if keep else np.zeros((0, self.dim), dtype=np.float32)
+            previous, generation = self.generation, self.generation + 1
+            directory = self._generation_dir(generation)
+            shutil.rmtree(directory, ignore_errors=True)  # Left over from a failed compaction
+            os.makedirs(directory)
+            with open(os.path.join(directory, 'vectors.f32'), 'wb') as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            with open(os.path.join(directory, 'rows.jsonl'), 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(self._rows[i]) + '\n' for i in keep)
+
+            with open(self.generation_path + '.tmp', 'w') as f:
+                f.write(f'{generation}\n')
+            os.replace(self.generation_path + '.tmp', self.generation_path)
+            if previous > 0:
+                self._remove_generation(previous - 1)
+            self._refresh()
+        logger.info('Vector index: compacted to %s rows in generation %s', len(keep), generation)
+        return len(keep)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex(
+                    str(getattr(settings, 'VECTOR_INDEX_DIR', 'vector_index')),
+                    get_embedder(),
+                    ann_threshold=getattr(settings, 'VECTOR_INDEX_ANN_THRESHOLD', 20000),
+                    nprobe=getattr(settings, 'VECTOR_INDEX_NPROBE', 8)
+                )
+    return _index
+
+
+def semantic_search(query, category_filter=None, limit=10):
+    """Search the local vector index; results use the Kendra result format"""
+    try:
+        matches = get_vector_index().search(query, category_filter=category_filter, limit=limit)
+    except Exception as e:
+        logger.error('Local semantic search failed: %s', e)
+        return []
+
+    documents = []
+    for match in matches:
+        bucket = next((name for threshold, name in SIMILARITY_BUCKETS if match['similarity'] >= threshold), 'LOW')
+        documents.append({
+            'id': match['document_id'],
+            'title': match.get('title', ''),
+            'excerpt': match.get('text', ''),
+            'score': bucket,
+            'similarity': match['similarity'],
+            'attributes': {
+                'category': match.get('category', ''),
+                'keywords': match.get('keywords', []),
+                's3_key': match.get('s3_key', ''),
+                'file_type': match.get('file_type', ''),
+                'upload_date': match.get('upload_date', ''),
+                'source': 'local_vector'
+            }
+        })
+    return documents
+
+
+def tiered_search(query, kendra_search, category_filter=None, limit=10):
+    """Combine Kendra with the local semantic tier per SEMANTIC_SEARCH_MODE.
+
+    kendra_search is a zero-argument callable returning Kendra results.
+      'off'      - Kendra only
+      'fallback' - local results only when Kendra finds nothing
+      'merge'    - Kendra results, then local ones Kendra did not return
+                   (covers documents still inside Kendra's indexing delay)
+      'primary'  - local results, Kendra only when the local tier is empty
+    """
+    mode = getattr(settings, 'SEMANTIC_SEARCH_MODE', 'fallback')
+    if mode == 'off':
+        return kendra_search()
+
+    if mode == 'primary':
+        results = semantic_search(query, category_filter, limit)
+        return results or kendra_search()
+
+    results = kendra_search()
+    if mode == 'merge':
+        seen = {doc.get('id') for doc in results}
+        results = results + [doc for doc in semantic_search(query, category_filter, limit)
+                             if doc['id'] not in seen]
+    elif not results:
+        results = semantic_search(query, category_filter, limit)
+        if results:
+            logger.info("Kendra returned nothing for '%s', served %s local results", query, len(results))
+    return results
+
+
+@receiver(document_deleted)
+def _remove_deleted_document(sender, document_id, **kwargs):
+    try:
+        get_vector_index().remove_document(document_id)
+    except Exception as e:
+        logger.error('Failed to remove %s from the vector index: %s', document_id, e)
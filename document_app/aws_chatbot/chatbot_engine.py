@@ -1,30 +1,32 @@
-import boto3
 import json
+import logging
 import re
 from django.conf import settings
-from ..aws_credential_keys.config import (
-    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, 
-    BEDROCK_REGION, BEDROCK_MODEL_ID, AWS_KENDRA_INDEX_ID
-)
-from ..aws_document_pipeline.kendra_database import KendraDatabase
+from ..aws_clients import get_client
+from ..aws_document_pipeline.search_backend import get_search_backend
+from ..aws_ai_search.vector_index import tiered_search
+from .. import instrumentation, llm_cache
+from ..query_cache import QueryCache
+from ..text_utils import SEARCH_STOP_WORDS
+from .intent_classifier import (CONTEXT_QUESTIONS, CONVERSATION, FOLLOW_UP, FOLLOW_UP_PRIORITY,
+                                FOLLOW_UP_TYPES, MESSAGE_INTENTS)
+from .prompt_context import PromptContext
+
+logger = logging.getLogger(__name__)
+
+# Text-to-speech clean-up (prepare_content_for_reading)
+WHITESPACE_RE = re.compile(r'\s+')
+ABBREVIATION_RE = re.compile(r'\b([A-Z]{2,})\b')
+LINE_END_RE = re.compile(r'([a-zA-Z])\s*\n')
+
+# Search answers, reused for paraphrases of an answered query
+search_answers = QueryCache('chatbot_search')
 
 class ChatbotEngine:
     def __init__(self):
-        self.kendra_client = boto3.client(
-            'kendra',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
-        )
+        self.bedrock_client = get_client('bedrock-runtime')
         
-        self.bedrock_client = boto3.client(
-            'bedrock-runtime',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=BEDROCK_REGION
-        )
-        
-        self.kendra_db = KendraDatabase()
+        self.search_backend = get_search_backend()
         
         # Intelligent Document Assistant
         self.system_prompt = """You are an intelligent document assistant that helps users find, analyze, and understand their documents.
@@ -58,119 +60,92 @@ You have access to a document database and can search, retrieve, and analyze con
             message = message.strip()
             document_context = context.get('document') if context else None
             last_response = context.get('lastResponse') if context else None
+            history = context.get('history') if context else None
 
             # Check if this is a follow-up question about a specific document
             if document_context and self.is_follow_up_question(message):
-                print(f"*** Handling follow-up question for document: {document_context.get('title', 'Unknown')} ***")
-                return self.perform_contextual_analysis(message, document_context, last_response)
+                logger.debug('Handling follow-up question for document: %s', document_context.get('title', 'Unknown'))
+                return self.perform_contextual_analysis(message, document_context, last_response, history=history)
 
             # Otherwise, proceed with the intelligent response flow
             return self.handle_intelligent_response(message)
                 
         except Exception as e:
-            print(f"Process message error: {e}")
+            logger.error('Process message error: %s', e)
             return {
                 'response': 'I encountered an issue processing your request. Please try again with a different phrasing, or let me know if you need help with document search, analysis, or uploads.',
                 'type': 'error'
             }
 
+    def converse(self, message, conversation, context=None):
+        """process_message with the context kept server-side in conversation
+        (document_app/aws_chatbot/conversation.py), which is updated and saved.
+
+        context from older clients (document, lastResponse) is still accepted;
+        a document in it becomes the conversation's document.
+        """
+        client_document = (context or {}).get('document')
+        if client_document and client_document.get('id'):
+            conversation.set_document(client_document)
+
+        server_context = None
+        if conversation.document:
+            server_context = {'history': conversation.history_text(), 'lastResponse': conversation.last_response}
+            # Full text only for follow-ups; it is cached per document
+            if self.is_follow_up_question(message.strip()):
+                server_context['document'] = conversation.document_context(self.search_backend)
+
+        response = self.process_message(message, context=server_context)
+
+        if response.get('type') == 'search' and response.get('document'):
+            conversation.set_document(response['document'])
+        conversation.add_turn('user', message.strip())
+        conversation.add_turn('assistant', response.get('response', ''))
+        try:
+            conversation.save()
+        except Exception as e:
+            logger.error('Failed to save conversation %s: %s', conversation.id, e)
+        return response
+
     def is_follow_up_question(self, message):
-        """Check if a message is a follow-up question using improved detection."""
-        follow_up_keywords = [
-            'analyze', 'summarize', 'explain', 'what are', 'provide', 'give me', 
-            'this file', 'the steps', 'troubleshooting', 'simplify', 'break down',
-            'how about', 'what about', 'can you', 'could you', 'tell me more',
-            'elaborate', 'expand on', 'more details', 'further', 'also',
-            'in addition', 'besides', 'furthermore', 'moreover', 'additionally',
-            'read this', 'read the', 'read for me', 'read aloud', 'read it',
-            'how do i', 'what should i do', 'can you provide', 'what steps'
-        ]
-        
-        # Check for follow-up phrases
-        follow_up_phrases = [
-            'how about the', 'what about the', 'can you simplify', 'could you simplify',
-            'tell me about the', 'explain the', 'what are the', 'break down the',
-            'simplify for me', 'make it simple', 'in simple terms',
-            'read this for me', 'read the document', 'read it aloud', 'read this aloud',
-            'how do i ensure', 'what should i do if', 'can you provide an example',
-            'what are the specific steps', 'what are the targeted', 'how to find'
-        ]
-        
-        message_lower = message.lower()
-        
-        # Check if this looks like a suggested question pattern
-        suggested_question_patterns = [
-            'how do i ensure that automatic updates',
-            'what should i do if my school-managed device',
-            'can you provide an example of how to',
-            'what are the specific steps',
-            'what are the targeted areas',
-            'what methods and materials should be used'
-        ]
-        
-        is_suggested_question = any(pattern in message_lower for pattern in suggested_question_patterns)
-        
-        # Check keywords
-        has_keywords = any(keyword in message_lower for keyword in follow_up_keywords)
-        
-        # Check phrases
-        has_phrases = any(phrase in message_lower for phrase in follow_up_phrases)
-        
-        # Check for pronouns that suggest reference to previous content
-        reference_pronouns = ['it', 'this', 'that', 'these', 'those', 'them']
-        has_references = any(pronoun in message_lower.split() for pronoun in reference_pronouns)
-        
-        # Special handling for standalone read requests
-        standalone_read_requests = ['read this', 'read it', 'read the document', 'read for me', 'read aloud']
-        is_read_request = any(request in message_lower for request in standalone_read_requests)
-        
-        return has_keywords or has_phrases or has_references or is_read_request or is_suggested_question
+        """Check if a message is a follow-up question about the open document"""
+        return FOLLOW_UP.matches(message, 'follow_up')
 
     def classify_follow_up_question(self, question):
         """Classify the type of follow-up question to provide better responses"""
-        question_lower = question.lower()
-        
-        # Read-aloud requests
-        if any(phrase in question_lower for phrase in ['read this', 'read the', 'read for me', 'read aloud', 'read it']):
-            return 'read_aloud'
-        
-        # Simplification requests
-        if any(word in question_lower for word in ['simplify', 'simple', 'break down', 'easy', 'plain', 'basic']):
-            return 'simplify'
-        
-        # Elaboration requests  
-        if any(word in question_lower for word in ['elaborate', 'more details', 'expand', 'tell me more', 'further']):
-            return 'elaborate'
-            
-        # Specific information requests
-        if any(word in question_lower for word in ['what are', 'how many', 'which', 'when', 'where', 'who']):
-            return 'specific'
-            
-        # Default
+        scores = FOLLOW_UP_TYPES.scores(question)
+        for question_type in FOLLOW_UP_PRIORITY:
+            if question_type in scores:
+                return question_type
         return 'general'
 
-    def perform_contextual_analysis(self, user_question, document_context, last_ai_response=None):
-        """Use Bedrock to answer a user's question based on a specific document's content and conversation history."""
+    def perform_contextual_analysis(self, user_question, document_context, last_ai_response=None, history=None):
+        """Use Bedrock to answer a user's question based on a specific document's content and conversation history.
+
+        history, the conversation so far (Conversation.history_text()), is
+        used in place of last_ai_response when given. Long documents are
+        sent as a summary plus the passages related to the question.
+        """
         try:
             doc_title = document_context.get('title', 'the document')
             doc_content = document_context.get('content', '')
             doc_id = document_context.get('id')
 
-            print(f"*** CONTEXTUAL ANALYSIS for '{doc_title}' ***")
-            print(f"*** USER QUESTION: '{user_question}' ***")
+            logger.debug("Contextual analysis for '%s'", doc_title)
+            logger.debug("User question: '%s'", user_question)
 
             # Heuristic to check if we have the full content or just an excerpt.
             # Excerpts from Kendra are often truncated with '...'.
             is_excerpt = len(doc_content) < 2000 and doc_content.endswith('...')
 
             if is_excerpt and doc_id:
-                print(f"*** Content for '{doc_title}' is just an excerpt. Fetching full document. ***")
-                full_doc = self.kendra_db.get_document_by_id(doc_id)
+                logger.debug("Content for '%s' is just an excerpt. Fetching full document.", doc_title)
+                full_doc = self.search_backend.get_document_by_id(doc_id)
                 if full_doc and full_doc.get('content'):
                     doc_content = full_doc['content']
-                    print(f"*** Successfully fetched full content ({len(doc_content)} chars). ***")
+                    logger.info('Successfully fetched full content (%s chars).', len(doc_content))
                 else:
-                    print(f"*** Could not fetch full content for document ID: {doc_id} ***")
+                    logger.debug('Could not fetch full content for document ID: %s', doc_id)
 
             if not doc_content:
                 return {
@@ -180,15 +155,7 @@ You have access to a document database and can search, retrieve, and analyze con
 
             # Detect the type of follow-up question to provide better responses
             question_type = self.classify_follow_up_question(user_question)
-            print(f"*** FOLLOW-UP TYPE: {question_type} ***")
-
-            # Build the history part of the prompt if it exists
-            history_prompt = ""
-            if last_ai_response:
-                history_prompt = (
-                    f"Previous conversation context:\n--- PREVIOUS RESPONSE ---\n{last_ai_response[:500]}\n--- END PREVIOUS RESPONSE ---\n\n"
-                    f"The user is now asking a follow-up question. Build upon the previous response but provide new insights."
-                )
+            logger.debug('Follow-up type: %s', question_type)
 
             # Construct specialized prompts based on question type
             if question_type == 'read_aloud':
@@ -202,35 +169,20 @@ You have access to a document database and can search, retrieve, and analyze con
             else:
                 task_instruction = "Provide a helpful response based on the document content."
 
-            # Construct the final, more intelligent prompt
-            prompt_lines = [
-                "You are an intelligent document assistant. Your task is to help the user understand the document content.",
-                history_prompt,
-                f"\n## Document: '{doc_title}' ##\n",
-                doc_content[:4000],
-                f"\n## User's Request ##\n",
-                f'"{user_question}"',
-                f"\n## Task ##\n{task_instruction}",
-                "\nProvide a clear, helpful response based ONLY on the document content above. If the document doesn't contain enough information to fully answer the question, say so and explain what information is available."
-            ]
-            prompt = "\n".join(prompt_lines)
-
             model_id = getattr(settings, 'BEDROCK_MODEL_ID', None)
             if not model_id:
                 return {'response': 'The AI model is not configured, so I cannot analyze the document.', 'type': 'error'}
 
-            # Adjust parameters based on question type
-            max_tokens = 800 if question_type == 'simplify' else 1000
-            temperature = 0.3 if question_type == 'simplify' else 0.2
+            if not history and last_ai_response:
+                history = f"Assistant: {last_ai_response[:500]}"
 
-            body = {
-                "messages": [{"role": "user", "content": [{"text": prompt}]}],
-                "inferenceConfig": {
-                    "maxTokens": max_tokens,
-                    "temperature": temperature,
-                    "topP": 0.9
-                }
-            }
+            # Stable document prefix (cacheable) + the per-turn message; see prompt_context.py
+            body = PromptContext(doc_title, doc_content, model_id).request(
+                user_question, task_instruction, history=history,
+                # Adjust parameters based on question type
+                max_tokens=800 if question_type == 'simplify' else 1000,
+                temperature=0.3 if question_type == 'simplify' else 0.2,
+            )
 
             response = self.bedrock_client.invoke_model(
                 modelId=model_id,
@@ -257,7 +209,7 @@ You have access to a document database and can search, retrieve, and analyze con
         try:
             # First, let LLM understand the intent and decide what to do
             intent_response = self.analyze_user_intent(message)
-            print(f"*** DETECTED INTENT: {intent_response} ***")
+            logger.debug('Detected intent: %s', intent_response)
             
             # Based on LLM analysis, perform appropriate actions
             if 'search_documents' in intent_response.lower():
@@ -271,14 +223,23 @@ You have access to a document database and can search, retrieve, and analyze con
                 return self.handle_conversational_response(message)
                 
         except Exception as e:
-            print(f"Intelligent response error: {e}")
+            logger.error('Intelligent response error: %s', e)
             return {
                 'response': 'I\'m having trouble understanding your request right now. Could you try rephrasing it? I can help you search for documents, analyze content, or guide you through uploads.',
                 'type': 'error'
             }
     
     def analyze_user_intent(self, message):
-        """Use LLM to analyze user intent with improved accuracy"""
+        """Action for a message: from the local classifier when it is
+        confident (CHATBOT_INTENT_CONFIDENCE), otherwise from the LLM"""
+        local_intent, confidence, score = MESSAGE_INTENTS.classify(message)
+        if (local_intent and confidence >= getattr(settings, 'CHATBOT_INTENT_CONFIDENCE', 0.75)
+                and score >= getattr(settings, 'CHATBOT_INTENT_MIN_SCORE', 1.0)):
+            self._count_intent('local', local_intent)
+            return local_intent
+        logger.debug('Local intent %s not confident (%.2f, score %.1f); asking the model',
+                     local_intent, confidence, score)
+
         intent_prompt = f"""You are an intelligent document assistant. Analyze the user's message and determine their intent.
 
 User message: "{message}"
@@ -296,8 +257,9 @@ Consider the context and keywords. Respond with ONLY the category name (SEARCH,
 Intent:"""
         
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+            response = llm_cache.invoke_model(
+                self.bedrock_client, 'chatbot.intent', message,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [
                         {
@@ -328,29 +290,20 @@ Intent:"""
                 'GREETING': 'general_conversation'
             }
             
-            return intent_mapping.get(intent, 'general_conversation')
+            action = intent_mapping.get(intent, 'general_conversation')
+            self._count_intent('model', action)
+            return action
             
         except Exception as e:
-            print(f"Intent analysis error: {e}")
-            # Fallback to keyword-based classification
-            message_lower = message.lower()
-            
-            # Check for identity/greeting questions first
-            identity_phrases = ['what is your name', 'who are you', 'what are you called', 'introduce yourself']
-            greeting_phrases = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'help', 'what can you do']
-            
-            if any(phrase in message_lower for phrase in identity_phrases + greeting_phrases):
-                return 'general_conversation'
-            elif any(word in message_lower for word in ['find', 'search', 'look for', 'show me', 'get']):
-                return 'search_documents'
-            elif any(word in message_lower for word in ['analyze', 'summarize', 'explain']):
-                return 'analyze_document'
-            elif any(word in message_lower for word in ['upload', 'add', 'submit']):
-                return 'upload_files'
-            elif any(phrase in message_lower for phrase in ['read this', 'read for me', 'read aloud']):
-                return 'general_conversation'  # Handle read requests in conversation
-            else:
-                return 'general_conversation'
+            logger.error('Intent analysis error: %s', e)
+            # Fall back to the local classifier's best guess
+            action = local_intent or 'general_conversation'
+            self._count_intent('fallback', action)
+            return action
+    
+    def _count_intent(self, source, intent):
+        instrumentation.metrics.inc('chatbot_intent_total', {'source': source, 'intent': intent},
+                                    help_text='Chatbot intents by classifier (local rules, model, fallback)')
     
     def handle_upload_guidance(self, message):
         """Handle upload requests with LLM response"""
@@ -365,7 +318,7 @@ Response:"""
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [
                         {
@@ -396,7 +349,14 @@ Response:"""
             }
     
     def perform_document_search(self, message):
-        """Perform intelligent document search with improved accuracy"""
+        """Perform intelligent document search with improved accuracy.
+
+        The answer is cached, and served again for the same query or a
+        near-duplicate of it (document_app/query_cache.py).
+        """
+        cached = search_answers.get(message)
+        if cached is not None:
+            return cached
         try:
             # Use LLM to understand what user is really looking for
             search_intent = self.analyze_search_intent(message)
@@ -404,29 +364,34 @@ Response:"""
             # Extract key terms using LLM
             search_terms = self.extract_intelligent_search_terms(message)
             
-            print(f"*** ORIGINAL QUERY: '{message}' ***")
-            print(f"*** SEARCH INTENT: '{search_intent}' ***")
-            print(f"*** EXTRACTED TERMS: '{search_terms}' ***")
+            logger.debug("Original query: '%s'", message)
+            logger.debug("Search intent: '%s'", search_intent)
+            logger.debug("Extracted terms: '%s'", search_terms)
             
             # Try multiple search strategies
             results = None
             
             # Strategy 1: Direct search with extracted terms
             if search_terms:
-                results = self.kendra_db.search_documents(search_terms, limit=10)
-                print(f"*** STRATEGY 1 RESULTS: {len(results) if results else 0} ***")
+                results = self.search_backend.search_documents(search_terms, limit=10)
+                logger.debug('Strategy 1 results: %s', len(results) if results else 0)
             
             # Strategy 2: Enhanced query if no results
             if not results:
                 enhanced_query = self.enhance_search_query(message)
-                results = self.kendra_db.search_documents(enhanced_query, limit=10)
-                print(f"*** STRATEGY 2 RESULTS: {len(results) if results else 0} ***")
+                results = self.search_backend.search_documents(enhanced_query, limit=10)
+                logger.debug('Strategy 2 results: %s', len(results) if results else 0)
             
             # Strategy 3: Broader search if still no results
             if not results:
                 broader_query = self.create_broader_query(message)
-                results = self.kendra_db.search_documents(broader_query, limit=10)
-                print(f"*** STRATEGY 3 RESULTS: {len(results) if results else 0} ***")
+                results = self.search_backend.search_documents(broader_query, limit=10)
+                logger.debug('Strategy 3 results: %s', len(results) if results else 0)
+            
+            # Strategy 4: Local semantic index (documents Kendra has not indexed yet)
+            if not results:
+                results = tiered_search(message, lambda: [], limit=10)
+                logger.debug('Strategy 4 results: %s', len(results) if results else 0)
             
             if not results:
                 return self.generate_helpful_no_results_response(message)
@@ -440,16 +405,18 @@ Response:"""
             # Format document properly
             formatted_doc = self.format_document_result(best_match)
             
-            print(f"*** FINAL RESULT: {formatted_doc['title']} ***")
+            logger.debug('Final result: %s', formatted_doc['title'])
             
-            return {
+            answer = {
                 'response': response_text,
                 'document': formatted_doc,
                 'type': 'search'
             }
+            search_answers.set(message, answer)
+            return answer
             
         except Exception as e:
-            print(f"Search error: {e}")
+            logger.error('Search error: %s', e)
             return {
                 'response': 'I encountered an issue while searching. Please try rephrasing your query or check if documents are uploaded.',
                 'document': None,
@@ -471,8 +438,9 @@ Extract 3-5 key terms that would be most effective for finding relevant document
 Provide only the key terms separated by spaces, no explanations:"""
         
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+            response = llm_cache.invoke_model(
+                self.bedrock_client, 'chatbot.search_terms', message,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -491,7 +459,7 @@ Provide only the key terms separated by spaces, no explanations:"""
             return terms if terms else message
             
         except Exception as e:
-            print(f"Term extraction error: {e}")
+            logger.error('Term extraction error: %s', e)
             return self.extract_search_terms(message)  # Fallback to original method
     
     def select_best_result(self, query, results):
@@ -522,8 +490,9 @@ Which result number (1-{len(result_summaries)}) is most relevant to the user's q
 Respond with only the number:"""
         
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+            response = llm_cache.invoke_model(
+                self.bedrock_client, 'chatbot.select_result', [query, result_summaries],
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -549,7 +518,7 @@ Respond with only the number:"""
                 pass
                 
         except Exception as e:
-            print(f"Result selection error: {e}")
+            logger.error('Result selection error: %s', e)
             
         # Fallback to first result
         return results[0]
@@ -595,7 +564,7 @@ Keep it concise and professional:"""
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -613,7 +582,7 @@ Keep it concise and professional:"""
             return response_body['output']['message']['content'][0]['text'].strip()
             
         except Exception as e:
-            print(f"Response generation error: {e}")
+            logger.error('Response generation error: %s', e)
             return f'Found: "{doc_title}" (Category: {doc_category}) - This document appears relevant to your query about {query}.'
     
     def generate_query_suggestions(self, doc_title, doc_excerpt, original_query):
@@ -639,8 +608,9 @@ Format as:
 Make the questions clearly reference the document content so they are treated as follow-up questions:"""
         
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+            response = llm_cache.invoke_model(
+                self.bedrock_client, 'chatbot.query_suggestions', [doc_title, doc_excerpt[:300], original_query],
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -658,7 +628,7 @@ Make the questions clearly reference the document content so they are treated as
             return response_body['output']['message']['content'][0]['text'].strip()
             
         except Exception as e:
-            print(f"Suggestion generation error: {e}")
+            logger.error('Suggestion generation error: %s', e)
             # Fallback suggestions based on document type
             return self.generate_fallback_suggestions(doc_title, original_query)
     
@@ -692,7 +662,7 @@ Rewrite the content to be:
 Provide the reading-friendly version:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -717,7 +687,7 @@ Provide the reading-friendly version:"""
             }
             
         except Exception as e:
-            print(f"Read aloud error: {e}")
+            logger.error('Read aloud error: %s', e)
             # Fallback to basic content reading
             clean_content = self.prepare_content_for_reading(doc_content)[:1000]
             return {
@@ -732,16 +702,14 @@ Provide the reading-friendly version:"""
             return "No content available to read."
         
         # Basic cleaning for better TTS
-        import re
-        
         # Remove excessive whitespace
-        content = re.sub(r'\s+', ' ', content)
+        content = WHITESPACE_RE.sub(' ', content)
         
         # Add periods after abbreviations for better TTS pauses
-        content = re.sub(r'\b([A-Z]{2,})\b', r'\1.', content)
+        content = ABBREVIATION_RE.sub(r'\1.', content)
         
         # Ensure sentences end with periods
-        content = re.sub(r'([a-zA-Z])\s*\n', r'\1. ', content)
+        content = LINE_END_RE.sub(r'\1. ', content)
         
         # Replace special characters that might confuse TTS
         content = content.replace('&', ' and ')
@@ -765,7 +733,7 @@ Be helpful and specific:"""
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -789,7 +757,7 @@ Be helpful and specific:"""
             }
             
         except Exception as e:
-            print(f"No results response error: {e}")
+            logger.error('No results response error: %s', e)
             return {
                 'response': f'No documents found for "{query}". Try using more specific keywords, check spelling, or verify that relevant documents have been uploaded.',
                 'document': None,
@@ -834,7 +802,7 @@ Provide concise analysis:"""
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -878,7 +846,7 @@ Provide a brief, helpful response explaining what was found and how it relates t
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -918,7 +886,7 @@ Provide a brief, helpful response explaining what was found and how it relates t
     def perform_document_analysis(self, message):
         """Perform intelligent document analysis"""
         doc_name = self.extract_document_name(message)
-        results = self.kendra_db.search_documents(doc_name, limit=1)
+        results = self.search_backend.search_documents(doc_name, limit=1)
         
         if not results:
             # Use LLM to respond intelligently when document not found
@@ -931,7 +899,7 @@ Response:"""
             
             try:
                 response = self.bedrock_client.invoke_model(
-                    modelId=BEDROCK_MODEL_ID,
+                    modelId=settings.BEDROCK_MODEL_ID,
                     body=json.dumps({
                         "messages": [
                             {
@@ -973,11 +941,10 @@ Response:"""
         """Handle general conversation with improved intelligence"""
         try:
             # Handle common queries with predefined intelligent responses
-            message_lower = message.lower()
+            kinds = CONVERSATION.scores(message)
             
             # Identity questions
-            identity_phrases = ['what is your name', 'who are you', 'what are you called', 'introduce yourself', 'tell me about yourself']
-            if any(phrase in message_lower for phrase in identity_phrases):
+            if 'identity' in kinds:
                 return {
                     'response': 'I\'m your intelligent document assistant! I help you find, analyze, and understand your documents. I can search through your document library, provide summaries, answer questions about content, and even read documents aloud for you. How can I assist you today?',
                     'sources': None,
@@ -985,7 +952,7 @@ Response:"""
                 }
             
             # Capability questions
-            if any(phrase in message_lower for phrase in ['what can you do', 'help me', 'how can you help', 'capabilities']):
+            if 'capabilities' in kinds:
                 return {
                     'response': 'I can help you with document management tasks:\n\n• Search for specific documents using keywords\n• Analyze and summarize document content\n• Answer questions based on your documents\n• Guide you through document uploads\n• Navigate through search results\n• Read documents aloud for accessibility\n\nWhat would you like to do?',
                     'sources': None,
@@ -993,7 +960,7 @@ Response:"""
                 }
             
             # Greetings with context
-            if any(greeting in message_lower for greeting in ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'selamat pagi', 'selamat petang']):
+            if 'greeting' in kinds:
                 return {
                     'response': 'Hello! I\'m your document assistant. I can help you search, analyze, and navigate your documents. What are you looking for today?',
                     'sources': None,
@@ -1008,7 +975,7 @@ Response:"""
             return self.generate_helpful_guidance(message)
             
         except Exception as e:
-            print(f"Conversational response error: {e}")
+            logger.error('Conversational response error: %s', e)
             return {
                 'response': 'I\'m here to help you with your documents. You can ask me to search for specific documents, analyze content, or answer questions about your files. What would you like to do?',
                 'type': 'general'
@@ -1016,28 +983,16 @@ Response:"""
     
     def is_question_needing_context(self, message):
         """Determine if a message is a question that might need document context"""
-        message_lower = message.lower()
-        
-        # Exclude identity and capability questions
-        identity_phrases = ['what is your name', 'who are you', 'what are you called', 'what can you do', 'how can you help']
-        if any(phrase in message_lower for phrase in identity_phrases):
-            return False
-        
-        # Check for document-related questions
-        document_question_indicators = [
-            'what does this document say', 'what is in the document', 'how to do', 
-            'what are the steps', 'what are the procedures', 'what are the requirements',
-            'when should', 'where can I find', 'which document', 'how do I'
-        ]
-        
-        return any(indicator in message_lower for indicator in document_question_indicators)
+        kinds = CONTEXT_QUESTIONS.scores(message)
+        # Identity and capability questions are answered without documents
+        return 'document' in kinds and 'not_document' not in kinds
     
     def handle_contextual_question(self, message):
         """Handle questions that might need document context"""
         try:
             # Search for relevant context
             search_terms = self.extract_intelligent_search_terms(message)
-            results = self.kendra_db.search_documents(search_terms, limit=3)
+            results = self.search_backend.search_documents(search_terms, limit=3)
             
             if not results:
                 return {
@@ -1062,7 +1017,7 @@ Document context from "{doc_title}":
 Provide a helpful answer based on the context. If the context doesn't fully answer the question, say so and suggest what additional information might be needed:"""
             
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -1086,7 +1041,7 @@ Provide a helpful answer based on the context. If the context doesn't fully answ
             }
             
         except Exception as e:
-            print(f"Contextual question error: {e}")
+            logger.error('Contextual question error: %s', e)
             return {
                 'response': 'I can help answer questions based on your documents. Try searching for specific topics or uploading relevant documents first.',
                 'type': 'general'
@@ -1105,7 +1060,7 @@ Keep it friendly, professional, and focused on document assistance:"""
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [{
                         "role": "user",
@@ -1129,7 +1084,7 @@ Keep it friendly, professional, and focused on document assistance:"""
             }
             
         except Exception as e:
-            print(f"Guidance generation error: {e}")
+            logger.error('Guidance generation error: %s', e)
             return {
                 'response': 'I can help you search for documents, analyze content, or answer questions about your files. What specific information are you looking for?',
                 'type': 'general'
@@ -1177,7 +1132,7 @@ Analysis:"""
         
         try:
             response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
+                modelId=settings.BEDROCK_MODEL_ID,
                 body=json.dumps({
                     "messages": [
                         {
@@ -1258,11 +1213,8 @@ Analysis:"""
     def extract_search_terms(self, message):
         """Extract search terms with manufacturing context awareness"""
         # Simple but effective term extraction
-        stop_words = {'search', 'find', 'look', 'for', 'the', 'a', 'an', 'show', 'me', 'get', 'retrieve', 
-                     'where', 'is', 'are', 'can', 'you', 'please', 'help', 'i', 'want', 'need', 'document'}
-        
         words = message.lower().split()
-        filtered_words = [w for w in words if w not in stop_words and len(w) > 2]
+        filtered_words = [w for w in words if w not in SEARCH_STOP_WORDS and len(w) > 2]
         
         # If we have good keywords, use them
         if filtered_words:
@@ -0,0 +1,194 @@
+"""Server-side chatbot conversations.
+
+A Conversation holds what follow-up questions need: the document the
+conversation is about, and the history, as recent turns plus a compacted
+summary of older ones within CHATBOT_HISTORY_TOKEN_BUDGET. Conversations
+live in the shared cache under a random id handed to the client, so the
+client sends only its message and that id. A conversation belongs to the
+session that started it; the id is not honoured for any other session.
+
+Two messages in one conversation can be answered concurrently. Each save()
+carries a version number: a request that finds a newer version stored than
+the one it loaded replays its own changes on top of it, so neither turn is
+lost. Saves take a short lease (best-effort on FileBasedCache, see
+document_app/cache.py) so the re-read and the write are not interleaved.
+
+The full text of a document is cached once per document (not per
+conversation) by document_text(), so follow-ups about the same document,
+from any session, reuse it without another search backend lookup. Stored
+and deleted documents drop their cached text.
+"""
+import logging
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from ..cache import Namespace
+from ..signals import document_deleted, document_stored
+
+logger = logging.getLogger(__name__)
+
+conversations = Namespace('conversations')
+document_texts = Namespace('document_text')
+
+CONVERSATION_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+SUMMARY_LINE_CHARS = 160
+SAVE_LEASE_TTL = 5
+SAVE_WAIT = 2.0
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _compact(role, text):
+    """One summary line for a turn: its first sentence, shortened"""
+    first = SENTENCE_END_RE.split(' '.join(text.split()), maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS].rsplit(' ', 1)[0] + '...'
+    return f"{'User' if role == 'user' else 'Assistant'}: {first}"
+
+
+class Conversation:
+    """One chat conversation; load() it, change it, save() it"""
+
+    def __init__(self, conversation_id=None, state=None, session=None):
+        self.id = conversation_id or uuid.uuid4().hex
+        self.session = session
+        self._changes = []  # (method, args) applied since load, replayed by save()
+        self._apply_state(state or {})
+
+    def _apply_state(self, state):
+        self.document = state.get('document')  # id, title, attributes, excerpt
+        self.turns = state.get('turns', [])  # [{'role': 'user' | 'assistant', 'text': ...}]
+        self.summary = state.get('summary', [])  # Compacted lines for older turns
+        self.version = state.get('version', 0)
+
+    @classmethod
+    def load(cls, conversation_id, session=None):
+        """The stored conversation, or a new one for an unknown or invalid id
+        or one started by another session"""
+        if conversation_id and CONVERSATION_ID_RE.match(str(conversation_id)):
+            state = conversations.get(conversation_id)
+            if state is not None and state.get('session') == session:
+                return cls(conversation_id, state, session)
+            if state is not None:
+                logger.warning('Conversation %s requested by another session; starting a new one', conversation_id)
+        return cls(session=session)
+
+    def save(self):
+        """Store the conversation, on top of any version saved since load()"""
+        backend = conversations.backend
+        lease = conversations.key(self.id, 'lease')
+        deadline = time.monotonic() + SAVE_WAIT
+        leased = backend.add(lease, 1, SAVE_LEASE_TTL)
+        while not leased and time.monotonic() < deadline:
+            time.sleep(0.02)
+            leased = backend.add(lease, 1, SAVE_LEASE_TTL)
+        try:
+            stored = conversations.get(self.id)
+            if stored is not None and stored.get('version', 0) != self.version:
+                self._rebase(stored)
+            self.version += 1
+            conversations.set(self.id, {
+                'session': self.session,
+                'version': self.version,
+                'document': self.document,
+                'turns': self.turns,
+                'summary': self.summary,
+                'updated': time.time(),
+            }, getattr(settings, 'CHATBOT_CONVERSATION_TTL', 7200))
+            self._changes = []
+        finally:
+            if leased:
+                backend.delete(lease)
+
+    def _rebase(self, stored):
+        """Replay this request's changes on the newer stored state"""
+        changes = self._changes
+        self._apply_state(stored)
+        self._changes = []
+        for method, args in changes:
+            getattr(self, method)(*args)
+        logger.debug('Conversation %s changed concurrently; merged %d changes', self.id, len(changes))
+
+    def set_document(self, document):
+        """Make document (a chatbot search result) the conversation's subject;
+        the history about the previous document no longer applies"""
+        self._changes.append(('set_document', (document,)))
+        if self.document and self.document.get('id') == document.get('id'):
+            return
+        self.document = {
+            'id': document.get('id'),
+            'title': document.get('title', 'the document'),
+            'attributes': document.get('attributes', {}),
+            'excerpt': document.get('full_content') or document.get('content') or document.get('excerpt', ''),
+        }
+        self.turns = []
+        self.summary = []
+
+    @property
+    def last_response(self):
+        for turn in reversed(self.turns):
+            if turn['role'] == 'assistant':
+                return turn['text']
+        return None
+
+    def add_turn(self, role, text):
+        """Append a turn, folding the oldest into the summary past the budget"""
+        self._changes.append(('add_turn', (role, text)))
+        self.turns.append({'role': role, 'text': text or ''})
+        budget = getattr(settings, 'CHATBOT_HISTORY_TOKEN_BUDGET', 600)
+        while len(self.turns) > 2 and sum(estimate_tokens(turn['text']) for turn in self.turns) > budget:
+            turn = self.turns.pop(0)
+            self.summary.append(_compact(turn['role'], turn['text']))
+        # The summary gets a third of the budget; its oldest lines go first
+        while self.summary and sum(estimate_tokens(line) for line in self.summary) > budget // 3:
+            self.summary.pop(0)
+
+    def history_text(self):
+        """History for a prompt: summary lines, then the recent turns"""
+        lines = []
+        if self.summary:
+            lines.append('Earlier in this conversation:')
+            lines.extend(f'- {line}' for line in self.summary)
+        # The last two turns are always kept; a long one is cut to half the budget
+        max_chars = getattr(settings, 'CHATBOT_HISTORY_TOKEN_BUDGET', 600) * 2
+        for turn in self.turns:
+            text = turn['text'] if len(turn['text']) <= max_chars else turn['text'][:max_chars] + '...'
+            lines.append(f"{'User' if turn['role'] == 'user' else 'Assistant'}: {text}")
+        return '\n'.join(lines)
+
+    def document_context(self, search_backend):
+        """The conversation's document with its full text, for follow-ups"""
+        if not self.document:
+            return None
+        content = document_text(self.document['id'], search_backend) or self.document.get('excerpt', '')
+        return {**self.document, 'content': content}
+
+
+def document_text(document_id, search_backend):
+    """Full text of a document, fetched from the search backend once per
+    CHATBOT_DOCUMENT_TEXT_TTL and shared by all conversations"""
+    if not document_id:
+        return ''
+
+    def fetch():
+        document = search_backend.get_document_by_id(document_id)
+        return (document or {}).get('content', '')
+
+    return document_texts.get_or_set(document_id, fetch, getattr(settings, 'CHATBOT_DOCUMENT_TEXT_TTL', 3600))
+
+
+@receiver(document_stored)
+@receiver(document_deleted)
+def _forget_document_text(sender, document_id, **kwargs):
+    try:
+        document_texts.delete(document_id)
+    except Exception as e:
+        logger.error('Failed to drop cached text for %s: %s', document_id, e)
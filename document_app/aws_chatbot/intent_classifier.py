@@ -0,0 +1,146 @@
+"""Rule-based intent classification for the chatbot.
+
+Each classifier compiles its whole phrase table into one regular
+expression, so a message is scanned once, in C, however many phrases there
+are. Phrases match on word boundaries ('hi' no longer matches inside
+'this'). Every phrase carries weights for one or more intents; a message's
+score for an intent is the sum of the weights of the phrases found in it,
+and classify() reports the best intent with its share of the total score
+as the confidence.
+
+The tables below replace the phrase lists ChatbotEngine used to rebuild
+and scan one by one for every message.
+"""
+import re
+from collections import defaultdict
+
+
+class IntentClassifier:
+    """Weighted multi-phrase matcher.
+
+    rules maps intent -> {phrase: weight}. A phrase found in a message also
+    counts every shorter listed phrase it starts with ('read this' counts
+    'read' too), because the scan reports one match per position.
+    """
+
+    def __init__(self, rules):
+        weights = defaultdict(dict)
+        for intent, phrases in rules.items():
+            for phrase, weight in phrases.items():
+                weights[phrase.lower()][intent] = weight
+        for phrase, intents in weights.items():
+            for shorter, shorter_intents in weights.items():
+                if shorter != phrase and phrase.startswith(shorter + ' '):
+                    for intent, weight in shorter_intents.items():
+                        intents.setdefault(intent, weight)
+        self.weights = dict(weights)
+        alternatives = '|'.join(re.escape(phrase) for phrase in sorted(self.weights, key=len, reverse=True))
+        # The lookahead reports the longest phrase at every position, overlapping ones included
+        self._pattern = re.compile(rf'(?=(?<!\w)({alternatives})(?!\w))')
+
+    def phrases(self, text):
+        """Listed phrases found in text, in order"""
+        return [match.group(1) for match in self._pattern.finditer(text.lower())]
+
+    def scores(self, text):
+        """intent -> summed weight of its phrases in text"""
+        scores = defaultdict(float)
+        for phrase in set(self.phrases(text)):
+            for intent, weight in self.weights[phrase].items():
+                scores[intent] += weight
+        return dict(scores)
+
+    def matches(self, text, intent):
+        return self.scores(text).get(intent, 0) > 0
+
+    def classify(self, text):
+        """(intent, confidence, score) for the best-scoring intent, or
+        (None, 0.0, 0.0) when no phrase matches"""
+        scores = self.scores(text)
+        if not scores:
+            return None, 0.0, 0.0
+        intent, score = max(scores.items(), key=lambda item: item[1])
+        return intent, score / sum(scores.values()), score
+
+
+def _weighted(weight, phrases):
+    return {phrase: weight for phrase in phrases}
+
+
+IDENTITY_PHRASES = ['what is your name', 'who are you', 'what are you called', 'introduce yourself',
+                    'tell me about yourself']
+CAPABILITY_PHRASES = ['what can you do', 'help me', 'how can you help', 'capabilities']
+GREETING_PHRASES = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'selamat pagi', 'selamat petang']
+READ_ALOUD_PHRASES = ['read this', 'read the', 'read for me', 'read aloud', 'read it', 'read the document']
+
+# Top-level intent of a new message, keyed by the action ChatbotEngine takes.
+# Ambiguous words weigh less, so a message using them alone, or mixing
+# intents, is not confident and goes to the model.
+MESSAGE_INTENTS = IntentClassifier({
+    'search_documents': {
+        **_weighted(1.0, ['find', 'search', 'search for', 'look for', 'looking for', 'show me', 'where is',
+                          'where can i find', 'which document', 'documents about', 'documents on']),
+        **_weighted(0.6, ['how to', 'how do i', 'what are the steps', 'what are the procedures',
+                          'what are the requirements', 'when should', 'procedure for']),
+        **_weighted(0.3, ['get', 'list']),
+    },
+    'analyze_document': {
+        **_weighted(1.0, ['analyze', 'analyse', 'summarize', 'summarise', 'summary of']),
+        **_weighted(0.6, ['explain', 'what does', 'tell me about']),
+    },
+    'upload_files': {
+        **_weighted(1.0, ['upload', 'uploading']),
+        **_weighted(0.4, ['add', 'submit', 'import']),
+    },
+    'general_conversation': {
+        **_weighted(1.0, IDENTITY_PHRASES + CAPABILITY_PHRASES + GREETING_PHRASES + READ_ALOUD_PHRASES),
+        'help': 0.6,
+    },
+})
+
+# Conversational messages that get a canned reply
+CONVERSATION = IntentClassifier({
+    'identity': _weighted(1.0, IDENTITY_PHRASES),
+    'capabilities': _weighted(1.0, CAPABILITY_PHRASES),
+    'greeting': _weighted(1.0, GREETING_PHRASES),
+})
+
+# Whether a message sent with a document open refers to that document
+FOLLOW_UP = IntentClassifier({
+    'follow_up': _weighted(1.0, [
+        'analyze', 'summarize', 'explain', 'what are', 'provide', 'give me',
+        'this file', 'the steps', 'troubleshooting', 'simplify', 'break down',
+        'how about', 'what about', 'can you', 'could you', 'tell me more',
+        'elaborate', 'expand on', 'more details', 'further', 'also',
+        'in addition', 'besides', 'furthermore', 'moreover', 'additionally',
+        'how do i', 'what should i do', 'can you provide', 'what steps',
+        'how about the', 'what about the', 'can you simplify', 'could you simplify',
+        'tell me about the', 'explain the', 'what are the', 'break down the',
+        'simplify for me', 'make it simple', 'in simple terms',
+        'read this for me', 'read it aloud', 'read this aloud',
+        'how do i ensure', 'what should i do if', 'can you provide an example',
+        'what are the specific steps', 'what are the targeted', 'how to find',
+        'what methods and materials should be used',
+        # Pronouns referring back to the open document
+        'it', 'this', 'that', 'these', 'those', 'them',
+    ] + READ_ALOUD_PHRASES),
+})
+
+# Kind of follow-up; the first matching kind in FOLLOW_UP_PRIORITY wins
+FOLLOW_UP_TYPES = IntentClassifier({
+    'read_aloud': _weighted(1.0, READ_ALOUD_PHRASES),
+    'simplify': _weighted(1.0, ['simplify', 'simple', 'break down', 'easy', 'plain', 'basic']),
+    'elaborate': _weighted(1.0, ['elaborate', 'more details', 'expand', 'expand on', 'tell me more', 'further']),
+    'specific': _weighted(1.0, ['what are', 'how many', 'which', 'when', 'where', 'who']),
+})
+FOLLOW_UP_PRIORITY = ['read_aloud', 'simplify', 'elaborate', 'specific']
+
+# Questions that should be answered from document content
+CONTEXT_QUESTIONS = IntentClassifier({
+    'not_document': _weighted(1.0, IDENTITY_PHRASES + ['what can you do', 'how can you help']),
+    'document': _weighted(1.0, [
+        'what does this document say', 'what is in the document', 'how to do',
+        'what are the steps', 'what are the procedures', 'what are the requirements',
+        'when should', 'where can i find', 'which document', 'how do i',
+    ]),
+})
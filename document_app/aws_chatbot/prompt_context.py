@@ -0,0 +1,159 @@
+"""Bedrock requests for follow-up questions about one document.
+
+A follow-up request is split into a stable prefix, the system blocks holding
+the instructions and the document, and a variable user message holding the
+history, the question and the task. The prefix is byte-identical for every
+follow-up about the same document, from any conversation, so models that
+support Bedrock prompt caching (BEDROCK_PROMPT_CACHE_MIN_TOKENS) get a cache
+point after it and are billed and timed for it only once per cache period.
+Bedrock ignores a cache point before the model's minimum prefix length, so
+one is only added when the prefix reaches it.
+
+Documents longer than CHATBOT_DOCUMENT_CONTEXT_CHARS are not sent whole:
+the prefix carries an extractive summary (the sentences with the most
+frequent content words, in document order), computed locally once per
+document text and cached, and the user message adds the few sentences that
+share the most words with the question. The document text never exceeds
+MAX_DOCUMENT_CONTEXT_CHARS, the cap follow-up prompts had before, and is not
+padded to reach a cache minimum: only prefixes long enough on their own get
+a cache point.
+"""
+import hashlib
+import logging
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+
+from ..cache import Namespace
+from ..text_utils import content_terms
+from .conversation import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+summaries = Namespace('document_summary')
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\s*\n\s*')
+MIN_SENTENCE_WORDS = 3
+# Upper bound on CHATBOT_DOCUMENT_CONTEXT_CHARS: the document text follow-ups sent before
+MAX_DOCUMENT_CONTEXT_CHARS = 4000
+
+INSTRUCTIONS = (
+    "You are an intelligent document assistant. Your task is to help the user understand the document content.\n"
+    "Provide a clear, helpful response based ONLY on the document content below. If the document doesn't "
+    "contain enough information to fully answer the question, say so and explain what information is available."
+)
+
+
+def _sentences(text):
+    return [sentence for sentence in SENTENCE_SPLIT_RE.split(text)
+            if len(sentence.split()) >= MIN_SENTENCE_WORDS]
+
+
+def extractive_summary(text, max_chars):
+    """The highest-scoring sentences of text, in their original order,
+    within max_chars. A sentence scores the average document frequency of
+    its content words (damped for long sentences), with a bonus for the
+    opening sentences, which usually state what the document is about."""
+    sentences = _sentences(text)
+    frequency = Counter(content_terms(text))
+    if not sentences or not frequency:
+        return text[:max_chars]
+    top = frequency.most_common(1)[0][1]
+
+    def score(position, sentence):
+        terms = set(content_terms(sentence))
+        if not terms:
+            return 0.0
+        value = sum(frequency[term] / top for term in terms) / math.sqrt(len(terms))
+        return value * (1.5 if position < 3 else 1.0)
+
+    ranked = sorted(enumerate(sentences), key=lambda item: score(*item), reverse=True)
+    chosen, used = [], 0
+    for position, sentence in ranked:
+        if used + len(sentence) + 1 <= max_chars:
+            chosen.append(position)
+            used += len(sentence) + 1
+    return '\n'.join(sentences[position] for position in sorted(chosen))
+
+
+def relevant_passages(text, question, max_chars, exclude=''):
+    """Sentences of text sharing the most content words with question,
+    within max_chars, leaving out those already in exclude"""
+    wanted = set(content_terms(question))
+    if not wanted:
+        return ''
+    scored = []
+    for position, sentence in enumerate(_sentences(text)):
+        overlap = len(wanted.intersection(content_terms(sentence)))
+        if overlap and sentence not in exclude:
+            scored.append((overlap, -position, sentence))
+    chosen, used = [], 0
+    for _, position, sentence in sorted(scored, reverse=True):
+        if used + len(sentence) + 1 <= max_chars:
+            chosen.append((-position, sentence))
+            used += len(sentence) + 1
+    return '\n'.join(sentence for _, sentence in sorted(chosen))
+
+
+def document_summary(content, max_chars):
+    """extractive_summary() of content, cached by content hash"""
+    key = f"{hashlib.md5(content.encode('utf-8')).hexdigest()}:{max_chars}"
+    return summaries.get_or_set(key, lambda: extractive_summary(content, max_chars),
+                                getattr(settings, 'CHATBOT_DOCUMENT_TEXT_TTL', 3600))
+
+
+def prompt_cache_minimum(model_id):
+    """Minimum cacheable prefix of model_id in tokens, or None when the model
+    has no prompt caching (or it is turned off)"""
+    if not getattr(settings, 'BEDROCK_PROMPT_CACHING', True) or not model_id:
+        return None
+    for family, minimum in getattr(settings, 'BEDROCK_PROMPT_CACHE_MIN_TOKENS', {}).items():
+        if family in model_id:
+            return minimum
+    return None
+
+
+class PromptContext:
+    """The stable prefix for one document, and the requests built on it"""
+
+    def __init__(self, title, content, model_id=None):
+        self.title = title
+        self.content = content
+        self.cache_minimum = prompt_cache_minimum(model_id)
+        max_chars = min(getattr(settings, 'CHATBOT_DOCUMENT_CONTEXT_CHARS', 2500), MAX_DOCUMENT_CONTEXT_CHARS)
+        self.summarized = len(content) > max_chars
+        self.document_text = document_summary(content, max_chars) if self.summarized else content
+        self.prefix = f"{INSTRUCTIONS}\n\n## Document: '{title}' ##\n{self.document_text}"
+
+    @property
+    def cacheable(self):
+        return bool(self.cache_minimum) and estimate_tokens(self.prefix) >= self.cache_minimum
+
+    def request(self, question, task_instruction, history=None, max_tokens=1000, temperature=0.2):
+        """Nova messages request body for one follow-up question"""
+        system = [{'text': self.prefix}]
+        if self.cacheable:
+            system.append({'cachePoint': {'type': 'default'}})
+
+        parts = []
+        if history:
+            parts.append(
+                f"Previous conversation context:\n--- CONVERSATION ---\n{history}\n--- END CONVERSATION ---\n\n"
+                "The user is now asking a follow-up question. Build upon the previous response but provide new insights."
+            )
+        if self.summarized:
+            passages = relevant_passages(self.content, question,
+                                         getattr(settings, 'CHATBOT_RELEVANT_PASSAGE_CHARS', 800),
+                                         exclude=self.document_text)
+            if passages:
+                parts.append(f"## More from the document, related to the request ##\n{passages}")
+        parts.append(f'## User\'s Request ##\n"{question}"')
+        parts.append(f"## Task ##\n{task_instruction}")
+
+        return {
+            'system': system,
+            'messages': [{'role': 'user', 'content': [{'text': '\n\n'.join(parts)}]}],
+            'inferenceConfig': {'maxTokens': max_tokens, 'temperature': temperature, 'topP': 0.9},
+        }
@@ -0,0 +1,140 @@
+"""Process-wide registry of AWS clients and resources.
+
+boto3 clients are thread-safe but slow to create (endpoint and credential
+resolution), so one client per (service, region) is shared by the whole
+process. boto3 resources are not thread-safe and are kept per thread.
+
+Replacements can be installed per service with install(), e.g. the fakes in
+document_app.aws_stubs; with settings.AWS_STUBS = True they are installed
+automatically on first use, so the app runs without AWS.
+
+Clients created here are hooked into document_app.instrumentation, so
+every call is recorded against the request that made it. Operations listed
+in settings.AWS_COALESCE_OPERATIONS are wrapped so identical concurrent
+calls share one upstream request (document_app.singleflight).
+"""
+import logging
+import threading
+
+import boto3
+from django.conf import settings
+
+from .instrumentation import instrument_client
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_overrides = {}
+_coalescing = {}
+_lock = threading.Lock()
+_local = threading.local()
+_stubs_loaded = False
+
+
+def default_region(service):
+    if service == 'bedrock-runtime':
+        return getattr(settings, 'BEDROCK_REGION', 'us-east-1').strip() or 'us-east-1'
+    return getattr(settings, 'AWS_REGION', 'ap-southeast-1').strip() or 'ap-southeast-1'
+
+
+def _session_config(region_name):
+    config = {
+        'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
+        'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
+        'region_name': region_name
+    }
+    if getattr(settings, 'AWS_SESSION_TOKEN', None):
+        config['aws_session_token'] = settings.AWS_SESSION_TOKEN
+    return config
+
+
+def _override(kind, service):
+    global _stubs_loaded
+    if not _stubs_loaded and getattr(settings, 'AWS_STUBS', False):
+        with _lock:
+            if not _stubs_loaded:
+                from .aws_stubs import build_stubs
+                stubs = build_stubs()
+                for name, (client, resource) in stubs.items():
+                    _overrides.setdefault(('client', name), client)
+                    if resource is not None:
+                        _overrides.setdefault(('resource', name), resource)
+                _stubs_loaded = True
+                logger.warning('AWS_STUBS is on: using in-process fakes for %s', ', '.join(stubs))
+    return _overrides.get((kind, service))
+
+
+def get_client(service, region_name=None):
+    """Shared boto3 client (or installed replacement) for a service"""
+    override = _override('client', service)
+    if override is not None:
+        return _coalesced(service, override)
+
+    region_name = region_name or default_region(service)
+    key = (service, region_name)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = instrument_client(boto3.client(service, **_session_config(region_name)))
+                _clients[key] = client
+    return _coalesced(service, client)
+
+
+def _coalesced(service, client):
+    """client wrapped to coalesce identical calls, if any operations are configured"""
+    operations = getattr(settings, 'AWS_COALESCE_OPERATIONS', {}).get(service)
+    if not operations:
+        return client
+    wrapper = _coalescing.get(id(client))
+    if wrapper is None or wrapper.client is not client:
+        from .cache import Namespace
+        from .singleflight import CoalescingClient, SingleFlight
+
+        with _lock:
+            wrapper = _coalescing.get(id(client))
+            if wrapper is None or wrapper.client is not client:
+                namespace = Namespace(f'singleflight:{service}') if getattr(settings, 'AWS_COALESCE_SHARED', True) else None
+                flight = SingleFlight(namespace, result_ttl=getattr(settings, 'AWS_COALESCE_RESULT_TTL', 5))
+                wrapper = _coalescing[id(client)] = CoalescingClient(client, service, operations, flight)
+    return wrapper
+
+
+def get_resource(service, region_name=None):
+    """boto3 resource (or installed replacement), one per thread"""
+    override = _override('resource', service)
+    if override is not None:
+        return override
+
+    region_name = region_name or default_region(service)
+    resources = getattr(_local, 'resources', None)
+    if resources is None:
+        resources = _local.resources = {}
+    key = (service, region_name)
+    if key not in resources:
+        # A session per thread: the default session is shared and not thread-safe
+        resource = boto3.session.Session().resource(service, **_session_config(region_name))
+        instrument_client(resource.meta.client)
+        resources[key] = resource
+    return resources[key]
+
+
+def install(service, client=None, resource=None):
+    """Use client/resource for service instead of boto3 (tests, load runs)"""
+    with _lock:
+        if client is not None:
+            _overrides[('client', service)] = client
+        if resource is not None:
+            _overrides[('resource', service)] = resource
+
+
+def reset():
+    """Drop cached clients, installed replacements and this thread's resources"""
+    global _stubs_loaded
+    with _lock:
+        _clients.clear()
+        _overrides.clear()
+        _coalescing.clear()
+        _stubs_loaded = False
+    _local.__dict__.clear()
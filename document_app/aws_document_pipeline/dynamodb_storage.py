@@ -1,64 +1,226 @@
-import boto3
+import base64
+import contextvars
 import json
 import uuid
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from boto3.dynamodb.conditions import Key
 from datetime import datetime
 from django.conf import settings
 from decimal import Decimal
+from ..aws_clients import get_resource
+from ..signals import document_deleted, document_stored
+from .metadata_index import ensure_index_built
 
 logger = logging.getLogger(__name__)
 
+CATEGORIES = ['policies_guidelines', 'operations_production',
+              'maintenance_technical', 'training_knowledge', 'others']
+FILE_TYPE_BUCKETS = ['pdf', 'doc', 'image', 'other']
+
+
+def file_type_bucket(file_type):
+    """Map a MIME type / extension to the bucket used by the folder view"""
+    file_type = (file_type or '').lower()
+    if 'pdf' in file_type:
+        return 'pdf'
+    if any(word in file_type for word in ['word', 'doc']):
+        return 'doc'
+    if any(word in file_type for word in ['image', 'png', 'jpg', 'jpeg']):
+        return 'image'
+    return 'other'
+
+
+def counter_key(category, file_type):
+    """Partition key of the category x file-type counter item"""
+    if category not in CATEGORIES:
+        category = 'others'  # Unknown categories are reported under 'others'
+    return f"{category}#{file_type_bucket(file_type)}"
+
+
 class DynamoDBStorage:
     def __init__(self):
         """Initialize DynamoDB client and table"""
-        region = getattr(settings, 'AWS_REGION', 'ap-southeast-1').strip() or 'ap-southeast-1'
-        print(f"*** DYNAMODB REGION: '{region}' ***")
-        
-        config = {
-            'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
-            'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
-            'region_name': region
-        }
-        
-        if hasattr(settings, 'AWS_SESSION_TOKEN') and settings.AWS_SESSION_TOKEN:
-            config['aws_session_token'] = settings.AWS_SESSION_TOKEN
-        
-        self.dynamodb = boto3.resource('dynamodb', **config)
+        self.dynamodb = get_resource('dynamodb')
         self.table_name = 'Documents'
         self.table = self.dynamodb.Table(self.table_name)
+        self.category_index_name = getattr(settings, 'DYNAMODB_CATEGORY_INDEX', 'category-upload_date-index')
+        
+        # Counter items (category x file type) maintained on every write
+        self.stats_table_name = getattr(settings, 'DYNAMODB_STATS_TABLE', 'DocumentStats')
+        self.stats_table = self.dynamodb.Table(self.stats_table_name)
         
         # Connect to existing table
         self._connect_to_existing_table()
+        self._connect_to_stats_table()
     
     def _connect_to_existing_table(self):
         """Connect to existing DynamoDB table"""
         try:
             # Check if table exists and is accessible
             self.table.load()
-            print(f"*** CONNECTED TO EXISTING DYNAMODB TABLE '{self.table_name}' ***")
-            print(f"*** TABLE STATUS: {self.table.table_status} ***")
-            print(f"*** ITEM COUNT: {self.table.item_count} ***")
+            logger.info("Connected to existing DynamoDB table '%s'", self.table_name)
+            logger.debug('Table status: %s', self.table.table_status)
+            logger.debug('Item count: %s', self.table.item_count)
             self.table_accessible = True
+            
+            # Category folders use the (category, upload_date) GSI when it is ready
+            self.category_index_available = any(
+                index['IndexName'] == self.category_index_name and index.get('IndexStatus', 'ACTIVE') == 'ACTIVE'
+                for index in (self.table.global_secondary_indexes or [])
+            )
+            if not self.category_index_available:
+                logger.warning("GSI '%s' not available - category lists will use scans", self.category_index_name)
         except Exception as e:
-            print(f"*** ERROR CONNECTING TO DYNAMODB TABLE: {e} ***")
+            logger.error('Error connecting to DynamoDB table: %s', e)
             if "AccessDeniedException" in str(e):
-                print(f"*** DYNAMODB ACCESS DENIED - PLEASE ADD PERMISSIONS ***")
-                print(f"*** REQUIRED PERMISSIONS: dynamodb:DescribeTable, dynamodb:GetItem, dynamodb:PutItem ***")
-                print(f"*** CONTINUING WITH KENDRA-ONLY MODE ***")
+                logger.warning('DynamoDB access denied - please add permissions')
+                logger.warning('Required permissions: dynamodb:DescribeTable, dynamodb:GetItem, dynamodb:PutItem')
+                logger.warning('Continuing with Kendra-only mode')
             else:
-                print(f"*** PLEASE ENSURE TABLE '{self.table_name}' EXISTS IN REGION: ap-southeast-1 ***")
+                logger.warning("Please ensure table '%s' exists in region: ap-southeast-1", self.table_name)
             self.table_accessible = False
+            self.category_index_available = False
+    
+    def _connect_to_stats_table(self):
+        """Connect to the counter table; stats fall back to scans without it"""
+        self.stats_accessible = False
+        if not self.table_accessible:
+            return
+        try:
+            self.stats_table.load()
+            self.stats_accessible = True
+        except Exception as e:
+            logger.warning("Stats table '%s' not available: %s", self.stats_table_name, e)
+            logger.warning('Category stats will fall back to table scans')
+    
+    def _increment_counter(self, key, delta):
+        """Atomically add delta to a counter item"""
+        self.stats_table.update_item(
+            Key={'StatKey': key},
+            UpdateExpression='ADD doc_count :delta',
+            ExpressionAttributeValues={':delta': delta}
+        )
+    
+    def _apply_counter_delta(self, old_item, new_item):
+        """Move a document between counters after a write.
+        
+        old_item/new_item are the document before and after the write
+        (None when it did not exist / no longer exists).
+        """
+        if not self.stats_accessible:
+            return
+        old_key = counter_key(old_item.get('category'), old_item.get('file_type')) if old_item else None
+        new_key = counter_key(new_item.get('category'), new_item.get('file_type')) if new_item else None
+        if old_key == new_key:
+            return
+        try:
+            if old_key:
+                self._increment_counter(old_key, -1)
+            if new_key:
+                self._increment_counter(new_key, 1)
+        except Exception as e:
+            # The document write already succeeded; counters can be rebuilt
+            logger.error('Failed to update category counters (%s -> %s): %s', old_key, new_key, e)
+    
+    def iter_scan(self, projection=None, filter_expression=None, expression_values=None,
+                  segments=1, page_size=None):
+        """Stream every item of the table, following LastEvaluatedKey.
+        
+        projection is a list of attribute names to fetch. With segments > 1
+        the table is read as a parallel scan (Segment/TotalSegments), one
+        worker thread per segment; items are yielded as pages arrive, and at
+        most a few pages per segment are buffered at any time. Stop iterating
+        (or close the generator) to cancel the remaining work.
+        """
+        scan_params = {}
+        if projection:
+            names = {f"#p{i}": name for i, name in enumerate(projection)}
+            scan_params['ProjectionExpression'] = ', '.join(names)
+            scan_params['ExpressionAttributeNames'] = names
+        if filter_expression is not None:
+            scan_params['FilterExpression'] = filter_expression
+        if expression_values:
+            scan_params['ExpressionAttributeValues'] = expression_values
+        if page_size:
+            scan_params['Limit'] = page_size
+        
+        if segments <= 1:
+            for page in self._scan_pages(self.table, scan_params):
+                yield from page
+            return
+        
+        pages = queue.Queue(maxsize=segments * 2)
+        stop = threading.Event()
+        done = object()
+        
+        def put(value):
+            # Block while the consumer is behind, but give up once it is gone
+            while not stop.is_set():
+                try:
+                    pages.put(value, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def scan_segment(segment):
+            try:
+                # boto3 resources are not thread-safe; get_resource keeps one per thread
+                table = get_resource('dynamodb').Table(self.table_name)
+                params = {**scan_params, 'Segment': segment, 'TotalSegments': segments}
+                for page in self._scan_pages(table, params):
+                    if not put(page):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+        
+        with ThreadPoolExecutor(max_workers=segments, thread_name_prefix='dynamodb-scan') as executor:
+            for segment in range(segments):
+                # Run in a copy of the caller's context so calls are attributed to its request
+                executor.submit(contextvars.copy_context().run, scan_segment, segment)
+            try:
+                remaining = segments
+                while remaining:
+                    page = pages.get()
+                    if page is done:
+                        remaining -= 1
+                    elif isinstance(page, Exception):
+                        raise page
+                    else:
+                        yield from page
+            finally:
+                stop.set()
+    
+    def _scan_pages(self, table, scan_params):
+        """Yield one list of items per scan page"""
+        params = dict(scan_params)
+        while True:
+            response = table.scan(**params)
+            items = response.get('Items', [])
+            # Convert Decimal to float for JSON serialization
+            for doc in items:
+                if 'confidence_score' in doc:
+                    doc['confidence_score'] = float(doc['confidence_score'])
+            yield items
+            if 'LastEvaluatedKey' not in response:
+                return
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
     
     def store_document(self, document_id, filename, content, category, keywords, 
                       s3_key, file_size, file_type, confidence=0.0):
         """Store document metadata in DynamoDB after classification"""
         # Check if DynamoDB is accessible
         if not hasattr(self, 'table_accessible') or not self.table_accessible:
-            print(f"*** DYNAMODB NOT ACCESSIBLE - SKIPPING STORAGE FOR: {document_id} ***")
+            logger.warning('DynamoDB not accessible - skipping storage for: %s', document_id)
             return False
             
         try:
-            print(f"*** STORING DOCUMENT IN DYNAMODB: {document_id} ***")
+            logger.debug('Storing document in DynamoDB: %s', document_id)
             
             # Convert file_size to number if it's a string
             if isinstance(file_size, str):
@@ -85,28 +247,29 @@ class DynamoDBStorage:
                 'updated_at': datetime.now().isoformat()
             }
             
-            # Store in DynamoDB
-            response = self.table.put_item(Item=item)
+            # Store in DynamoDB (ALL_OLD tells us whether this replaced a document)
+            response = self.table.put_item(Item=item, ReturnValues='ALL_OLD')
+            self._apply_counter_delta(response.get('Attributes'), item)
+            document_stored.send(sender=self.__class__, document_id=document_id, document=item)
             
-            print(f"*** DOCUMENT STORED IN DYNAMODB SUCCESSFULLY: {document_id} ***")
-            print(f"*** CATEGORY: {category}, KEYWORDS: {keywords[:3]} ***")
+            logger.info('Document stored in DynamoDB successfully: %s', document_id)
+            logger.debug('Category: %s, keywords: %s', category, keywords[:3])
             
             return True
             
         except Exception as e:
-            print(f"*** DYNAMODB STORAGE FAILED: {e} ***")
-            logger.error(f"Failed to store document in DynamoDB: {e}")
+            logger.error('Failed to store document in DynamoDB: %s', e)
             return False
     
     def get_document_by_id(self, document_id):
         """Retrieve document by ID from DynamoDB"""
         # Check if DynamoDB is accessible
         if not hasattr(self, 'table_accessible') or not self.table_accessible:
-            print(f"*** DYNAMODB NOT ACCESSIBLE - SKIPPING RETRIEVAL FOR: {document_id} ***")
+            logger.warning('DynamoDB not accessible - skipping retrieval for: %s', document_id)
             return None
             
         try:
-            print(f"*** RETRIEVING DOCUMENT FROM DYNAMODB: {document_id} ***")
+            logger.debug('Retrieving document from DynamoDB: %s', document_id)
             
             response = self.table.get_item(
                 Key={'DocumentID': document_id}  # Match your table's partition key
@@ -114,7 +277,7 @@ class DynamoDBStorage:
             
             if 'Item' in response:
                 item = response['Item']
-                print(f"*** DOCUMENT FOUND IN DYNAMODB: {item['filename']} ***")
+                logger.debug('Document found in DynamoDB: %s', item['filename'])
                 
                 # Convert Decimal to float for JSON serialization
                 if 'confidence_score' in item:
@@ -122,169 +285,310 @@ class DynamoDBStorage:
                 
                 return item
             else:
-                print(f"*** DOCUMENT NOT FOUND IN DYNAMODB: {document_id} ***")
+                logger.debug('Document not found in DynamoDB: %s', document_id)
                 return None
                 
         except Exception as e:
-            print(f"*** DYNAMODB RETRIEVAL ERROR: {e} ***")
-            logger.error(f"Failed to retrieve document from DynamoDB: {e}")
+            logger.error('Failed to retrieve document from DynamoDB: %s', e)
             return None
     
     def list_documents_by_category(self, category, limit=50):
-        """List documents by category using scan (no GSI available)"""
+        """List the newest documents in a category"""
+        documents, _ = self.query_documents_by_category(category, limit=limit)
+        return documents
+    
+    def query_documents_by_category(self, category, limit=50, cursor=None):
+        """Page through a category, newest first.
+        
+        Returns (documents, next_cursor); pass next_cursor back to get the
+        following page, it is None on the last page. Uses the
+        (category, upload_date) GSI, or a filtered scan if it does not exist.
+        """
         # Check if DynamoDB is accessible
         if not hasattr(self, 'table_accessible') or not self.table_accessible:
-            print(f"*** DYNAMODB NOT ACCESSIBLE - SKIPPING CATEGORY SCAN FOR: {category} ***")
-            return []
+            logger.warning('DynamoDB not accessible - skipping category query for: %s', category)
+            return [], None
             
         try:
-            print(f"*** LISTING DOCUMENTS BY CATEGORY: {category} ***")
-            
-            # Since no GSI exists, use scan with filter
-            response = self.table.scan(
-                FilterExpression='category = :category',
-                ExpressionAttributeValues={
-                    ':category': category
-                },
-                Limit=limit
-            )
-            
-            print(f"*** DYNAMODB SCAN RESPONSE: {response.get('Count', 0)} items found ***")
-            print(f"*** SCAN FILTER: category = {category} ***")
+            logger.debug('Listing documents by category: %s', category)
             
-            documents = response.get('Items', [])
-            
-            # Debug: Show what documents we found
-            for i, doc in enumerate(documents):
-                print(f"*** DOCUMENT {i+1}: ID={doc.get('DocumentID', 'N/A')}, category={doc.get('category', 'N/A')}, filename={doc.get('filename', 'N/A')} ***")
+            position = _decode_cursor(cursor)
+            if self.category_index_available:
+                documents, next_position = self._query_category_index(category, limit, position)
+            else:
+                documents, next_position = self._scan_category(category, limit, position)
             
             # Convert Decimal to float for JSON serialization
             for doc in documents:
                 if 'confidence_score' in doc:
                     doc['confidence_score'] = float(doc['confidence_score'])
             
-            # Sort by upload_date descending (since we can't use GSI sorting)
-            documents.sort(key=lambda x: x.get('upload_date', ''), reverse=True)
-            
-            print(f"*** FOUND {len(documents)} DOCUMENTS IN CATEGORY: {category} ***")
-            return documents
+            logger.debug('Found %s documents in category: %s', len(documents), category)
+            return documents, _encode_cursor(next_position)
             
         except Exception as e:
-            print(f"*** DYNAMODB CATEGORY SCAN ERROR: {e} ***")
-            logger.error(f"Failed to list documents by category: {e}")
-            return []
+            logger.error('Failed to list documents by category: %s', e)
+            return [], None
+    
+    def _query_category_index(self, category, limit, position):
+        """One bounded GSI query, sorted by upload_date descending"""
+        query_params = {
+            'IndexName': self.category_index_name,
+            'KeyConditionExpression': Key('category').eq(category),
+            'ScanIndexForward': False,
+            'Limit': limit
+        }
+        if position and 'key' in position:
+            query_params['ExclusiveStartKey'] = position['key']
+        
+        response = self.table.query(**query_params)
+        last_key = response.get('LastEvaluatedKey')
+        return response.get('Items', []), {'key': last_key} if last_key else None
+    
+    def _scan_category(self, category, limit, position):
+        """Fallback without the GSI: scan every page, then sort and slice.
+        
+        Limit is not passed to the scan because DynamoDB applies it before
+        the filter, which would drop matching documents.
+        """
+        documents = list(self.iter_scan(
+            filter_expression='category = :category',
+            expression_values={':category': category}
+        ))
+        
+        documents.sort(key=lambda x: x.get('upload_date', ''), reverse=True)
+        
+        offset = position.get('offset', 0) if position else 0
+        next_offset = offset + limit
+        next_position = {'offset': next_offset} if next_offset < len(documents) else None
+        return documents[offset:next_offset], next_position
     
     def get_all_documents(self, limit=100):
         """Get all documents with pagination"""
         # Check if DynamoDB is accessible
         if not hasattr(self, 'table_accessible') or not self.table_accessible:
-            print(f"*** DYNAMODB NOT ACCESSIBLE - SKIPPING ALL DOCUMENTS SCAN ***")
+            logger.warning('DynamoDB not accessible - skipping all documents scan')
             return []
             
         try:
-            print(f"*** RETRIEVING ALL DOCUMENTS FROM DYNAMODB ***")
+            logger.debug('Retrieving all documents from DynamoDB')
             
-            response = self.table.scan(Limit=limit)
-            documents = response.get('Items', [])
+            # Follow LastEvaluatedKey until we have `limit` documents
+            documents = list(islice(self.iter_scan(page_size=limit), limit))
             
-            # Debug: Show all documents in DynamoDB
-            for i, doc in enumerate(documents):
-                print(f"*** ALL DOCS {i+1}: ID={doc.get('DocumentID', 'N/A')}, category={doc.get('category', 'N/A')}, filename={doc.get('filename', 'N/A')} ***")
-            
-            # Convert Decimal to float for JSON serialization
-            for doc in documents:
-                if 'confidence_score' in doc:
-                    doc['confidence_score'] = float(doc['confidence_score'])
+            # Debug: Show all documents in DynamoDB (skip the loop unless DEBUG is on)
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, doc in enumerate(documents):
+                    logger.debug('All docs %s: ID=%s, category=%s, filename=%s', i + 1, doc.get('DocumentID', 'N/A'),
+                                 doc.get('category', 'N/A'), doc.get('filename', 'N/A'))
             
-            print(f"*** FOUND {len(documents)} TOTAL DOCUMENTS ***")
+            logger.debug('Found %s total documents', len(documents))
             return documents
             
         except Exception as e:
-            print(f"*** DYNAMODB SCAN ERROR: {e} ***")
-            logger.error(f"Failed to scan all documents: {e}")
+            logger.error('Failed to scan all documents: %s', e)
             return []
     
     def get_category_stats(self):
-        """Get document count by category using scan (no GSI available)"""
+        """Get document count by category from the counter items"""
         try:
-            print(f"*** CALCULATING CATEGORY STATISTICS ***")
+            file_type_stats = self.get_category_file_type_stats()
+            stats = {category: sum(buckets.values()) for category, buckets in file_type_stats.items()}
             
-            categories = ['policies_guidelines', 'operations_production', 
-                         'maintenance_technical', 'training_knowledge', 'others']
-            stats = {}
-            
-            # Get all documents and count by category
-            all_documents = self.get_all_documents(1000)  # Get more for accurate stats
-            
-            # Initialize all categories to 0
-            for category in categories:
-                stats[category] = 0
-            
-            # Count documents by category
-            for doc in all_documents:
-                category = doc.get('category', 'others')
-                if category in stats:
-                    stats[category] += 1
-                else:
-                    stats['others'] += 1  # Fallback for unknown categories
-            
-            print(f"*** CATEGORY STATS: {stats} ***")
+            logger.debug('Category stats: %s', stats)
             return stats
             
         except Exception as e:
-            print(f"*** CATEGORY STATS ERROR: {e} ***")
-            logger.error(f"Failed to get category stats: {e}")
+            logger.error('Failed to get category stats: %s', e)
             return {}
     
+    def get_category_file_type_stats(self):
+        """Get document counts per category and file-type bucket.
+        
+        Reads every counter item with a single BatchGetItem, so the cost does
+        not depend on the number of documents. Falls back to a table scan when
+        the counter table is not available.
+        """
+        if not self.stats_accessible:
+            return self._count_by_scan()
+        
+        stats = {category: {bucket: 0 for bucket in FILE_TYPE_BUCKETS} for category in CATEGORIES}
+        request = {
+            self.stats_table_name: {
+                'Keys': [{'StatKey': f"{category}#{bucket}"} for category in CATEGORIES for bucket in FILE_TYPE_BUCKETS],
+                'ProjectionExpression': 'StatKey, doc_count'
+            }
+        }
+        
+        while request:
+            response = self.dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(self.stats_table_name, []):
+                category, bucket = item['StatKey'].split('#', 1)
+                if category in stats and bucket in stats[category]:
+                    # Clamp at zero in case a decrement raced ahead of its increment
+                    stats[category][bucket] = max(int(item.get('doc_count', 0)), 0)
+            request = response.get('UnprocessedKeys') or None
+        
+        return stats
+    
+    def _count_by_scan(self):
+        """Count documents per category and file-type bucket with a table scan"""
+        stats = {category: {bucket: 0 for bucket in FILE_TYPE_BUCKETS} for category in CATEGORIES}
+        if not self.table_accessible:
+            return stats
+        
+        documents = self.iter_scan(
+            projection=['category', 'file_type'],
+            segments=getattr(settings, 'DYNAMODB_SCAN_SEGMENTS', 4)
+        )
+        for doc in documents:
+            category, bucket = counter_key(doc.get('category'), doc.get('file_type')).split('#', 1)
+            stats[category][bucket] += 1
+        
+        return stats
+    
+    def rebuild_counters(self):
+        """Recompute every counter item from a full table scan.
+        
+        Used to backfill the counter table for documents stored before it
+        existed, or to repair drift after a failed counter update.
+        """
+        if not self.stats_accessible:
+            logger.warning('Stats table not accessible - cannot rebuild counters')
+            return None
+        
+        stats = self._count_by_scan()
+        
+        with self.stats_table.batch_writer() as batch:
+            for category, buckets in stats.items():
+                for bucket, count in buckets.items():
+                    batch.put_item(Item={'StatKey': f"{category}#{bucket}", 'doc_count': count})
+        
+        logger.info('Counters rebuilt: %s', stats)
+        return stats
+    
     def search_documents(self, query, category_filter=None, limit=50):
-        """Search documents by content or filename"""
+        """Search documents by filename, keywords or summary.
+        
+        Served from the in-process BM25 index (case-insensitive, ranked),
+        which is built from a scan once and then kept current by ingestion
+        events. Falls back to a filtered scan if the index cannot be built.
+        """
         try:
-            print(f"*** SEARCHING DOCUMENTS: '{query}' ***")
-            
-            # Build filter expression
-            filter_expression = None
-            expression_values = {}
-            
-            if query and query != '*':
-                # Search in filename and content_summary
-                filter_expression = 'contains(filename, :query) OR contains(content_summary, :query)'
-                expression_values[':query'] = query
-            
-            if category_filter:
-                if filter_expression:
-                    filter_expression += ' AND category = :category'
-                else:
-                    filter_expression = 'category = :category'
-                expression_values[':category'] = category_filter
-            
-            scan_params = {
-                'Limit': limit
-            }
+            logger.debug("Searching documents: '%s'", query)
             
-            if filter_expression:
-                scan_params['FilterExpression'] = filter_expression
-                scan_params['ExpressionAttributeValues'] = expression_values
+            index = ensure_index_built(self) if self.table_accessible else None
+            if index is not None and index.is_built:
+                documents = index.search(query, category_filter=category_filter, limit=limit)
+                logger.debug('Search found %s documents (local index)', len(documents))
+                return documents
             
-            response = self.table.scan(**scan_params)
-            documents = response.get('Items', [])
-            
-            # Convert Decimal to float for JSON serialization
-            for doc in documents:
-                if 'confidence_score' in doc:
-                    doc['confidence_score'] = float(doc['confidence_score'])
-            
-            print(f"*** SEARCH FOUND {len(documents)} DOCUMENTS ***")
-            return documents
+            return self._search_by_scan(query, category_filter, limit)
             
         except Exception as e:
-            print(f"*** DYNAMODB SEARCH ERROR: {e} ***")
-            logger.error(f"Failed to search documents: {e}")
+            logger.error('Failed to search documents: %s', e)
             return []
     
+    def _search_by_scan(self, query, category_filter=None, limit=50):
+        """Case-sensitive substring search with a filtered table scan"""
+        # Build filter expression
+        filter_expression = None
+        expression_values = {}
+        
+        if query and query != '*':
+            # Search in filename and content_summary
+            filter_expression = 'contains(filename, :query) OR contains(content_summary, :query)'
+            expression_values[':query'] = query
+        
+        if category_filter:
+            if filter_expression:
+                filter_expression = f'({filter_expression}) AND category = :category'
+            else:
+                filter_expression = 'category = :category'
+            expression_values[':category'] = category_filter
+        
+        # Keep paging until `limit` documents pass the filter
+        documents = list(islice(self.iter_scan(
+            filter_expression=filter_expression,
+            expression_values=expression_values
+        ), limit))
+        
+        logger.debug('Search found %s documents', len(documents))
+        return documents
+    
+    def provision_tables(self):
+        """Create the tables and indexes this class expects, if missing.
+        
+        Creates the Documents table (with the category GSI) and the counter
+        table, or adds the GSI to an existing Documents table. Returns the
+        list of actions taken.
+        """
+        client = self.dynamodb.meta.client
+        actions = []
+        index_definition = {
+            'IndexName': self.category_index_name,
+            'KeySchema': [
+                {'AttributeName': 'category', 'KeyType': 'HASH'},
+                {'AttributeName': 'upload_date', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }
+        index_attributes = [
+            {'AttributeName': 'category', 'AttributeType': 'S'},
+            {'AttributeName': 'upload_date', 'AttributeType': 'S'}
+        ]
+        
+        existing_tables = set()
+        for page in client.get_paginator('list_tables').paginate():
+            existing_tables.update(page.get('TableNames', []))
+        
+        if self.table_name not in existing_tables:
+            client.create_table(
+                TableName=self.table_name,
+                KeySchema=[{'AttributeName': 'DocumentID', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'DocumentID', 'AttributeType': 'S'}] + index_attributes,
+                GlobalSecondaryIndexes=[index_definition],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            client.get_waiter('table_exists').wait(TableName=self.table_name)
+            actions.append(f"created table {self.table_name} with index {self.category_index_name}")
+        else:
+            description = client.describe_table(TableName=self.table_name)['Table']
+            index_names = [index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])]
+            if self.category_index_name not in index_names:
+                # Provisioned tables need throughput for the new index as well
+                if description.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+                    throughput = description['ProvisionedThroughput']
+                    index_definition['ProvisionedThroughput'] = {
+                        'ReadCapacityUnits': throughput['ReadCapacityUnits'],
+                        'WriteCapacityUnits': throughput['WriteCapacityUnits']
+                    }
+                client.update_table(
+                    TableName=self.table_name,
+                    AttributeDefinitions=index_attributes,
+                    GlobalSecondaryIndexUpdates=[{'Create': index_definition}]
+                )
+                actions.append(f"creating index {self.category_index_name} on {self.table_name} (backfill runs in the background)")
+        
+        if self.stats_table_name not in existing_tables:
+            client.create_table(
+                TableName=self.stats_table_name,
+                KeySchema=[{'AttributeName': 'StatKey', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'StatKey', 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            client.get_waiter('table_exists').wait(TableName=self.stats_table_name)
+            actions.append(f"created table {self.stats_table_name}")
+        
+        # Pick up the new state
+        self._connect_to_existing_table()
+        self._connect_to_stats_table()
+        return actions
+    
     def update_document(self, document_id, updates):
         """Update document metadata"""
         try:
-            print(f"*** UPDATING DOCUMENT: {document_id} ***")
+            logger.debug('Updating document: %s', document_id)
             
             # Build update expression
             update_expression = "SET updated_at = :updated_at"
@@ -299,30 +603,56 @@ class DynamoDBStorage:
                 Key={'DocumentID': document_id},  # Match your table's partition key
                 UpdateExpression=update_expression,
                 ExpressionAttributeValues=expression_values,
-                ReturnValues='UPDATED_NEW'
+                ReturnValues='ALL_OLD'
             )
             
-            print(f"*** DOCUMENT UPDATED SUCCESSFULLY: {document_id} ***")
+            old_item = response.get('Attributes')
+            new_item = {**(old_item or {}), **updates, 'DocumentID': document_id,
+                        'updated_at': expression_values[':updated_at']}
+            self._apply_counter_delta(old_item, new_item)
+            document_stored.send(sender=self.__class__, document_id=document_id, document=new_item)
+            
+            logger.info('Document updated successfully: %s', document_id)
             return True
             
         except Exception as e:
-            print(f"*** DYNAMODB UPDATE ERROR: {e} ***")
-            logger.error(f"Failed to update document: {e}")
+            logger.error('Failed to update document: %s', e)
             return False
     
     def delete_document(self, document_id):
         """Delete document from DynamoDB"""
         try:
-            print(f"*** DELETING DOCUMENT: {document_id} ***")
+            logger.debug('Deleting document: %s', document_id)
             
             response = self.table.delete_item(
-                Key={'DocumentID': document_id}  # Match your table's partition key
+                Key={'DocumentID': document_id},  # Match your table's partition key
+                ReturnValues='ALL_OLD'
             )
+            old_item = response.get('Attributes')
+            self._apply_counter_delta(old_item, None)
+            document_deleted.send(sender=self.__class__, document_id=document_id, document=old_item)
             
-            print(f"*** DOCUMENT DELETED SUCCESSFULLY: {document_id} ***")
+            logger.info('Document deleted successfully: %s', document_id)
             return True
             
         except Exception as e:
-            print(f"*** DYNAMODB DELETE ERROR: {e} ***")
-            logger.error(f"Failed to delete document: {e}")
+            logger.error('Failed to delete document: %s', e)
             return False
+
+
+def _encode_cursor(position):
+    """Opaque, URL-safe pagination cursor"""
+    if not position:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(position, sort_keys=True).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor; invalid cursors restart from the first page"""
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        logger.warning('Ignoring invalid pagination cursor: %r', cursor)
+        return None
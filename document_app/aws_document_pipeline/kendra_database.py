@@ -1,28 +1,16 @@
-import boto3
 import json
 import uuid
 import logging
 from datetime import datetime
 from django.conf import settings
+from ..aws_clients import get_client
 
 logger = logging.getLogger(__name__)
 
 class KendraDatabase:
     def __init__(self):
-        region = getattr(settings, 'AWS_REGION', 'ap-southeast-1').strip() or 'ap-southeast-1'
-        print(f"*** KENDRA REGION: '{region}' ***")
-        
-        config = {
-            'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
-            'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
-            'region_name': region
-        }
-        
-        if hasattr(settings, 'AWS_SESSION_TOKEN') and settings.AWS_SESSION_TOKEN:
-            config['aws_session_token'] = settings.AWS_SESSION_TOKEN
-        
-        self.kendra_client = boto3.client('kendra', **config)
-        self.sts_client = boto3.client('sts', **config)
+        self.kendra_client = get_client('kendra')
+        self.sts_client = get_client('sts')
         self.index_id = settings.AWS_KENDRA_INDEX_ID
     
     def _get_account_id(self):
@@ -34,7 +22,7 @@ class KendraDatabase:
     
     def store_document(self, document_id, filename, content, category, keywords, s3_key, file_size, file_type):
         """Store document in Kendra as primary database"""
-        print(f"*** STORING IN KENDRA: {document_id} ***")
+        logger.debug('Storing in Kendra: %s', document_id)
         try:
             
             document = {
@@ -58,12 +46,12 @@ class KendraDatabase:
                 Documents=[document]
             )
             
-            print(f"*** KENDRA STORE SUCCESS: {document_id} ***")
-            print(f"*** DOCUMENT SHOULD BE SEARCHABLE IN 2-5 MINUTES ***")
+            logger.info('Kendra store success: %s', document_id)
+            logger.debug('Document should be searchable in 2-5 minutes')
             return True
             
         except Exception as e:
-            print(f"*** KENDRA STORE FAILED: {e} ***")
+            logger.error('Kendra store failed: %s', e)
             return False
     
     def search_documents(self, query, category_filter=None, limit=50):
@@ -83,9 +71,9 @@ class KendraDatabase:
                     }
                 }
             
-            print(f"*** KENDRA SEARCH: '{query}' ***")
+            logger.debug("Kendra search: '%s'", query)
             response = self.kendra_client.query(**search_params)
-            print(f"*** KENDRA SEARCH RESULTS: {len(response.get('ResultItems', []))} ***")
+            logger.debug('Kendra search results: %s', len(response.get('ResultItems', [])))
             
             documents = []
             for item in response.get('ResultItems', []):
@@ -95,7 +83,7 @@ class KendraDatabase:
                 # Keep the original Kendra document ID (which might be an S3 URL)
                 # Don't generate fallback IDs as this causes mismatches
                 if not doc_id:
-                    print(f"*** WARNING: Document has no ID, skipping: {doc_title} ***")
+                    logger.warning('Document has no ID, skipping: %s', doc_title)
                     continue
                 
                 doc = {
@@ -121,14 +109,13 @@ class KendraDatabase:
             return documents
             
         except Exception as e:
-            print(f"*** KENDRA SEARCH ERROR: {e} ***")
-            logger.error(f"Kendra search failed: {e}")
+            logger.error('Kendra search failed: %s', e)
             return []
     
     def get_document_by_id(self, document_id):
         """Get specific document by ID"""
         try:
-            print(f"*** SEARCHING FOR DOCUMENT ID: {document_id} ***")
+            logger.debug('Searching for document ID: %s', document_id)
             
             # First try direct search by document ID
             # If it's an S3 URL, also try searching by just the filename
@@ -136,7 +123,7 @@ class KendraDatabase:
             if document_id.startswith('s3://') and '/' in document_id:
                 filename = document_id.split('/')[-1]
                 search_queries.append(filename)
-                print(f"*** ALSO SEARCHING BY FILENAME: {filename} ***")
+                logger.debug('Also searching by filename: %s', filename)
             
             response = self.kendra_client.query(
                 IndexId=self.index_id,
@@ -145,24 +132,24 @@ class KendraDatabase:
             )
             
             items = response.get('ResultItems', [])
-            print(f"*** FOUND {len(items)} ITEMS FOR ID SEARCH ***")
+            logger.debug('Found %s items for ID search', len(items))
             
             # Look for exact ID match first
             for item in items:
                 item_id = item.get('DocumentId')
-                print(f"*** COMPARING: '{item_id}' vs '{document_id}' ***")
+                logger.debug("Comparing: '%s' vs '%s'", item_id, document_id)
                 
                 # Try multiple ID matching strategies
                 if (item_id == document_id or 
                     item_id.endswith(document_id) or 
                     document_id in item_id):
-                    print(f"*** ID MATCH FOUND ***")
+                    logger.debug('ID match found')
                     return self._format_document_item(item)
             
             # If no exact match, try title-based search
             # Clean up document_id for title search
             title_search = document_id.replace('_', ' ').replace('-', ' ')
-            print(f"*** TRYING TITLE SEARCH: {title_search} ***")
+            logger.debug('Trying title search: %s', title_search)
             
             response = self.kendra_client.query(
                 IndexId=self.index_id,
@@ -171,24 +158,24 @@ class KendraDatabase:
             )
             
             items = response.get('ResultItems', [])
-            print(f"*** FOUND {len(items)} ITEMS FOR TITLE SEARCH ***")
+            logger.debug('Found %s items for title search', len(items))
             
             # Look for best title match
             for item in items:
                 title = item.get('DocumentTitle', {}).get('Text', '').lower()
-                print(f"*** CHECKING TITLE: '{title}' against '{document_id.lower()}' ***")
+                logger.debug("Checking title: '%s' against '%s'", title, document_id.lower())
                 
                 # Try multiple matching strategies
                 if (document_id.lower() in title or 
                     title.replace(' ', '_') == document_id.lower() or
                     title.replace(' ', '') == document_id.lower().replace('_', '') or
                     any(word in title for word in document_id.lower().split('_') if len(word) > 2)):
-                    print(f"*** TITLE MATCH FOUND: {title} ***")
+                    logger.debug('Title match found: %s', title)
                     return self._format_document_item(item)
             
             # Last resort: try searching for documents with similar content
             # This handles cases where the ID doesn't match but the document exists
-            print(f"*** TRYING CONTENT-BASED SEARCH ***")
+            logger.debug('Trying content-based search')
             
             # Create better search terms based on the document ID
             if "policy" in document_id.lower():
@@ -209,13 +196,13 @@ class KendraDatabase:
             )
             
             items = response.get('ResultItems', [])
-            print(f"*** FOUND {len(items)} ITEMS FOR CONTENT SEARCH ***")
+            logger.debug('Found %s items for content search', len(items))
             
             # Look for the best match by checking if the document_id is contained in the full ID
             for item in items:
                 item_id = item.get('DocumentId', '')
                 item_title = item.get('DocumentTitle', {}).get('Text', '')
-                print(f"*** CHECKING CONTENT MATCH: ID='{item_id}', Title='{item_title}' ***")
+                logger.debug("Checking content match: ID='%s', Title='%s'", item_id, item_title)
                 
                 # More precise matching - check if the exact document ID/title matches
                 if (item_id == document_id or 
@@ -224,20 +211,19 @@ class KendraDatabase:
                     # Check if the filename part matches
                     item_id.endswith(document_id) or
                     item_title == document_id.split('/')[-1] if '/' in document_id else False):
-                    print(f"*** EXACT CONTENT MATCH FOUND ***")
+                    logger.debug('Exact content match found')
                     return self._format_document_item(item)
             
             # Return the first result if any
             if items:
-                print(f"*** RETURNING FIRST CONTENT RESULT ***")
+                logger.debug('Returning first content result')
                 return self._format_document_item(items[0])
             
-            print(f"*** NO DOCUMENT FOUND FOR ID: {document_id} ***")
+            logger.debug('No document found for ID: %s', document_id)
             return None
             
         except Exception as e:
-            print(f"*** ERROR IN get_document_by_id: {e} ***")
-            logger.error(f"Failed to get document {document_id}: {e}")
+            logger.error('Failed to get document %s: %s', document_id, e)
             return None
     
     def _format_document_item(self, item):
@@ -246,7 +232,7 @@ class KendraDatabase:
         doc_title = item.get('DocumentTitle', {}).get('Text', '')
         doc_content = item.get('DocumentExcerpt', {}).get('Text', '')
         
-        print(f"*** FORMATTING DOCUMENT: ID={doc_id}, Title={doc_title} ***")
+        logger.debug('Formatting document: ID=%s, Title=%s', doc_id, doc_title)
         
         doc = {
             'id': doc_id,
@@ -265,8 +251,8 @@ class KendraDatabase:
             elif 'StringListValue' in value:
                 doc['attributes'][key] = value['StringListValue']
         
-        print(f"*** DOCUMENT FORMATTED WITH {len(doc_content)} CHARS OF CONTENT ***")
-        print(f"*** CONTENT PREVIEW: {doc_content[:100]}... ***")
+        logger.debug('Document formatted with %s chars of content', len(doc_content))
+        logger.debug('Content preview: %s...', doc_content[:100])
         return doc
     
     def list_documents_by_category(self, category, limit=50):
@@ -306,7 +292,7 @@ class KendraDatabase:
             return documents
             
         except Exception as e:
-            logger.error(f"Failed to list documents by category: {e}")
+            logger.error('Failed to list documents by category: %s', e)
             return []
     
     def get_category_stats(self):
@@ -322,5 +308,5 @@ class KendraDatabase:
             return stats
             
         except Exception as e:
-            logger.error(f"Failed to get category stats: {e}")
+            logger.error('Failed to get category stats: %s', e)
             return {}
\ No newline at end of file
@@ -0,0 +1,331 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from ..corpus import corpus_version
+from ..signals import document_deleted, document_stored
+from ..text_utils import bm25_idf, bm25_term, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Attributes needed to index and display a document
+INDEXED_ATTRIBUTES = ['DocumentID', 'filename', 'title', 'content_summary', 'category',
+                      'keywords', 's3_key', 'file_size', 'file_type', 'upload_date', 'status']
+
+
+class MetadataIndex:
+    """In-process inverted index over document metadata, ranked with BM25.
+
+    Each document is indexed on its filename, keywords and content summary;
+    field weights scale term frequencies (a simple BM25F). The index is
+    built from a DynamoDB scan when it is first used and then kept current
+    through this process's document_stored/document_deleted signals, so
+    searches never touch DynamoDB read capacity. It is scanned again only
+    when the shared corpus version shows changes made by other processes.
+    """
+
+    FIELD_WEIGHTS = {'filename': 3.0, 'keywords': 2.0, 'content_summary': 1.0}
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._clear()
+        self.built_at = None
+        self.failed_at = None  # last failed build, for the retry backoff
+        self.version = None  # corpus version the contents were scanned at
+        self._local_changes = 0  # signals applied here since that version
+        self._rebuilding = False
+        self._journal = None  # changes seen while a rebuild is scanning
+
+    def _clear(self):
+        self._postings = defaultdict(dict)  # term -> {document_id: weighted tf}
+        self._doc_terms = {}                # document_id -> terms, for removal
+        self._doc_lengths = {}
+        self._documents = {}
+        self._total_length = 0.0
+        self._vocabulary = []               # sorted terms, for prefix matching
+        self._vocabulary_dirty = False
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, document):
+        """Index (or re-index) a DynamoDB document item"""
+        document_id = document.get('DocumentID')
+        if not document_id:
+            return
+
+        term_weights = defaultdict(float)
+        for field, weight in self.FIELD_WEIGHTS.items():
+            value = document.get(field)
+            if isinstance(value, (list, tuple, set)):
+                value = ' '.join(str(v) for v in value)
+            for term in tokenize(value):
+                term_weights[term] += weight
+        length = sum(term_weights.values())
+
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('add', document))
+            self._remove(document_id)
+            for term, weight in term_weights.items():
+                if term not in self._postings:
+                    self._vocabulary_dirty = True
+                self._postings[term][document_id] = weight
+            self._doc_terms[document_id] = list(term_weights)
+            self._doc_lengths[document_id] = length
+            self._total_length += length
+            self._documents[document_id] = {k: document[k] for k in INDEXED_ATTRIBUTES if k in document}
+
+    def remove(self, document_id):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('remove', document_id))
+            self._remove(document_id)
+
+    def _remove(self, document_id):
+        terms = self._doc_terms.pop(document_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(document_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary_dirty = True
+        self._total_length -= self._doc_lengths.pop(document_id, 0.0)
+        self._documents.pop(document_id, None)
+
+    def note_local_change(self):
+        """Count a change applied from this process's signals; each one
+        also bumps the corpus version once"""
+        with self._lock:
+            self._local_changes += 1
+
+    def is_stale(self):
+        """Whether other processes changed the corpus since the index was
+        scanned: the corpus version moved further than this process's own
+        changes account for"""
+        if self.version is None:
+            return False
+        try:
+            current = corpus_version()
+        except Exception as e:
+            logger.warning('Corpus version unavailable: %s', e)
+            return False
+        with self._lock:
+            expected = self.version + self._local_changes
+            if current <= expected:
+                # Equal: in sync. Below: some of our bumps were lost (evicted
+                # counter, failed incr); resync so later remote changes still show
+                self.version, self._local_changes = current, 0
+                return False
+            return True
+
+    def rebuild(self, documents, version=None):
+        """Replace the index contents with the given iterable of items.
+
+        Searches keep using the old contents until the new index is ready.
+        Documents stored or deleted while the scan runs are replayed on top
+        of it, so they are not lost to a scan that started before them.
+        version, if given, is called once the journal is on to read the
+        corpus version the scan reflects.
+        """
+        with self._lock:
+            self._journal = []
+        scanned_version = version() if version is not None else None
+        fresh = MetadataIndex(self.k1, self.b)
+        try:
+            for document in documents:
+                fresh.add(document)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            for operation, value in self._journal:
+                if operation == 'add':
+                    fresh.add(value)
+                else:
+                    fresh.remove(value)
+            # The journaled changes were made here after scanned_version was read
+            replayed = len(self._journal)
+            self._journal = None
+            self._postings = fresh._postings
+            self._doc_terms = fresh._doc_terms
+            self._doc_lengths = fresh._doc_lengths
+            self._documents = fresh._documents
+            self._total_length = fresh._total_length
+            self._vocabulary_dirty = True
+            self.version = scanned_version
+            self._local_changes = replayed
+            self.built_at = time.monotonic()
+            self.failed_at = None
+        logger.info('Metadata index rebuilt with %s documents', len(fresh))
+
+    def _expand_prefix(self, prefix):
+        """Indexed terms starting with prefix (used for the last query token)"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:start + 50]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query, category_filter=None, limit=50):
+        """Return up to `limit` documents ranked by BM25, best first.
+
+        An empty query or '*' lists documents newest first. The last query
+        token also matches as a prefix, so partially typed words still hit.
+        """
+        terms = tokenize(query) if query and query != '*' else []
+
+        with self._lock:
+            if not terms:
+                documents = [doc for doc in self._documents.values()
+                             if not category_filter or doc.get('category') == category_filter]
+                documents.sort(key=lambda x: x.get('upload_date', ''), reverse=True)
+                return [dict(doc) for doc in documents[:limit]]
+
+            query_terms = {term: 1.0 for term in terms}
+            last = terms[-1]
+            if len(last) >= 3:
+                for term in self._expand_prefix(last):
+                    # Prefix matches count less than the exact word
+                    query_terms.setdefault(term, 0.5)
+
+            total_docs = len(self._documents)
+            average_length = self._total_length / total_docs if total_docs else 0.0
+            scores = defaultdict(float)
+            for term, query_weight in query_terms.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = bm25_idf(total_docs, df)
+                for document_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[document_id] / average_length)
+                    scores[document_id] += query_weight * bm25_term(tf, idf, self.k1, norm)
+
+            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            results = []
+            for document_id, score in ranked:
+                doc = self._documents[document_id]
+                if category_filter and doc.get('category') != category_filter:
+                    continue
+                results.append({**doc, 'search_score': round(score, 4)})
+                if len(results) >= limit:
+                    break
+            return results
+
+
+_index = MetadataIndex()
+_build_lock = threading.Lock()
+
+
+def get_metadata_index():
+    return _index
+
+
+def ensure_index_built(storage):
+    """Build the index from a DynamoDB scan if needed.
+
+    The first call blocks until the index is built. After a failed build,
+    callers get the unbuilt index (and fall back to the scan search) for
+    METADATA_INDEX_RETRY_SECONDS before a build is tried again. A built
+    index is refreshed in the background only when other processes changed
+    the corpus, at most once per METADATA_INDEX_REFRESH_SECONDS.
+    """
+    index = get_metadata_index()
+    if not index.is_built:
+        if _in_backoff(index):
+            return index
+        with _build_lock:
+            if not index.is_built and not _in_backoff(index):
+                _rebuild_from(storage)
+        return index
+
+    refresh_seconds = getattr(settings, 'METADATA_INDEX_REFRESH_SECONDS', 60)
+    if (not index._rebuilding and time.monotonic() - index.built_at >= refresh_seconds
+            and index.is_stale()):
+        index._rebuilding = True
+        threading.Thread(target=_rebuild_from, args=(storage,), daemon=True, name='metadata-index-rebuild').start()
+    return index
+
+
+def _in_backoff(index):
+    retry_seconds = getattr(settings, 'METADATA_INDEX_RETRY_SECONDS', 60)
+    return index.failed_at is not None and time.monotonic() - index.failed_at < retry_seconds
+
+
+def build_index_in_background():
+    """Start building the index at process startup, ahead of the first search"""
+    def build():
+        from .dynamodb_storage import DynamoDBStorage
+        storage = DynamoDBStorage()
+        if storage.table_accessible:
+            ensure_index_built(storage)
+
+    threading.Thread(target=build, daemon=True, name='metadata-index-build').start()
+
+
+def _reset_after_fork():
+    # Only the forking thread survives a fork: a build running elsewhere in
+    # the parent never finishes here and may hold the locks, so the child
+    # gets fresh ones and starts over unless the parent's index was complete
+    global _index, _build_lock
+    _build_lock = threading.Lock()
+    if _index._rebuilding or not _index.is_built:
+        _index = MetadataIndex()
+    else:
+        _index._lock = threading.RLock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _rebuild_from(storage):
+    index = get_metadata_index()
+    try:
+        index._rebuilding = True
+        index.rebuild(storage.iter_scan(
+            projection=INDEXED_ATTRIBUTES,
+            segments=getattr(settings, 'DYNAMODB_SCAN_SEGMENTS', 4)
+        ), version=corpus_version)
+    except Exception as e:
+        logger.error('Failed to rebuild metadata index: %s', e)
+        index.failed_at = time.monotonic()
+    finally:
+        index._rebuilding = False
+
+
+@receiver(document_stored)
+def _index_stored_document(sender, document_id, document, **kwargs):
+    index = get_metadata_index()
+    index.add(document)
+    index.note_local_change()
+
+
+@receiver(document_deleted)
+def _unindex_deleted_document(sender, document_id, **kwargs):
+    index = get_metadata_index()
+    index.remove(document_id)
+    index.note_local_change()
@@ -1,5 +1,6 @@
-import boto3
+import io
 import json
+import re
 import uuid
 import logging
 import os
@@ -7,33 +8,28 @@ import time
 from datetime import datetime
 from django.conf import settings
 from django.utils.text import slugify
-from .kendra_database import KendraDatabase
+from .search_backend import get_search_backend
+from ..aws_clients import get_client
 from .dynamodb_storage import DynamoDBStorage
+from ..aws_ai_search.vector_index import get_vector_index
+
+try:
+    import PyPDF2
+except ImportError:  # Optional: PDF text extraction is skipped without it
+    PyPDF2 = None
 
 logger = logging.getLogger(__name__)
 
+JSON_BLOCK_RE = re.compile(r'\{.*\}', re.DOTALL)
+KEYWORDS_LINE_RE = re.compile(r'keywords[\":\s]+\[?([^\n\]]+)\]?')
+QUOTED_RE = re.compile(r'"([^"]+)"')
+
 class DocumentPipeline:
     def __init__(self):
-        base_config = {
-            'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
-            'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
-        }
-        
-        if hasattr(settings, 'AWS_SESSION_TOKEN') and settings.AWS_SESSION_TOKEN:
-            base_config['aws_session_token'] = settings.AWS_SESSION_TOKEN
-        
-        s3_region = getattr(settings, 'AWS_REGION', 'ap-southeast-1').strip() or 'ap-southeast-1'
-        bedrock_region = getattr(settings, 'BEDROCK_REGION', 'us-east-1').strip() or 'us-east-1'
-        
-        print(f"*** PIPELINE S3 REGION: '{s3_region}' ***")
-        print(f"*** PIPELINE BEDROCK REGION: '{bedrock_region}' ***")
-        
-        s3_config = {**base_config, 'region_name': s3_region}
-        bedrock_config = {**base_config, 'region_name': bedrock_region}
-        
-        self.s3_client = boto3.client('s3', **s3_config)
-        self.bedrock_client = boto3.client('bedrock-runtime', **bedrock_config)
-        self.kendra_db = KendraDatabase()  # Use Kendra for search
+        # Shared per process by the client registry
+        self.s3_client = get_client('s3')
+        self.bedrock_client = get_client('bedrock-runtime')
+        self.search_backend = get_search_backend()  # Kendra or a local index, per SEARCH_BACKEND
         self.dynamodb_storage = DynamoDBStorage()  # Use DynamoDB for storage
     
     def upload_to_s3(self, file, document_id):
@@ -54,8 +50,9 @@ class DocumentPipeline:
             document_bytes = response['Body'].read()
             
             # Use PyPDF2 to extract text from PDF
-            import PyPDF2
-            import io
+            if PyPDF2 is None:
+                logger.warning('PyPDF2 is not installed; skipping text extraction for %s', s3_key)
+                return None
             
             pdf_file = io.BytesIO(document_bytes)
             pdf_reader = PyPDF2.PdfReader(pdf_file)
@@ -69,25 +66,25 @@ class DocumentPipeline:
             return extracted_text[:3000]  # Limit to first 3000 chars for Bedrock
             
         except Exception as e:
-            print(f"*** PDF EXTRACTION ERROR: {e} ***")
+            logger.error('PDF extraction error: %s', e)
             return None
     
     def process_with_bedrock(self, s3_key, filename):
         """Process document using Bedrock Runtime with available models"""
         try:
             model_id = getattr(settings, 'BEDROCK_MODEL_ID', None)
-            print(f"*** BEDROCK MODEL ID: {model_id} ***")
+            logger.debug('Bedrock model ID: %s', model_id)
             if not model_id:
-                print(f"*** Using fallback classification for {filename} ***")
+                logger.debug('Using fallback classification for %s', filename)
                 return self._fallback_classification(filename, s3_key)
             
             # Extract actual document content
             document_content = self.extract_text_from_s3(s3_key)
             if document_content:
-                print(f"*** EXTRACTED CONTENT: {document_content[:200]}... ***")
+                logger.debug('Extracted content: %s...', document_content[:200])
                 content_prompt = f"Document content: {document_content}\n\n"
             else:
-                print(f"*** NO CONTENT EXTRACTED, USING FILENAME ONLY ***")
+                logger.debug('No content extracted, using filename only')
                 content_prompt = f"Document filename: {filename}\n\n"
             
             prompt = f"""{content_prompt}Based on the above document content, provide:
@@ -133,12 +130,12 @@ Respond in JSON format:
                     "temperature": 0.1
                 }
             
-            print(f"*** CALLING BEDROCK WITH MODEL: {model_id} ***")
+            logger.debug('Calling Bedrock with model: %s', model_id)
             response = self.bedrock_client.invoke_model(
                 modelId=model_id,
                 body=json.dumps(body)
             )
-            print(f"*** BEDROCK RESPONSE RECEIVED ***")
+            logger.debug('Bedrock response received')
             
             result = json.loads(response['body'].read())
             
@@ -152,7 +149,7 @@ Respond in JSON format:
             else:
                 response_text = result.get('completion', result.get('text', ''))
             
-            print(f"*** BEDROCK EXTRACTED TEXT: {response_text[:200]}... ***")
+            logger.debug('Bedrock extracted text: %s...', response_text[:200])
             
             # Parse JSON from response
             try:
@@ -165,25 +162,26 @@ Respond in JSON format:
                 'extracted_text': content.get('summary', f"Document: {filename}"),
                 'keywords': content.get('keywords', []),
                 'category': content.get('category', 'others'),
-                'confidence': content.get('confidence', 0.7)
+                'confidence': content.get('confidence', 0.7),
+                'document_text': document_content or ''
             }
             
-            print(f"*** BEDROCK CLASSIFICATION: {filename} -> {result['category']} (confidence: {result['confidence']}) ***")
-            print(f"*** BEDROCK KEYWORDS: {result['keywords'][:5]} ***")
+            logger.debug('Bedrock classification: %s -> %s (confidence: %s)', filename, result['category'], result['confidence'])
+            logger.debug('Bedrock keywords: %s', result['keywords'][:5])
             
             return result
             
         except Exception as e:
-            logger.error(f"Bedrock processing failed for {s3_key}: {e}")
+            logger.error('Bedrock processing failed for %s: %s', s3_key, e)
             return self._fallback_classification(filename, s3_key)
 
     def analyze_text_with_bedrock(self, text_content, filename):
         """Analyze a string of text with Bedrock to get category and keywords."""
-        print(f"*** Analyzing text for filename: {filename} ***")
+        logger.debug('Analyzing text for filename: %s', filename)
         try:
             model_id = getattr(settings, 'BEDROCK_MODEL_ID', None)
             if not model_id:
-                print("*** No BEDROCK_MODEL_ID configured for real-time analysis. ***")
+                logger.debug('No bedrock_model_id configured for real-time analysis.')
                 return self._fallback_classification(filename, '')
 
             prompt = f"""Document content: {text_content[:3000]}\n\nBased on the document content, provide:
@@ -215,23 +213,22 @@ Respond in JSON format:
             result = json.loads(response['body'].read())
             response_text = result.get('output', {}).get('message', {}).get('content', [{}])[0].get('text', '')
 
-            print(f"*** Real-time analysis response: {response_text[:200]}... ***")
+            logger.debug('Real-time analysis response: %s...', response_text[:200])
 
             # Use regex to find the JSON block in the response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            json_match = JSON_BLOCK_RE.search(response_text)
             content = None
 
             if json_match:
                 json_str = json_match.group(0)
                 try:
                     content = json.loads(json_str)
-                    print("*** Successfully parsed JSON from AI response. ***")
+                    logger.info('Successfully parsed JSON from AI response.')
                 except json.JSONDecodeError:
-                    print("*** Found a JSON-like block, but failed to parse. Falling back. ***")
+                    logger.warning('Found a JSON-like block, but failed to parse. Falling back.')
                     content = self._extract_from_text(response_text, filename)
             else:
-                print("*** No JSON block found in AI response. Falling back. ***")
+                logger.warning('No JSON block found in AI response. Falling back.')
                 content = self._extract_from_text(response_text, filename)
 
             return {
@@ -241,7 +238,7 @@ Respond in JSON format:
             }
 
         except Exception as e:
-            logger.error(f"Real-time Bedrock analysis failed for {filename}: {e}")
+            logger.error('Real-time Bedrock analysis failed for %s: %s', filename, e)
             return self._fallback_classification(filename, '')
     
     def _extract_from_text(self, text, filename):
@@ -260,15 +257,14 @@ Respond in JSON format:
                     break
             
             # Extract keywords by looking for a line that starts with 'keywords'
-            import re
-            keywords_line = re.search(r'keywords[\":\s]+\[?([^\n\]]+)\]?', text_lower)
+            keywords_line = KEYWORDS_LINE_RE.search(text_lower)
             if keywords_line:
                 # Clean up the string and split into a list
                 keywords_str = keywords_line.group(1).replace('"', '').replace("'", '')
                 keywords = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
             else:
                 # Fallback to finding quoted words if the above fails
-                keyword_matches = re.findall(r'"([^"]+)"', text)
+                keyword_matches = QUOTED_RE.findall(text)
                 keywords = keyword_matches[:10] if keyword_matches else []
             
             return {
@@ -313,10 +309,28 @@ Respond in JSON format:
             'confidence': 0.5
         }
     
+    def _index_vectors(self, document_id, filename, file_size, file_type, s3_key, results):
+        """Add the document to the local semantic index"""
+        try:
+            get_vector_index().add_document(
+                document_id,
+                filename,
+                results.get('document_text') or results['extracted_text'],
+                {
+                    'category': results['category'],
+                    'keywords': results['keywords'],
+                    's3_key': s3_key,
+                    'file_type': file_type,
+                    'upload_date': datetime.now().isoformat()
+                }
+            )
+        except Exception as e:
+            logger.error('Vector indexing failed for %s: %s', document_id, e)
+    
     def process_document(self, document_id, filename, file_size, file_type, s3_key):
         """Process document and store in both Kendra and DynamoDB"""
         try:
-            print(f"*** PROCESSING: {filename} ***")
+            logger.debug('Processing: %s', filename)
             
             # Process with Bedrock for classification
             results = self.process_with_bedrock(s3_key, filename)
@@ -334,8 +348,8 @@ Respond in JSON format:
                 confidence=results['confidence']
             )
             
-            # Also store in Kendra for search capabilities
-            kendra_success = self.kendra_db.store_document(
+            # Also store in the search backend (Kendra by default)
+            kendra_success = self.search_backend.store_document(
                 document_id=document_id,
                 filename=filename,
                 content=results['extracted_text'],
@@ -346,10 +360,15 @@ Respond in JSON format:
                 file_type=file_type
             )
             
+            # Index the full text locally so the document is searchable
+            # before Kendra finishes indexing it
+            if dynamodb_success or kendra_success:
+                self._index_vectors(document_id, filename, file_size, file_type, s3_key, results)
+            
             # Consider success if at least one storage method works
             if dynamodb_success or kendra_success:
-                print(f"*** DOCUMENT PROCESSED SUCCESSFULLY: {document_id} ***")
-                print(f"*** DYNAMODB: {'✓' if dynamodb_success else '✗'}, KENDRA: {'✓' if kendra_success else '✗'} ***")
+                logger.info('Document processed successfully: %s', document_id)
+                logger.debug('DynamoDB: %s, Kendra: %s', '✓' if dynamodb_success else '✗', '✓' if kendra_success else '✗')
                 return {
                     'status': 'completed',
                     'category': results['category'],
@@ -361,9 +380,9 @@ Respond in JSON format:
                     }
                 }
             else:
-                print(f"*** DOCUMENT PROCESSING FAILED: {document_id} ***")
+                logger.error('Document processing failed: %s', document_id)
                 return {'status': 'failed', 'error': 'Both DynamoDB and Kendra storage failed'}
             
         except Exception as e:
-            print(f"*** PROCESSING ERROR: {e} ***")
+            logger.error('Processing error: %s', e)
             return {'status': 'failed', 'error': str(e)}
\ No newline at end of file
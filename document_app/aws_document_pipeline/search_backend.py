@@ -0,0 +1,62 @@
+import logging
+import threading
+from typing import Protocol
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from ..signals import document_deleted
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_BACKEND = 'document_app.aws_document_pipeline.kendra_database.KendraDatabase'
+
+
+class SearchBackend(Protocol):
+    """Interface the search engines, chatbot and views use for document search.
+
+    Documents are returned as dicts with 'id', 'title', 'excerpt', 'score'
+    (VERY_HIGH/HIGH/MEDIUM/LOW) and 'attributes' (category, keywords, s3_key,
+    file_type, upload_date, ...). get_document_by_id also sets 'content'.
+    """
+
+    index_id: str
+
+    def store_document(self, document_id, filename, content, category, keywords, s3_key, file_size, file_type) -> bool:
+        ...
+
+    def search_documents(self, query, category_filter=None, limit=50) -> list:
+        ...
+
+    def get_document_by_id(self, document_id) -> dict:
+        ...
+
+    def list_documents_by_category(self, category, limit=50) -> list:
+        ...
+
+    def get_category_stats(self) -> dict:
+        ...
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """The process-wide backend named by settings.SEARCH_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, 'SEARCH_BACKEND', DEFAULT_SEARCH_BACKEND))
+                _backend = backend_class()
+    return _backend
+
+
+@receiver(document_deleted)
+def _remove_deleted_document(sender, document_id, **kwargs):
+    # KendraDatabase never deleted from the index; local backends do
+    backend = get_search_backend()
+    if hasattr(backend, 'delete_document'):
+        backend.delete_document(document_id)
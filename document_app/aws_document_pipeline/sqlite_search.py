@@ -0,0 +1,205 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from ..text_utils import tokenize
+from .dynamodb_storage import CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# bm25() column weights, in the column order of documents_fts
+FTS_WEIGHTS = (3.0, 2.0, 1.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    category TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    s3_key TEXT,
+    file_size TEXT,
+    file_type TEXT,
+    upload_date TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_category_date ON documents (category, upload_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5 (
+    title, keywords, content, content='documents', content_rowid='rowid',
+    tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, title, keywords, content)
+    VALUES (new.rowid, new.title, new.keywords, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, title, keywords, content)
+    VALUES ('delete', old.rowid, old.title, old.keywords, old.content);
+END;
+"""
+
+
+class SQLiteSearchBackend:
+    """Search backend on a local SQLite FTS5 index.
+
+    Stand-in for KendraDatabase in development, staging and load tests:
+    same method signatures and result format, no AWS calls. Documents are
+    searchable as soon as they are stored.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or getattr(settings, 'SEARCH_SQLITE_PATH', 'search_index.sqlite3'))
+        self.index_id = f"sqlite:{self.path}"
+        self._local = threading.local()
+        try:
+            self._connection().executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            raise ImproperlyConfigured(f"SQLite search backend needs FTS5 support: {e}")
+
+    def _connection(self):
+        # sqlite3 connections must stay on the thread that created them
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def store_document(self, document_id, filename, content, category, keywords, s3_key, file_size, file_type):
+        """Insert or replace a document"""
+        try:
+            with self._connection() as connection:
+                # Delete first so the FTS delete trigger sees the old row
+                connection.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+                connection.execute(
+                    'INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (document_id, filename, content or f"Document: {filename}", category,
+                     json.dumps(keywords[:10] if keywords else []), s3_key, str(file_size), file_type,
+                     datetime.now().isoformat(), 'completed')
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error('SQLite store failed for %s: %s', document_id, e)
+            return False
+
+    def delete_document(self, document_id):
+        try:
+            with self._connection() as connection:
+                connection.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+            return True
+        except sqlite3.Error as e:
+            logger.error('SQLite delete failed for %s: %s', document_id, e)
+            return False
+
+    def search_documents(self, query, category_filter=None, limit=50):
+        """Full-text search (any term matches, BM25 ranked); '*' lists newest first"""
+        query = (query or '').strip()
+        if not query:
+            return []
+        limit = min(limit, 100)
+        try:
+            terms = tokenize(query)
+            if query == '*' or not terms:
+                if query != '*':
+                    return []
+                sql = 'SELECT d.*, 0.0 AS rank FROM documents d'
+                params = []
+                if category_filter:
+                    sql += ' WHERE d.category = ?'
+                    params.append(category_filter)
+                sql += ' ORDER BY d.upload_date DESC LIMIT ?'
+            else:
+                match = ' OR '.join(f'"{term}"' for term in terms)
+                sql = (f'SELECT d.*, bm25(documents_fts, {", ".join(map(str, FTS_WEIGHTS))}) AS rank '
+                       'FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid '
+                       'WHERE documents_fts MATCH ?')
+                params = [match]
+                if category_filter:
+                    sql += ' AND d.category = ?'
+                    params.append(category_filter)
+                sql += ' ORDER BY rank LIMIT ?'
+            params.append(limit)
+
+            rows = self._connection().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.error('SQLite search failed: %s', e)
+            return []
+
+        # bm25() is negative, lower is better; bucket relative to the best hit
+        # so results carry Kendra-style confidence labels
+        best = min((row['rank'] for row in rows), default=0.0)
+        documents = []
+        for row in rows:
+            doc = self._format_row(row)
+            ratio = row['rank'] / best if best else 1.0
+            doc['score'] = ('VERY_HIGH' if ratio >= 0.75 else 'HIGH' if ratio >= 0.5
+                            else 'MEDIUM' if ratio >= 0.25 else 'LOW')
+            documents.append(doc)
+        return documents
+
+    def get_document_by_id(self, document_id):
+        """Exact ID lookup, then by file name for s3:// style IDs"""
+        try:
+            connection = self._connection()
+            row = connection.execute('SELECT * FROM documents WHERE id = ?', (document_id,)).fetchone()
+            if row is None:
+                row = connection.execute(
+                    'SELECT * FROM documents WHERE title = ? OR s3_key = ? ORDER BY upload_date DESC LIMIT 1',
+                    (document_id.split('/')[-1], document_id)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error('Failed to get document %s: %s', document_id, e)
+            return None
+        return self._format_row(row) if row else None
+
+    def list_documents_by_category(self, category, limit=50):
+        try:
+            rows = self._connection().execute(
+                'SELECT * FROM documents WHERE category = ? ORDER BY upload_date DESC LIMIT ?',
+                (category, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error('Failed to list documents by category: %s', e)
+            return []
+        return [self._format_row(row) for row in rows]
+
+    def get_category_stats(self):
+        try:
+            rows = self._connection().execute(
+                'SELECT category, COUNT(*) AS count FROM documents GROUP BY category'
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error('Failed to get category stats: %s', e)
+            return {}
+        stats = {category: 0 for category in CATEGORIES}
+        for row in rows:
+            key = row['category'] if row['category'] in stats else 'others'
+            stats[key] += row['count']
+        return stats
+
+    def _format_row(self, row):
+        """Row -> the document dict KendraDatabase returns"""
+        excerpt = row['content'][:300]
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'content': row['content'],
+            'excerpt': excerpt,
+            'score': 'MEDIUM',
+            'attributes': {
+                'category': row['category'],
+                'keywords': json.loads(row['keywords']),
+                's3_key': row['s3_key'],
+                'file_size': row['file_size'],
+                'file_type': row['file_type'],
+                'upload_date': row['upload_date'],
+                'status': row['status']
+            }
+        }
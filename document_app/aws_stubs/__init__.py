@@ -0,0 +1,44 @@
+"""In-process fakes for the AWS services the app calls.
+
+Installed through document_app.aws_clients (settings.AWS_STUBS = True, or
+aws_clients.install() in tests and benchmarks) so the pipeline, chatbot
+and views can be exercised and profiled offline. Each fake counts calls
+per operation (`.calls`) and can add latency to mimic network round trips.
+"""
+from django.conf import settings
+
+from .bedrock import FakeBedrockRuntime
+from .dynamodb import FakeDynamoDB
+from .s3 import FakeS3
+
+__all__ = ['FakeBedrockRuntime', 'FakeDynamoDB', 'FakeS3', 'build_stubs']
+
+
+def build_stubs():
+    """service name -> (client, resource) with the tables the app expects"""
+    latency = getattr(settings, 'AWS_STUB_LATENCY', {})
+
+    dynamodb = FakeDynamoDB(latency=latency.get('dynamodb', 0.0))
+    dynamodb.create_table(
+        TableName='Documents',
+        KeySchema=[{'AttributeName': 'DocumentID', 'KeyType': 'HASH'}],
+        GlobalSecondaryIndexes=[{
+            'IndexName': getattr(settings, 'DYNAMODB_CATEGORY_INDEX', 'category-upload_date-index'),
+            'KeySchema': [
+                {'AttributeName': 'category', 'KeyType': 'HASH'},
+                {'AttributeName': 'upload_date', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }]
+    )
+    dynamodb.create_table(
+        TableName=getattr(settings, 'DYNAMODB_STATS_TABLE', 'DocumentStats'),
+        KeySchema=[{'AttributeName': 'StatKey', 'KeyType': 'HASH'}]
+    )
+    dynamodb.reset_calls()
+
+    return {
+        'bedrock-runtime': (FakeBedrockRuntime(latency=latency.get('bedrock-runtime', 0.0)), None),
+        's3': (FakeS3(getattr(settings, 'AWS_STUB_S3_ROOT', 'stub_s3'), latency=latency.get('s3', 0.0)), None),
+        'dynamodb': (dynamodb, dynamodb),
+    }
@@ -0,0 +1,56 @@
+import io
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from .. import instrumentation
+
+
+class StubClient:
+    """Common behaviour of the fakes: per-operation call counts and latency.
+
+    latency is a number of seconds, or a callable taking the operation name
+    and returning one, added to every call to mimic network round trips.
+    Calls are reported to document_app.instrumentation under `service`.
+    """
+
+    service = None
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    def _record(self, operation, report=True):
+        """Count and delay one call; returns when it started for _report"""
+        started = time.perf_counter()
+        with self._calls_lock:
+            self.calls[operation] += 1
+        delay = self.latency(operation) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        if report:
+            self._report(operation, started)
+        return started
+
+    def _report(self, operation, started, **details):
+        instrumentation.record_call(self.service, operation, time.perf_counter() - started, **details)
+
+    def reset_calls(self):
+        with self._calls_lock:
+            self.calls.clear()
+
+
+def client_error(code, message, operation, status=400):
+    """The ClientError botocore raises for an error response"""
+    return ClientError(
+        {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status}},
+        operation
+    )
+
+
+def streaming_body(data):
+    return StreamingBody(io.BytesIO(data), len(data))
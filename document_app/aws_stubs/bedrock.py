@@ -0,0 +1,150 @@
+import json
+import re
+from collections import Counter
+
+from ..aws_ai_search.embeddings import HashingEmbedder
+from .base import StubClient, client_error, streaming_body
+
+WORD_RE = re.compile(r'[a-z][a-z0-9]{3,}')
+
+CATEGORY_HINTS = {
+    'policies_guidelines': ('policy', 'policies', 'guideline', 'compliance', 'procedure'),
+    'operations_production': ('production', 'operation', 'process', 'quality', 'workflow'),
+    'maintenance_technical': ('maintenance', 'technical', 'repair', 'equipment', 'manual'),
+    'training_knowledge': ('training', 'course', 'learning', 'onboarding', 'tutorial'),
+}
+
+
+def _classification(prompt):
+    """Deterministic classification JSON from word counts in the document part of the prompt"""
+    text = prompt.split('Based on', 1)[0].lower()
+    words = Counter(WORD_RE.findall(text))
+    scores = {category: sum(words[hint] for hint in hints) for category, hints in CATEGORY_HINTS.items()}
+    category = max(scores, key=scores.get) if any(scores.values()) else 'others'
+    return json.dumps({
+        'summary': ' '.join(text.split()[:40]),
+        'keywords': [word for word, _ in words.most_common(8)],
+        'category': category,
+        'confidence': 0.8 if category != 'others' else 0.5
+    })
+
+
+def _suggestions(prompt):
+    return '\n'.join(f'"Find documents about {word}"' for word, _ in Counter(WORD_RE.findall(prompt.lower())).most_common(3))
+
+
+def _answer(prompt):
+    quoted = re.findall(r'"([^"]{3,200})"', prompt)
+    subject = quoted[-1] if quoted else ' '.join(prompt.split()[-12:])
+    return f"Here is what I found regarding {subject}."
+
+
+# (pattern, reply) pairs tried in order; reply is a string or a callable
+# taking the prompt text
+DEFAULT_RESPONSES = [
+    (re.compile(r'Classify into one category', re.I), _classification),
+    (re.compile(r'Respond with ONLY the category name', re.I), 'SEARCH'),
+    (re.compile(r'search suggestions', re.I), _suggestions),
+]
+
+
+# Minimum cacheable prefix per model family, in tokens (about four characters each)
+PROMPT_CACHE_MIN_TOKENS = {
+    'nova': 1000,
+    'claude-3-5-haiku': 2048,
+    'claude': 1024,
+}
+
+
+class FakeBedrockRuntime(StubClient):
+    """In-process stand-in for the bedrock-runtime client.
+
+    invoke_model returns canned or templated text in the response format of
+    the requested model family (Nova messages, Llama, Mistral, or plain
+    completion); embedding models return local hashing embeddings.
+    responses is a list of (regex, reply) pairs checked before the
+    defaults; replies may be strings (formatted with {prompt}) or callables.
+    System blocks followed by a cachePoint are remembered, so repeated
+    prefixes report cache-read tokens like Bedrock prompt caching; prefixes
+    below the model's PROMPT_CACHE_MIN_TOKENS are not cached.
+    """
+
+    service = 'bedrock-runtime'
+
+    def __init__(self, responses=None, latency=0.0):
+        super().__init__(latency)
+        self.responses = [(re.compile(pattern) if isinstance(pattern, str) else pattern, reply)
+                          for pattern, reply in (responses or [])] + DEFAULT_RESPONSES
+        self.embedder = HashingEmbedder()
+        self._cached_prefixes = set()
+
+    def _reply(self, prompt):
+        for pattern, reply in self.responses:
+            if pattern.search(prompt):
+                return reply(prompt) if callable(reply) else reply.format(prompt=prompt)
+        return _answer(prompt)
+
+    def _prompt_cache(self, model, system):
+        """(read, write) token counts for the system blocks before a cache point;
+        like Bedrock, a prefix shorter than the model's minimum is not cached"""
+        points = [i for i, part in enumerate(system) if 'cachePoint' in part]
+        minimum = next((tokens for family, tokens in PROMPT_CACHE_MIN_TOKENS.items() if family in model), None)
+        if not points or minimum is None:
+            return None, None
+        prefix = '\n'.join(part.get('text', '') for part in system[:points[-1]])
+        tokens = len(prefix) // 4
+        if tokens < minimum:
+            return None, None
+        if prefix in self._cached_prefixes:
+            return tokens, None
+        if len(self._cached_prefixes) > 1000:
+            self._cached_prefixes.clear()
+        self._cached_prefixes.add(prefix)
+        return None, tokens
+
+    def invoke_model(self, modelId=None, body=None, **kwargs):
+        started = self._record('InvokeModel', report=False)
+        try:
+            request = json.loads(body)
+        except (TypeError, ValueError):
+            self._report('InvokeModel', started, status='ValidationException', model=modelId)
+            raise client_error('ValidationException', 'Malformed input request', 'InvokeModel')
+
+        model = (modelId or '').lower()
+        cache_read_tokens = cache_write_tokens = None
+        if 'embed' in model:
+            embedder = HashingEmbedder(request.get('dimensions', self.embedder.dim))
+            input_tokens, output_tokens = len(request.get('inputText', '').split()), None
+            payload = {'embedding': embedder.embed([request.get('inputText', '')])[0].tolist()}
+        else:
+            if 'messages' in request:
+                system = request.get('system', [])
+                prompt = '\n'.join([part.get('text', '') for part in system] +
+                                   [part.get('text', '') for message in request['messages']
+                                    for part in message.get('content', [])])
+                cache_read_tokens, cache_write_tokens = self._prompt_cache(model, system)
+            else:
+                prompt = request.get('prompt', '')
+            text = self._reply(prompt)
+            input_tokens, output_tokens = len(prompt.split()), len(text.split())
+
+            if 'llama' in model:
+                payload = {'generation': text}
+            elif 'mistral' in model:
+                payload = {'outputs': [{'text': text}]}
+            elif 'messages' in request:
+                payload = {
+                    'output': {'message': {'role': 'assistant', 'content': [{'text': text}]}},
+                    'stopReason': 'end_turn',
+                    'usage': {'inputTokens': input_tokens, 'outputTokens': output_tokens,
+                              'cacheReadInputTokenCount': cache_read_tokens or 0,
+                              'cacheWriteInputTokenCount': cache_write_tokens or 0}
+                }
+            else:
+                payload = {'completion': text}
+
+        data = json.dumps(payload).encode('utf-8')
+        self._report('InvokeModel', started, bytes_sent=len(body), bytes_received=len(data),
+                     model=modelId, input_tokens=input_tokens, output_tokens=output_tokens,
+                     cache_read_tokens=cache_read_tokens, cache_write_tokens=cache_write_tokens)
+        return {'body': streaming_body(data), 'contentType': 'application/json'}
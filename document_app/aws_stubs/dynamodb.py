@@ -0,0 +1,546 @@
+import copy
+import re
+import threading
+import zlib
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+
+from .base import StubClient, client_error
+
+TOKEN_RE = re.compile(r'\s*(<>|<=|>=|[=<>(),+\-]|:[A-Za-z0-9_]+|#[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_]*)')
+KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN'}
+
+
+def _to_dynamo(value):
+    """Numbers come back as Decimal, like the real service; floats are rejected like boto3 does"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_dynamo(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {_to_dynamo(v) for v in value}
+    return value
+
+
+def _tokenize(expression):
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_RE.match(expression, position)
+        if not match:
+            raise client_error('ValidationException', f"Invalid expression: {expression}", 'Expression')
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+class _Expression:
+    """Recursive-descent evaluator for condition/filter/key expressions"""
+
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.names = names or {}
+        self.values = values or {}
+        self.position = 0
+        self.evaluate = self._or()
+        if self.position != len(self.tokens):
+            raise client_error('ValidationException', f"Unexpected token: {self.tokens[self.position]}", 'Expression')
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if expected is not None and (token is None or token.upper() != expected):
+            raise client_error('ValidationException', f"Expected {expected}, got {token}", 'Expression')
+        self.position += 1
+        return token
+
+    def _is(self, keyword):
+        token = self._peek()
+        return token is not None and token.upper() == keyword
+
+    def _or(self):
+        left = self._and()
+        while self._is('OR'):
+            self._take()
+            right = self._and()
+            left = (lambda a, b: lambda item: a(item) or b(item))(left, right)
+        return left
+
+    def _and(self):
+        left = self._not()
+        while self._is('AND'):
+            self._take()
+            right = self._not()
+            left = (lambda a, b: lambda item: a(item) and b(item))(left, right)
+        return left
+
+    def _not(self):
+        if self._is('NOT'):
+            self._take()
+            inner = self._not()
+            return lambda item: not inner(item)
+        return self._comparison()
+
+    def _operand(self):
+        token = self._take()
+        if token.startswith(':'):
+            if token not in self.values:
+                raise client_error('ValidationException', f"Value {token} not defined", 'Expression')
+            value = self.values[token]
+            return lambda item: value
+        name = self.names.get(token, token) if token.startswith('#') else token
+        return lambda item: item.get(name)
+
+    def _comparison(self):
+        if self._peek() == '(':
+            self._take()
+            inner = self._or()
+            self._take(')')
+            return inner
+
+        token = self._peek()
+        if token and self.position + 1 < len(self.tokens) and self.tokens[self.position + 1] == '(' \
+                and token.upper() not in KEYWORDS:
+            return self._function()
+
+        left = self._operand()
+        operator = self._take()
+        if operator.upper() == 'BETWEEN':
+            low = self._operand()
+            self._take('AND')
+            high = self._operand()
+            return lambda item: _compare(left(item), '>=', low(item)) and _compare(left(item), '<=', high(item))
+        if operator.upper() == 'IN':
+            self._take('(')
+            options = [self._operand()]
+            while self._peek() == ',':
+                self._take()
+                options.append(self._operand())
+            self._take(')')
+            return lambda item: any(left(item) == option(item) for option in options)
+        right = self._operand()
+        return lambda item: _compare(left(item), operator, right(item))
+
+    def _function(self):
+        name = self._take().lower()
+        self._take('(')
+        arguments = [self._operand()]
+        while self._peek() == ',':
+            self._take()
+            arguments.append(self._operand())
+        self._take(')')
+
+        if name == 'attribute_exists':
+            return lambda item: arguments[0](item) is not None
+        if name == 'attribute_not_exists':
+            return lambda item: arguments[0](item) is None
+        if name == 'begins_with':
+            return lambda item: isinstance(arguments[0](item), str) and arguments[0](item).startswith(arguments[1](item))
+        if name == 'contains':
+            def contains(item):
+                container, value = arguments[0](item), arguments[1](item)
+                if container is None:
+                    return False
+                return value in container
+            return contains
+        raise client_error('ValidationException', f"Unsupported function: {name}", 'Expression')
+
+
+def _compare(left, operator, right):
+    if left is None or right is None:
+        return operator == '<>' and left != right
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    try:
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[operator]
+    except TypeError:
+        return False
+
+
+def _condition(expression, names, values, is_key_condition=False):
+    """Build an evaluator from a string or a boto3 condition object"""
+    names, values = dict(names or {}), dict(values or {})
+    if isinstance(expression, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(expression, is_key_condition=is_key_condition)
+        names.update(built.attribute_name_placeholders)
+        values.update(_to_dynamo(built.attribute_value_placeholders))
+        expression = built.condition_expression
+    return _Expression(expression, names, values).evaluate
+
+
+def _split_top_level(text):
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class FakeTable:
+    """Dict-backed table with DynamoDB's scan, query and GSI semantics"""
+
+    def __init__(self, service, name, key_schema, indexes):
+        self.service = service
+        self.name = name
+        self.key_names = [k['AttributeName'] for k in sorted(key_schema, key=lambda k: k['KeyType'] != 'HASH')]
+        self.indexes = {index['IndexName']: index for index in indexes}
+        self.items = {}
+        self.lock = threading.RLock()
+
+    def key_of(self, item):
+        try:
+            return tuple(item[name] for name in self.key_names)
+        except KeyError as e:
+            raise client_error('ValidationException', f"Missing key attribute {e}", 'PutItem')
+
+    def scan_order(self, key):
+        # Stable, hash-like order that survives deletes between pages
+        return (zlib.crc32(repr(key).encode('utf-8')), repr(key))
+
+    def describe(self):
+        return {
+            'TableName': self.name,
+            'TableStatus': 'ACTIVE',
+            'ItemCount': len(self.items),
+            'KeySchema': [{'AttributeName': name, 'KeyType': 'HASH' if i == 0 else 'RANGE'}
+                          for i, name in enumerate(self.key_names)],
+            'GlobalSecondaryIndexes': [{**index, 'IndexStatus': 'ACTIVE'} for index in self.indexes.values()],
+            'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}
+        }
+
+
+class FakeTableResource:
+    """What FakeDynamoDB.Table() returns; mirrors the boto3 Table resource"""
+
+    def __init__(self, service, name):
+        self._service = service
+        self.name = name
+        self.table_name = name
+
+    @property
+    def _table(self):
+        table = self._service.tables.get(self.name)
+        if table is None:
+            raise client_error('ResourceNotFoundException', f"Requested resource not found: Table: {self.name} not found",
+                               'DescribeTable')
+        return table
+
+    def load(self):
+        self._service._record('DescribeTable')
+        self._table
+
+    @property
+    def table_status(self):
+        return self._table.describe()['TableStatus']
+
+    @property
+    def item_count(self):
+        return len(self._table.items)
+
+    @property
+    def key_schema(self):
+        return self._table.describe()['KeySchema']
+
+    @property
+    def global_secondary_indexes(self):
+        return self._table.describe()['GlobalSecondaryIndexes'] or None
+
+    def put_item(self, Item, ReturnValues='NONE', ConditionExpression=None,
+                 ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        self._service._record('PutItem')
+        table = self._table
+        item = _to_dynamo(copy.deepcopy(Item))
+        key = table.key_of(item)
+        with table.lock:
+            old = table.items.get(key)
+            if ConditionExpression is not None and not _condition(
+                    ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)(old or {}):
+                raise client_error('ConditionalCheckFailedException', 'The conditional request failed', 'PutItem')
+            table.items[key] = item
+        return {'Attributes': copy.deepcopy(old)} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        self._service._record('GetItem')
+        table = self._table
+        with table.lock:
+            item = table.items.get(table.key_of(Key))
+        if item is None:
+            return {}
+        return {'Item': self._service.project(item, ProjectionExpression, ExpressionAttributeNames)}
+
+    def delete_item(self, Key, ReturnValues='NONE', ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        self._service._record('DeleteItem')
+        table = self._table
+        key = table.key_of(Key)
+        with table.lock:
+            old = table.items.get(key)
+            if ConditionExpression is not None and not _condition(
+                    ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)(old or {}):
+                raise client_error('ConditionalCheckFailedException', 'The conditional request failed', 'DeleteItem')
+            table.items.pop(key, None)
+        return {'Attributes': copy.deepcopy(old)} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ReturnValues='NONE', ConditionExpression=None, **kwargs):
+        self._service._record('UpdateItem')
+        table = self._table
+        names = ExpressionAttributeNames or {}
+        values = _to_dynamo(ExpressionAttributeValues or {})
+        key = table.key_of(Key)
+
+        def resolve(token):
+            token = token.strip()
+            if token.startswith(':'):
+                return values[token]
+            return item.get(names.get(token, token))
+
+        with table.lock:
+            old = table.items.get(key)
+            if ConditionExpression is not None and not _condition(ConditionExpression, names, values)(old or {}):
+                raise client_error('ConditionalCheckFailedException', 'The conditional request failed', 'UpdateItem')
+            item = copy.deepcopy(old) if old else _to_dynamo(copy.deepcopy(Key))
+
+            clauses = re.split(r'\b(SET|ADD|REMOVE|DELETE)\b', UpdateExpression, flags=re.I)
+            for action, body in zip(clauses[1::2], clauses[2::2]):
+                action = action.upper()
+                for part in _split_top_level(body):
+                    if action == 'SET':
+                        path, expression = [p.strip() for p in part.split('=', 1)]
+                        path = names.get(path, path)
+                        function = re.match(r'(if_not_exists|list_append)\s*\((.*)\)$', expression)
+                        if function:
+                            first, second = _split_top_level(function.group(2))
+                            if function.group(1) == 'if_not_exists':
+                                current = resolve(first)
+                                item[path] = current if current is not None else resolve(second)
+                            else:
+                                item[path] = list(resolve(first) or []) + list(resolve(second) or [])
+                        elif re.search(r'\s[+-]\s', expression):
+                            left, operator, right = re.split(r'\s([+-])\s', expression, maxsplit=1)
+                            item[path] = resolve(left) + resolve(right) if operator == '+' else resolve(left) - resolve(right)
+                        else:
+                            item[path] = resolve(expression)
+                    elif action == 'ADD':
+                        path, value = part.split(None, 1)
+                        path = names.get(path, path)
+                        value = resolve(value)
+                        current = item.get(path)
+                        if isinstance(value, set):
+                            item[path] = (current or set()) | value
+                        else:
+                            item[path] = (current or Decimal(0)) + value
+                    elif action == 'REMOVE':
+                        item.pop(names.get(part, part), None)
+                    elif action == 'DELETE':
+                        path, value = part.split(None, 1)
+                        path = names.get(path, path)
+                        item[path] = (item.get(path) or set()) - resolve(value)
+            table.items[key] = item
+
+        if ReturnValues == 'ALL_OLD':
+            return {'Attributes': copy.deepcopy(old)} if old else {}
+        if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+            return {'Attributes': copy.deepcopy(item)}
+        return {}
+
+    def scan(self, FilterExpression=None, ProjectionExpression=None, ExpressionAttributeNames=None,
+             ExpressionAttributeValues=None, Limit=None, ExclusiveStartKey=None, Segment=None,
+             TotalSegments=None, Select=None, **kwargs):
+        self._service._record('Scan')
+        table = self._table
+        matches = _condition(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues) \
+            if FilterExpression is not None else None
+
+        with table.lock:
+            ordered = sorted(table.items.items(), key=lambda entry: table.scan_order(entry[0]))
+        if TotalSegments:
+            ordered = [entry for entry in ordered if table.scan_order(entry[0])[0] % TotalSegments == Segment]
+        if ExclusiveStartKey:
+            start = table.scan_order(table.key_of(ExclusiveStartKey))
+            ordered = [entry for entry in ordered if table.scan_order(entry[0]) > start]
+
+        page = ordered[:Limit] if Limit else ordered
+        items = [item for _, item in page if matches is None or matches(item)]
+        response = {
+            'Items': [self._service.project(item, ProjectionExpression, ExpressionAttributeNames) for item in items],
+            'Count': len(items),
+            'ScannedCount': len(page)
+        }
+        if Limit and len(ordered) > Limit:
+            response['LastEvaluatedKey'] = dict(zip(table.key_names, page[-1][0]))
+        if Select == 'COUNT':
+            response.pop('Items')
+        return response
+
+    def query(self, KeyConditionExpression, IndexName=None, FilterExpression=None, ProjectionExpression=None,
+              ExpressionAttributeNames=None, ExpressionAttributeValues=None, Limit=None, ExclusiveStartKey=None,
+              ScanIndexForward=True, Select=None, **kwargs):
+        self._service._record('Query')
+        table = self._table
+        if IndexName:
+            if IndexName not in table.indexes:
+                raise client_error('ValidationException', f"The table does not have the specified index: {IndexName}",
+                                   'Query')
+            key_names = [k['AttributeName'] for k in sorted(table.indexes[IndexName]['KeySchema'],
+                                                           key=lambda k: k['KeyType'] != 'HASH')]
+        else:
+            key_names = table.key_names
+
+        key_matches = _condition(KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                                 is_key_condition=True)
+        matches = _condition(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues) \
+            if FilterExpression is not None else None
+
+        with table.lock:
+            # Index entries only exist for items that have the index key attributes
+            candidates = [(key, item) for key, item in table.items.items()
+                          if all(name in item for name in key_names) and key_matches(item)]
+
+        def position(key, item):
+            return (item.get(key_names[1]) if len(key_names) > 1 else '', table.scan_order(key))
+
+        candidates.sort(key=lambda entry: position(*entry), reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            start_key = table.key_of(ExclusiveStartKey)
+            start = position(start_key, ExclusiveStartKey)
+            candidates = [entry for entry in candidates
+                          if (position(*entry) < start if not ScanIndexForward else position(*entry) > start)]
+
+        page = candidates[:Limit] if Limit else candidates
+        items = [item for _, item in page if matches is None or matches(item)]
+        response = {
+            'Items': [self._service.project(item, ProjectionExpression, ExpressionAttributeNames) for item in items],
+            'Count': len(items),
+            'ScannedCount': len(page)
+        }
+        if Limit and len(candidates) > Limit:
+            last_key, last_item = page[-1]
+            response['LastEvaluatedKey'] = {
+                **dict(zip(table.key_names, last_key)),
+                **{name: last_item[name] for name in key_names}
+            }
+        if Select == 'COUNT':
+            response.pop('Items')
+        return response
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self)
+
+
+class _BatchWriter:
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def put_item(self, Item):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key):
+        self.table.delete_item(Key=Key)
+
+
+class _Paginator:
+    def __init__(self, service):
+        self.service = service
+
+    def paginate(self, **kwargs):
+        yield self.service.list_tables()
+
+
+class _Waiter:
+    def wait(self, **kwargs):
+        pass
+
+
+class _Meta:
+    def __init__(self, client):
+        self.client = client
+
+
+class FakeDynamoDB(StubClient):
+    """In-memory stand-in for the DynamoDB resource (and the client calls
+    provisioning uses). Thread-safe: one instance serves every thread."""
+
+    service = 'dynamodb'
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.tables = {}
+        self.meta = _Meta(self)
+
+    def project(self, item, projection, names):
+        item = copy.deepcopy(item)
+        if not projection:
+            return item
+        wanted = [(names or {}).get(p.strip(), p.strip()) for p in projection.split(',')]
+        return {name: item[name] for name in wanted if name in item}
+
+    def Table(self, name):
+        return FakeTableResource(self, name)
+
+    def create_table(self, TableName, KeySchema, AttributeDefinitions=None, GlobalSecondaryIndexes=None, **kwargs):
+        self._record('CreateTable')
+        if TableName in self.tables:
+            raise client_error('ResourceInUseException', f"Table already exists: {TableName}", 'CreateTable')
+        self.tables[TableName] = FakeTable(self, TableName, KeySchema, GlobalSecondaryIndexes or [])
+        return self.Table(TableName)
+
+    def describe_table(self, TableName):
+        self._record('DescribeTable')
+        return {'Table': self.Table(TableName)._table.describe()}
+
+    def update_table(self, TableName, GlobalSecondaryIndexUpdates=None, **kwargs):
+        self._record('UpdateTable')
+        table = self.Table(TableName)._table
+        for update in GlobalSecondaryIndexUpdates or []:
+            if 'Create' in update:
+                table.indexes[update['Create']['IndexName']] = update['Create']
+            elif 'Delete' in update:
+                table.indexes.pop(update['Delete']['IndexName'], None)
+        return {'TableDescription': table.describe()}
+
+    def list_tables(self, **kwargs):
+        self._record('ListTables')
+        return {'TableNames': sorted(self.tables)}
+
+    def get_paginator(self, operation):
+        return _Paginator(self)
+
+    def get_waiter(self, name):
+        return _Waiter()
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self._record('BatchGetItem')
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)._table
+            with table.lock:
+                found = [table.items.get(table.key_of(key)) for key in request['Keys']]
+            responses[name] = [self.project(item, request.get('ProjectionExpression'),
+                                            request.get('ExpressionAttributeNames'))
+                               for item in found if item is not None]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
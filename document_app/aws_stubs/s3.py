@@ -0,0 +1,93 @@
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .base import StubClient, client_error, streaming_body
+
+
+class FakeS3(StubClient):
+    """Filesystem-backed stand-in for the S3 client: <root>/<bucket>/<key>"""
+
+    service = 's3'
+
+    def __init__(self, root, latency=0.0):
+        super().__init__(latency)
+        self.root = Path(root)
+        self._content_types = {}
+        self._lock = threading.Lock()
+
+    def _path(self, bucket, key):
+        path = (self.root / bucket / key).resolve()
+        if not str(path).startswith(str((self.root / bucket).resolve()) + os.sep):
+            raise client_error('InvalidRequest', f"Invalid key: {key}", 'PutObject')
+        return path
+
+    def _write(self, bucket, key, data, content_type):
+        path = self._path(bucket, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.part')
+        with open(tmp_path, 'wb') as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._content_types[(bucket, key)] = content_type or 'binary/octet-stream'
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, **kwargs):
+        self._record('PutObject')
+        self._write(Bucket, Key, Fileobj, (ExtraArgs or {}).get('ContentType'))
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType=None, **kwargs):
+        self._record('PutObject')
+        self._write(Bucket, Key, Body.encode('utf-8') if isinstance(Body, str) else Body, ContentType)
+        return {'ETag': '"stub"'}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._record('HeadObject')
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise client_error('404', 'Not Found', 'HeadObject', status=404)
+        stat = path.stat()
+        return {
+            'ContentLength': stat.st_size,
+            'ContentType': self._content_types.get((Bucket, Key), 'binary/octet-stream'),
+            'LastModified': datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        }
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._record('GetObject')
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise client_error('NoSuchKey', 'The specified key does not exist.', 'GetObject', status=404)
+        data = path.read_bytes()
+        return {
+            'Body': streaming_body(data),
+            'ContentLength': len(data),
+            'ContentType': self._content_types.get((Bucket, Key), 'binary/octet-stream')
+        }
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._record('DeleteObject')
+        path = self._path(Bucket, Key)
+        if path.is_file():
+            path.unlink()
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', **kwargs):
+        self._record('ListObjectsV2')
+        bucket_root = self.root / Bucket
+        contents = []
+        if bucket_root.is_dir():
+            for path in sorted(bucket_root.rglob('*')):
+                key = path.relative_to(bucket_root).as_posix()
+                if path.is_file() and key.startswith(Prefix) and not key.endswith('.part'):
+                    contents.append({'Key': key, 'Size': path.stat().st_size})
+        return {'Contents': contents, 'KeyCount': len(contents), 'IsTruncated': False}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        # Local file URL; no network call, like the real client
+        return self._path(Params['Bucket'], Params['Key']).as_uri()
@@ -0,0 +1,192 @@
+"""Background batched inserts for append-only tables.
+
+BatchWriter.add() queues an unsaved model instance in memory and returns at
+once; a daemon thread writes the queue with bulk_create every flush_seconds,
+or sooner once batch_size rows are waiting. Request threads therefore never
+wait on a database write (with SQLite, on the database write lock).
+
+The queue is bounded by max_pending. When it is full, when_full='drop'
+discards the new row, and 'block' waits up to block_seconds for the writer
+to make room before discarding it. Dropped rows are counted in the
+batch_writer_dropped_total metric. Rows whose write fails are requeued, as
+far as the bound allows, and retried on the next flush. While the database
+is unavailable (OperationalError) that goes on until the queue bound drops
+rows; any other error is retried max_attempts times in a row, after which
+the rows are written one at a time, so only the rows that still fail are
+dropped (logged, and counted in batch_writer_failed_total).
+"""
+import atexit
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+from django.apps import apps
+from django.db import OperationalError
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_writers = weakref.WeakSet()
+
+
+class BatchWriter:
+    """Queue of rows for one model, written in batches by a background thread.
+
+    after_flush, if given, is called on the writer thread with the rows just
+    written (an empty list after a request_flush() with nothing queued),
+    e.g. to roll them up.
+    """
+
+    def __init__(self, model, name, batch_size=200, flush_seconds=5, max_pending=10000,
+                 when_full='drop', block_seconds=0.5, after_flush=None, max_attempts=3):
+        self.model = model  # 'app_label.ModelName', resolved on first write
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.when_full = when_full
+        self.block_seconds = block_seconds
+        self.after_flush = after_flush
+        self.max_attempts = max_attempts
+        self._attempts = 0  # Consecutive failed writes, other than the database being unavailable
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._thread = None
+        self._flush_requested = False
+        self._dropped = 0
+        _writers.add(self)
+
+    def add(self, row):
+        """Queue row for writing; False if it was dropped because the queue is full"""
+        with self._room:
+            self._ensure_thread()
+            if len(self._pending) >= self.max_pending and self.when_full == 'block':
+                self._wake.set()
+                deadline = time.monotonic() + self.block_seconds
+                while len(self._pending) >= self.max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._room.wait(remaining):
+                        break
+            if len(self._pending) >= self.max_pending:
+                self._drop(1)
+                return False
+            self._pending.append(row)
+            waiting = len(self._pending)
+        if waiting >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def pending(self, predicate=None):
+        """Queued rows not yet written (matching predicate), oldest first"""
+        with self._lock:
+            return [row for row in self._pending if predicate is None or predicate(row)]
+
+    def discard(self, predicate=None):
+        """Drop queued rows matching predicate (all by default); returns how many"""
+        with self._room:
+            kept = [row for row in self._pending if predicate is not None and not predicate(row)]
+            discarded = len(self._pending) - len(kept)
+            self._pending = deque(kept)
+            self._room.notify_all()
+        return discarded
+
+    def request_flush(self):
+        """Flush soon and run after_flush, even if nothing is queued"""
+        with self._lock:
+            self._flush_requested = True
+            self._ensure_thread()
+        self._wake.set()
+
+    def flush(self):
+        """Write everything queued; returns the number of rows written"""
+        with self._room:
+            rows = list(self._pending)
+            self._pending.clear()
+            requested, self._flush_requested = self._flush_requested, False
+            self._room.notify_all()
+        if rows:
+            try:
+                apps.get_model(self.model).objects.bulk_create(rows, batch_size=500)
+                self._attempts = 0
+            except Exception as e:
+                logger.error('Failed to write %d %s rows: %s', len(rows), self.name, e)
+                if not isinstance(e, OperationalError):
+                    self._attempts += 1
+                if isinstance(e, OperationalError) or self._attempts < self.max_attempts:
+                    self._requeue(rows)
+                    return 0
+                self._attempts = 0
+                rows = self._write_one_by_one(rows)
+        if rows:
+            instrumentation.metrics.inc('batch_writer_rows_total', {'writer': self.name}, len(rows),
+                                        help_text='Rows written by background batch writers')
+        if self.after_flush is not None and (rows or requested):
+            try:
+                self.after_flush(rows)
+            except Exception as e:
+                logger.error('%s after-flush hook failed: %s', self.name, e)
+        return len(rows)
+
+    def _write_one_by_one(self, rows):
+        """Write rows singly after repeated batch failures, dropping those that
+        fail on their own; returns the rows written"""
+        written = []
+        for position, row in enumerate(rows):
+            try:
+                apps.get_model(self.model).objects.bulk_create([row])
+            except OperationalError as e:
+                logger.error('Database unavailable while isolating failed %s rows: %s', self.name, e)
+                self._requeue(rows[position:])
+                break
+            except Exception as e:
+                logger.error('Dropping %s row that cannot be written: %s', self.name, e)
+                instrumentation.metrics.inc('batch_writer_failed_total', {'writer': self.name},
+                                            help_text='Rows dropped by background batch writers after failed writes')
+            else:
+                written.append(row)
+        return written
+
+    def _requeue(self, rows):
+        with self._room:
+            room = max(self.max_pending - len(self._pending), 0)
+            if len(rows) > room:
+                self._drop(len(rows) - room)
+                rows = rows[len(rows) - room:]
+            self._pending.extendleft(reversed(rows))
+
+    def _drop(self, count):
+        # Called with the lock held; warn once per flush interval, count every row
+        if not self._dropped:
+            logger.warning('%s queue full (%d rows); dropping rows', self.name, self.max_pending)
+        self._dropped += count
+        instrumentation.metrics.inc('batch_writer_dropped_total', {'writer': self.name}, count,
+                                    help_text='Rows dropped by background batch writers with a full queue')
+
+    def _ensure_thread(self):
+        # Called with the lock held; started lazily so forked workers get their own
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name=f'batch-writer-{self.name}')
+            self._thread.start()
+
+    def _run(self):
+        from django.db import connection
+
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+            with self._lock:
+                self._dropped = 0
+            connection.close_if_unusable_or_obsolete()
+
+
+@atexit.register
+def _flush_at_exit():
+    for writer in list(_writers):
+        if writer._pending:
+            writer.flush()
@@ -0,0 +1,180 @@
+"""Namespaced caching on the shared Django cache.
+
+settings.CACHES points at a store shared by every worker process (a
+file-based cache on one host, Redis across hosts), so a value computed by
+one gunicorn worker is reused by the others. Namespace adds on top:
+
+- keys prefixed with the namespace and a generation number, so clear()
+  drops a whole namespace without tracking its keys. A process reuses the
+  generation it read for GENERATION_TTL seconds, so a clear() in another
+  process takes up to that long to be seen here;
+- get_or_set() with stampede protection: per key, one thread per process
+  (a lock) recomputes, other processes are held off by a lease taken with
+  cache.add, and the waiters get its result;
+- stale-while-revalidate: entries carry a soft expiry, after which callers
+  get the stale value at once while a background thread recomputes it.
+
+Leases and counters built on cache.add() and cache.incr(), here and in
+the modules using this cache, are best-effort. Redis and Memcached make
+both atomic, but FileBasedCache implements them as a read followed by a
+write, so two processes can now and then both take a lease or lose an
+increment. Every use tolerates that (the cost is duplicate work or an
+update skipped until the entry is rebuilt); set CACHE_REDIS_URL where it
+should not happen.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 200
+GENERATION_TTL = 1.0
+
+# (alias, namespace name) -> (generation, time.monotonic() when read)
+_generations = {}
+
+
+class _KeyLocks:
+    """One lock per key, dropped when no thread holds or waits for it"""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, key):
+        with self._guard:
+            lock, users = self._locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._guard:
+                lock, users = self._locks[key]
+                if users == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, users - 1)
+
+
+_key_locks = _KeyLocks()
+
+
+class Namespace:
+    """A group of cache keys on one of the configured caches"""
+
+    def __init__(self, name, alias='default'):
+        self.name = name
+        self.alias = alias
+
+    @property
+    def backend(self):
+        # caches[] hands out one connection per thread
+        return caches[self.alias]
+
+    def _generation(self):
+        cached = _generations.get((self.alias, self.name))
+        if cached is not None and time.monotonic() - cached[1] < GENERATION_TTL:
+            return cached[0]
+        key = f"{self.name}:generation"
+        generation = self.backend.get(key)
+        if generation is None:
+            self.backend.add(key, 1, None)
+            generation = self.backend.get(key, 1)
+        _generations[(self.alias, self.name)] = (generation, time.monotonic())
+        return generation
+
+    def key(self, *parts):
+        """Full backend key for parts; long or unsafe keys are hashed"""
+        raw = ':'.join(str(part) for part in parts)
+        if len(raw) > MAX_KEY_LENGTH or any(ch.isspace() or ord(ch) < 33 for ch in raw):
+            raw = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        return f"{self.name}:{self._generation()}:{raw}"
+
+    def get(self, key, default=None):
+        entry = self.backend.get(self.key(key))
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl):
+        self.backend.set(self.key(key), (value, time.time() + ttl), ttl)
+
+    def delete(self, key):
+        self.backend.delete(self.key(key))
+
+    def clear(self):
+        """Invalidate every key in the namespace"""
+        key = f"{self.name}:generation"
+        try:
+            generation = self.backend.incr(key)
+        except ValueError:
+            generation = 2
+            self.backend.set(key, generation, None)
+        _generations[(self.alias, self.name)] = (generation, time.monotonic())
+
+    def get_or_set(self, key, compute, ttl, stale_ttl=0, wait=10.0):
+        """Cached value for key, computing it with compute() when missing.
+
+        Fresh for ttl seconds; for stale_ttl seconds after that the old
+        value is still returned while one caller refreshes it in the
+        background. Callers that find another worker computing the value
+        wait up to `wait` seconds for it before computing it themselves.
+        Falsy results are returned but not cached, so they are retried.
+        """
+        full_key = self.key(key)
+        entry = self.backend.get(full_key)
+        if entry is not None:
+            value, fresh_until = entry
+            if time.time() >= fresh_until:
+                self._refresh_in_background(full_key, compute, ttl, stale_ttl, wait)
+            return value
+
+        with _key_locks.hold(full_key):
+            # Another thread here may have filled it while we waited
+            entry = self.backend.get(full_key)
+            if entry is not None:
+                return entry[0]
+
+            lease = f"{full_key}:lease"
+            if self.backend.add(lease, 1, max(int(wait * 2), 10)):
+                try:
+                    return self._store(full_key, compute(), ttl, stale_ttl)
+                finally:
+                    self.backend.delete(lease)
+
+            # Another process holds the lease: wait for its result
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = self.backend.get(full_key)
+                if entry is not None:
+                    return entry[0]
+            logger.warning('Gave up waiting for %s after %.1fs; computing it here', full_key, wait)
+            return self._store(full_key, compute(), ttl, stale_ttl)
+
+    def _store(self, full_key, value, ttl, stale_ttl):
+        if value:
+            self.backend.set(full_key, (value, time.time() + ttl), ttl + stale_ttl)
+        return value
+
+    def _refresh_in_background(self, full_key, compute, ttl, stale_ttl, wait):
+        lease = f"{full_key}:lease"
+        if not self.backend.add(lease, 1, max(int(wait * 2), 10)):
+            return  # Someone is already refreshing it
+
+        def refresh():
+            try:
+                self._store(full_key, compute(), ttl, stale_ttl)
+            except Exception as e:
+                logger.error('Background refresh of %s failed: %s', full_key, e)
+            finally:
+                caches[self.alias].delete(lease)
+
+        threading.Thread(target=refresh, daemon=True, name=f'cache-refresh-{self.name}').start()
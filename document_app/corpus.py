@@ -0,0 +1,46 @@
+"""Version number of the document collection.
+
+A counter in the shared cache, bumped whenever a document is stored,
+updated or deleted. Values derived from the whole collection (dynamic
+suggestions, the collection analysis) include it in their cache keys, so
+ingestion invalidates them without the search backend being queried to
+find out whether anything changed.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from .signals import document_deleted, document_stored
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'corpus:version'
+
+
+def corpus_version():
+    """Current version; one cache read"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses an old number
+        cache.add(VERSION_KEY, int(time.time()), None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def bump_corpus_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time()), None)
+        return cache.incr(VERSION_KEY)
+
+
+@receiver(document_stored)
+@receiver(document_deleted)
+def _bump_on_change(sender, document_id, **kwargs):
+    try:
+        bump_corpus_version()
+    except Exception as e:
+        logger.error('Failed to bump corpus version for %s: %s', document_id, e)
@@ -0,0 +1,291 @@
+"""Per-request accounting of remote calls and process-wide metrics.
+
+Every AWS call made through the client registry is recorded (service,
+operation, duration, retries, bytes, status), plus model and token counts
+for Bedrock invocations. Calls are attributed to the current request via a
+context variable set by RequestMetricsMiddleware, which reports them as a
+Server-Timing header and a structured log line. Totals are aggregated per
+process and served in Prometheus text format by the /api/metrics view.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from .logging_utils import StructuredMessage
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('remote_calls', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestCalls:
+    """Remote calls made while serving one request (thread-safe)"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    def by_operation(self):
+        """(service, operation) -> [count, total seconds]"""
+        totals = defaultdict(lambda: [0, 0.0])
+        with self._lock:
+            for call in self.calls:
+                entry = totals[(call['service'], call['operation'])]
+                entry[0] += 1
+                entry[1] += call['duration']
+        return totals
+
+
+def start_request():
+    """Begin collecting calls for the current context; returns a reset token"""
+    return _current.set(RequestCalls())
+
+
+def finish_request(token):
+    collected = _current.get()
+    _current.reset(token)
+    return collected
+
+
+def current_calls():
+    return _current.get()
+
+
+class _Metrics:
+    """Minimal counters and histograms with Prometheus text exposition"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.help = {}
+
+    def inc(self, name, labels, value=1.0, help_text=''):
+        with self._lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+            self.help.setdefault(name, ('counter', help_text))
+
+    def observe(self, name, labels, value, help_text=''):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(DURATION_BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+            self.help.setdefault(name, ('histogram', help_text))
+
+    def render(self):
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self.help.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'counter':
+                    for (metric, labels), value in sorted(self.counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{label_text(labels)} {value:g}")
+                else:
+                    for (metric, labels), histogram in sorted(self.histograms.items()):
+                        if metric != name:
+                            continue
+                        for bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+                            lines.append(f"{name}_bucket{label_text(labels, [('le', f'{bound:g}')])} {count}")
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram['count']}")
+                        lines.append(f"{name}_sum{label_text(labels)} {histogram['sum']:.6f}")
+                        lines.append(f"{name}_count{label_text(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = _Metrics()
+
+
+def record_call(service, operation, duration, status='ok', retries=0, bytes_sent=0, bytes_received=0,
+                model=None, input_tokens=None, output_tokens=None, cache_read_tokens=None,
+                cache_write_tokens=None):
+    """Record one remote call for the current request and the process metrics.
+
+    cache_read_tokens and cache_write_tokens are the input tokens Bedrock
+    served from, or wrote to, its prompt cache.
+    """
+    call = {
+        'service': service,
+        'operation': operation,
+        'duration': duration,
+        'status': status,
+        'retries': retries,
+        'bytes_sent': bytes_sent,
+        'bytes_received': bytes_received,
+    }
+    if model:
+        call.update(model=model, input_tokens=input_tokens, output_tokens=output_tokens,
+                    cache_read_tokens=cache_read_tokens, cache_write_tokens=cache_write_tokens)
+
+    collected = _current.get()
+    if collected is not None:
+        collected.add(call)
+
+    labels = {'service': service, 'operation': operation}
+    metrics.inc('aws_calls_total', {**labels, 'status': status}, help_text='AWS API calls')
+    metrics.observe('aws_call_duration_seconds', labels, duration, help_text='AWS API call latency')
+    if retries:
+        metrics.inc('aws_call_retries_total', labels, retries, help_text='AWS API call retries')
+    if bytes_sent:
+        metrics.inc('aws_bytes_sent_total', labels, bytes_sent, help_text='Request payload bytes')
+    if bytes_received:
+        metrics.inc('aws_bytes_received_total', labels, bytes_received, help_text='Response payload bytes')
+    if model:
+        metrics.observe('bedrock_invocation_seconds', {'model': model}, duration,
+                        help_text='Bedrock model invocation latency')
+        for direction, tokens in (('input', input_tokens), ('output', output_tokens),
+                                  ('cache_read', cache_read_tokens), ('cache_write', cache_write_tokens)):
+            if tokens:
+                metrics.inc('bedrock_tokens_total', {'model': model, 'direction': direction}, tokens,
+                            help_text='Bedrock tokens')
+
+
+def _payload_size(request_dict):
+    length = (request_dict.get('headers') or {}).get('Content-Length')
+    if length:
+        return int(length)
+    body = request_dict.get('body')
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    # Streaming bodies: measure without consuming
+    if hasattr(body, 'seek') and hasattr(body, 'tell'):
+        position = body.tell()
+        size = body.seek(0, 2) - position
+        body.seek(position)
+        return size
+    return 0
+
+
+def _before_call(model, params, context, **kwargs):
+    context['instrumentation'] = {
+        'service': model.service_model.service_name,
+        'operation': model.name,
+        'bytes_sent': _payload_size(params),
+        'started': time.perf_counter(),
+    }
+
+
+def _before_parameter_build(params, context, **kwargs):
+    # The modelId is only visible before serialisation
+    if 'modelId' in params:
+        context['instrumentation_model'] = params['modelId']
+
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    state = context.get('instrumentation')
+    if not state:
+        return
+    headers = getattr(http_response, 'headers', {}) or {}
+    metadata = (parsed or {}).get('ResponseMetadata', {})
+    status = 'ok' if getattr(http_response, 'status_code', 200) < 300 else parsed.get('Error', {}).get('Code', 'error')
+    input_tokens = headers.get('x-amzn-bedrock-input-token-count')
+    output_tokens = headers.get('x-amzn-bedrock-output-token-count')
+    cache_read_tokens = headers.get('x-amzn-bedrock-cache-read-input-token-count')
+    cache_write_tokens = headers.get('x-amzn-bedrock-cache-write-input-token-count')
+    record_call(
+        state['service'], state['operation'], time.perf_counter() - state['started'],
+        status=status,
+        retries=metadata.get('RetryAttempts', 0),
+        bytes_sent=state['bytes_sent'],
+        bytes_received=int(headers.get('content-length') or 0),
+        model=context.get('instrumentation_model'),
+        input_tokens=int(input_tokens) if input_tokens else None,
+        output_tokens=int(output_tokens) if output_tokens else None,
+        cache_read_tokens=int(cache_read_tokens) if cache_read_tokens else None,
+        cache_write_tokens=int(cache_write_tokens) if cache_write_tokens else None,
+    )
+
+
+def _after_call_error(exception, context, **kwargs):
+    state = context.get('instrumentation')
+    if state:
+        record_call(state['service'], state['operation'], time.perf_counter() - state['started'],
+                    status=type(exception).__name__, bytes_sent=state['bytes_sent'],
+                    model=context.get('instrumentation_model'))
+
+
+def instrument_client(client):
+    """Hook a boto3 client's events so its calls are recorded"""
+    events = client.meta.events
+    events.register('before-parameter-build', _before_parameter_build, unique_id='instrumentation-params')
+    events.register('before-call', _before_call, unique_id='instrumentation-before')
+    events.register('after-call', _after_call, unique_id='instrumentation-after')
+    events.register('after-call-error', _after_call_error, unique_id='instrumentation-error')
+    return client
+
+
+def server_timing(collected, total_seconds):
+    """Server-Timing header value: app total plus one entry per AWS operation"""
+    entries = [f'total;dur={total_seconds * 1000:.1f}']
+    if collected:
+        for (service, operation), (count, seconds) in sorted(collected.by_operation().items()):
+            entries.append(f'{service}-{operation};dur={seconds * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"')
+    return ', '.join(entries)
+
+
+def record_request(request, response, collected, total_seconds, budget_ms=None):
+    """Structured log line and process metrics for one finished request.
+
+    Requests slower than budget_ms are logged at WARNING so they stand out.
+    """
+    calls = collected.calls if collected else []
+    view = getattr(getattr(request, 'resolver_match', None), 'view_name', None) or 'unresolved'
+    duration_ms = round(total_seconds * 1000, 1)
+    entry = {
+        'event': 'request',
+        'method': request.method,
+        'path': request.path,
+        'view': view,
+        'status': response.status_code,
+        'duration_ms': duration_ms,
+        'aws_calls': len(calls),
+        'aws_ms': round(sum(call['duration'] for call in calls) * 1000, 1),
+        'operations': {f"{service}.{operation}": {'count': count, 'ms': round(seconds * 1000, 1)}
+                       for (service, operation), (count, seconds) in sorted(collected.by_operation().items())}
+        if collected else {},
+    }
+    retries = sum(call['retries'] for call in calls)
+    if retries:
+        entry['aws_retries'] = retries
+    bedrock = [call for call in calls if call.get('model')]
+    if bedrock:
+        entry['bedrock'] = [{'model': call['model'], 'ms': round(call['duration'] * 1000, 1),
+                             'input_tokens': call['input_tokens'], 'output_tokens': call['output_tokens'],
+                             **{key: call[key] for key in ('cache_read_tokens', 'cache_write_tokens')
+                                if call.get(key)}}
+                            for call in bedrock]
+    over_budget = bool(budget_ms) and duration_ms > budget_ms
+    if over_budget:
+        entry['budget_ms'] = budget_ms
+    logger.log(logging.WARNING if over_budget else logging.INFO, StructuredMessage(**entry))
+
+    labels = {'view': view, 'method': request.method}
+    metrics.inc('http_requests_total', {**labels, 'status': response.status_code}, help_text='HTTP requests')
+    metrics.observe('http_request_duration_seconds', labels, total_seconds, help_text='HTTP request latency')
+    metrics.inc('http_request_aws_calls_total', labels, len(calls), help_text='AWS calls made by HTTP requests')
+    if over_budget:
+        metrics.inc('http_requests_over_budget_total', labels, help_text='HTTP requests over the latency budget')
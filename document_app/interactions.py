@@ -0,0 +1,143 @@
+"""Search interaction log and its rollups.
+
+Tracking an interaction queues it on a BatchWriter (O(1), no cache or
+database round trip), which writes it to the SearchInteraction table with
+bulk_create every INTERACTION_FLUSH_SECONDS, or sooner once
+INTERACTION_BATCH_SIZE rows are waiting.
+
+After each flush the new rows are rolled up into totals and a Space-Saving
+summary of the most frequent queries, kept in the shared cache. Rollups are
+incremental (they resume from the last rolled-up row id) and run under a
+lease, so worker processes never double count; analytics reads are a single
+cache get. The log is the source of truth: if the rollup is evicted it is
+rebuilt from it.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = 'interactions:rollup'
+ROLLUP_LEASE_KEY = 'interactions:rollup-lease'
+ROLLUP_CHUNK = 5000
+MAX_BUFFERED = 10000  # Rows beyond this are dropped while the database is unavailable
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())[:500]
+
+
+class SpaceSaving:
+    """Approximate top-K counter (Metwally et al., Space-Saving).
+
+    Keeps at most `capacity` counters. An item that is not tracked replaces
+    the one with the smallest count and inherits that count as its error
+    bound, so every item seen more than total/capacity times is tracked and
+    its count is over-estimated by at most its error.
+    """
+
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        # item -> [count, error]
+        self.counters = {item: list(entry) for item, entry in (counters or {}).items()}
+
+    def add(self, item, count=1):
+        entry = self.counters.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+        else:
+            smallest = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[item] = [floor + count, floor]
+
+    def top(self, n):
+        """[(item, count)] for the n largest counts"""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [(item, entry[0]) for item, entry in ranked[:n]]
+
+
+def _empty_rollup():
+    return {'last_id': 0, 'total_searches': 0, 'total_clicks': 0, 'top_queries': {}}
+
+
+def rollup_interactions():
+    """Fold log rows added since the last rollup into the shared rollup.
+
+    Returns the number of rows rolled up, or None when another process
+    holds the rollup lease.
+    """
+    from .models import SearchInteraction
+
+    # Best-effort on FileBasedCache; overlapping rollups start from the same
+    # last_id, so they repeat work but the last write is still complete
+    if not cache.add(ROLLUP_LEASE_KEY, 1, 300):
+        return None
+    try:
+        state = cache.get(ROLLUP_KEY) or _empty_rollup()
+        top = SpaceSaving(getattr(settings, 'INTERACTION_TOP_K', 200), state['top_queries'])
+        rolled = 0
+        while True:
+            rows = list(SearchInteraction.objects.filter(id__gt=state['last_id'])
+                        .order_by('id')
+                        .values_list('id', 'normalized_query', 'result_clicked')[:ROLLUP_CHUNK])
+            if not rows:
+                break
+            for row_id, query, clicked in rows:
+                state['total_searches'] += 1
+                state['total_clicks'] += clicked
+                top.add(query)
+            state['last_id'] = rows[-1][0]
+            rolled += len(rows)
+        state['top_queries'] = top.counters
+        cache.set(ROLLUP_KEY, state, None)
+        if rolled:
+            logger.debug('Rolled up %d search interactions', rolled)
+        return rolled
+    finally:
+        cache.delete(ROLLUP_LEASE_KEY)
+
+
+def interaction_analytics(limit=20):
+    """Totals and the most popular queries, from the precomputed rollup"""
+    state = cache.get(ROLLUP_KEY)
+    if state is None:
+        # Evicted or never built: rebuild from the log in the background
+        interaction_log.request_flush()
+        state = _empty_rollup()
+    top = SpaceSaving(getattr(settings, 'INTERACTION_TOP_K', 200), state['top_queries'])
+    searches = state['total_searches']
+    return {
+        'total_searches': searches,
+        'total_clicks': state['total_clicks'],
+        'click_through_rate': state['total_clicks'] / searches if searches else 0,
+        'popular_queries': dict(top.top(limit)),
+    }
+
+
+def record_interaction(query, result_clicked=False, user_session=None):
+    """Queue an interaction for the log; returns at once"""
+    from .models import SearchInteraction
+
+    interaction_log.add(SearchInteraction(query=query[:500], normalized_query=normalize_query(query),
+                                          result_clicked=bool(result_clicked),
+                                          user_session=user_session or ''))
+
+
+def pending_interactions(user_session):
+    """Queued interactions of a session not yet written, oldest first"""
+    return interaction_log.pending(lambda row: row.user_session == user_session)
+
+
+interaction_log = BatchWriter(
+    'document_app.SearchInteraction', 'search_interactions',
+    batch_size=getattr(settings, 'INTERACTION_BATCH_SIZE', 200),
+    flush_seconds=getattr(settings, 'INTERACTION_FLUSH_SECONDS', 5),
+    max_pending=MAX_BUFFERED,
+    after_flush=lambda rows: rollup_interactions(),
+)
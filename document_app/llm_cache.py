@@ -0,0 +1,100 @@
+"""Shared cache of Bedrock responses for fixed prompt templates.
+
+Several prompts are a fixed template around a short input, run at low
+temperature (intent classification, search-term extraction, result
+selection, follow-up suggestions), and the same inputs recur across users.
+invoke_model() answers those from the shared cache, keyed by model,
+template id, normalized inputs and inference parameters, so a popular
+question reaches Bedrock once per TTL rather than once per asker.
+
+Caching is opt-in per template: LLM_CACHE_TEMPLATES maps a template id to
+its TTL, and templates not listed always call Bedrock. Bump a template's
+id (e.g. a ':v2' suffix) when its prompt text changes. Responses larger
+than LLM_CACHE_MAX_ENTRY_BYTES are not stored, and after
+LLM_CACHE_MAX_ENTRIES stores the namespace starts over, leaving the old
+entries to expire.
+"""
+import hashlib
+import io
+import json
+import logging
+
+from botocore.response import StreamingBody
+from django.conf import settings
+
+from . import instrumentation
+from .cache import Namespace
+
+logger = logging.getLogger(__name__)
+
+responses = Namespace('llm_responses')
+
+STORED_KEY = 'stored'
+
+
+def normalize(value):
+    """inputs with strings case-folded and whitespace collapsed"""
+    if isinstance(value, str):
+        return ' '.join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+def response_key(model_id, template, inputs, body):
+    inference = json.loads(body).get('inferenceConfig') if isinstance(body, str) else None
+    payload = json.dumps([model_id, template, normalize(inputs), inference], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def invoke_model(client, template, inputs, **kwargs):
+    """client.invoke_model(**kwargs), answered from the response cache when
+    template is listed in LLM_CACHE_TEMPLATES.
+
+    inputs are the values filled into the template (a string, list or
+    dict); they identify the prompt in place of its full text.
+    """
+    ttl = getattr(settings, 'LLM_CACHE_TEMPLATES', {}).get(template)
+    if not ttl:
+        return client.invoke_model(**kwargs)
+
+    key = response_key(kwargs.get('modelId'), template, inputs, kwargs.get('body'))
+    try:
+        cached = responses.get(key)
+    except Exception as e:
+        logger.warning('LLM response cache unavailable: %s', e)
+        return client.invoke_model(**kwargs)
+    _count(template, 'hit' if cached is not None else 'miss')
+    if cached is not None:
+        return _response(cached)
+
+    response = client.invoke_model(**kwargs)
+    data = response['body'].read()
+    entry = {'body': data, 'contentType': response.get('contentType', 'application/json')}
+    if len(data) <= getattr(settings, 'LLM_CACHE_MAX_ENTRY_BYTES', 16384):
+        try:
+            _store(key, entry, ttl)
+        except Exception as e:
+            logger.warning('Failed to cache %s response: %s', template, e)
+    return _response(entry)
+
+
+def _store(key, entry, ttl):
+    # The count is approximate where incr() is not atomic (FileBasedCache)
+    responses.set(key, entry, ttl)
+    counter = responses.key(STORED_KEY)
+    responses.backend.add(counter, 0, None)
+    if responses.backend.incr(counter) > getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 10000):
+        responses.clear()
+
+
+def _response(entry):
+    data = entry['body']
+    return {'body': StreamingBody(io.BytesIO(data), len(data)), 'contentType': entry['contentType']}
+
+
+def _count(template, result):
+    instrumentation.metrics.inc('llm_cache_requests_total', {'template': template, 'result': result},
+                                help_text='Cacheable Bedrock prompts by template and cache hit or miss')
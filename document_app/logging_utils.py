@@ -0,0 +1,104 @@
+"""Logging helpers referenced from settings.LOGGING.
+
+Messages are formatted lazily (logger.debug('...%s', value)), so records
+below a logger's level cost a level check and nothing more. SamplingFilter
+thins out chatty DEBUG/INFO records per logger, and JsonFormatter writes
+one JSON object per line for log shippers.
+"""
+import json
+import logging
+import random
+
+
+class StructuredMessage:
+    """Log message carrying fields; rendered as JSON only if it is emitted"""
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes a fraction of DEBUG and INFO records per logger.
+
+    rates maps logger names to a fraction between 0 and 1; the longest
+    matching prefix wins, and loggers with no entry are not sampled.
+    WARNING and above always pass.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._cache = {}
+
+    def _rate(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = float(self.rates[prefix])
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; StructuredMessage fields are merged in"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if isinstance(record.msg, StructuredMessage):
+            entry.update(record.msg.fields)
+        else:
+            entry['message'] = record.getMessage()
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def build_logging_config(level='INFO', levels=None, log_format='plain', sample_rates=None):
+    """dictConfig for the app: console handler, per-module levels, sampling"""
+    loggers = {'document_app': {'level': level}}
+    for name, module_level in (levels or {}).items():
+        loggers[name] = {'level': module_level}
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'plain': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+            'json': {'()': 'document_app.logging_utils.JsonFormatter'},
+        },
+        'filters': {
+            'sampling': {'()': 'document_app.logging_utils.SamplingFilter', 'rates': sample_rates or {}},
+        },
+        'handlers': {
+            'console': {
+                'class': 'logging.StreamHandler',
+                'formatter': log_format,
+                'filters': ['sampling'],
+            },
+        },
+        'root': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'loggers': {
+            'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+            **loggers,
+        },
+    }
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from document_app.aws_ai_search.vector_index import get_vector_index
+from document_app.aws_document_pipeline.dynamodb_storage import DynamoDBStorage
+
+
+class Command(BaseCommand):
+    help = "Backfill the local semantic index from the documents stored in DynamoDB"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--segments',
+            type=int,
+            default=getattr(settings, 'DYNAMODB_SCAN_SEGMENTS', 4),
+            help='Parallel scan segments'
+        )
+        parser.add_argument('--compact', action='store_true', help='Drop superseded rows afterwards')
+        parser.add_argument('--ann', action='store_true', help='Build the IVF partition afterwards')
+
+    def handle(self, *args, **options):
+        storage = DynamoDBStorage()
+        if not storage.table_accessible:
+            raise CommandError(f"DynamoDB table '{storage.table_name}' is not accessible")
+
+        index = get_vector_index()
+        # Documents indexed at ingestion have full-text chunks; never replace those
+        indexed = index.document_ids()
+        count = skipped = 0
+        for doc in storage.iter_scan(segments=options['segments']):
+            if doc['DocumentID'] in indexed:
+                skipped += 1
+                continue
+            # Only the summary and keywords are stored; the full text is not re-extracted
+            text = f"{doc.get('content_summary', '')} {' '.join(doc.get('keywords', []))}"
+            index.add_document(doc['DocumentID'], doc.get('filename', ''), text, {
+                'category': doc.get('category', ''),
+                'keywords': doc.get('keywords', []),
+                's3_key': doc.get('s3_key', ''),
+                'file_type': doc.get('file_type', ''),
+                'upload_date': doc.get('upload_date', '')
+            })
+            count += 1
+
+        if options['compact']:
+            self.stderr.write(f"Compacted to {index.compact()} rows")
+        if options['ann']:
+            index.build_ann()
+
+        self.stderr.write(f"Indexed {count} documents, skipped {skipped} already indexed")
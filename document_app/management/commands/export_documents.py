@@ -0,0 +1,44 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from document_app.aws_document_pipeline.dynamodb_storage import DynamoDBStorage
+
+
+class Command(BaseCommand):
+    help = "Stream every document's metadata from DynamoDB as JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout)')
+        parser.add_argument(
+            '--fields',
+            help='Comma-separated attributes to export (default: all)'
+        )
+        parser.add_argument(
+            '--segments',
+            type=int,
+            default=getattr(settings, 'DYNAMODB_SCAN_SEGMENTS', 4),
+            help='Parallel scan segments'
+        )
+
+    def handle(self, *args, **options):
+        storage = DynamoDBStorage()
+        if not storage.table_accessible:
+            raise CommandError(f"DynamoDB table '{storage.table_name}' is not accessible")
+
+        projection = [f.strip() for f in options['fields'].split(',') if f.strip()] if options['fields'] else None
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+
+        count = 0
+        try:
+            for doc in storage.iter_scan(projection=projection, segments=options['segments']):
+                # Numbers come back as Decimal
+                output.write(json.dumps(doc, default=str) + '\n')
+                count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(f"Exported {count} documents")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from document_app.aws_document_pipeline.dynamodb_storage import DynamoDBStorage
+
+
+class Command(BaseCommand):
+    help = "Create the DynamoDB tables and the category/upload_date index if they are missing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-counters',
+            action='store_true',
+            help='Recompute the category x file-type counters from a full table scan'
+        )
+
+    def handle(self, *args, **options):
+        storage = DynamoDBStorage()
+
+        try:
+            actions = storage.provision_tables()
+        except Exception as e:
+            raise CommandError(f"Provisioning failed: {e}")
+
+        for action in actions:
+            self.stdout.write(f"- {action}")
+        if not actions:
+            self.stdout.write("Tables and indexes already exist")
+
+        if options['rebuild_counters']:
+            stats = storage.rebuild_counters()
+            if stats is None:
+                raise CommandError("Counter table is not accessible")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {sum(sum(b.values()) for b in stats.values())} documents"))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from document_app.retention import prune_recent_views
+
+
+class Command(BaseCommand):
+    help = "Roll RecentView rows past the retention period into daily per-document counts and delete them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'RECENT_VIEW_RETENTION_DAYS', 30),
+            help='Keep raw view/download rows for this many days'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=getattr(settings, 'RECENT_VIEW_PRUNE_CHUNK', 1000),
+            help='Rows rolled up and deleted per transaction'
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            help='Keep running, pruning every this many seconds (for a scheduler-less deployment)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            pruned = prune_recent_views(retention_days=options['days'], chunk_size=options['chunk_size'])
+            self.stderr.write(f"Pruned {pruned} recent views older than {options['days']} days "
+                              f"in {time.monotonic() - started:.1f}s")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
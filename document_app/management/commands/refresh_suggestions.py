@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from document_app.aws_ai_search.suggestion_engine import SuggestionEngine
+
+
+class Command(BaseCommand):
+    help = "Precompute the collection analysis and the search suggestion pool served by /api/suggestions/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pool-size',
+            type=int,
+            default=getattr(settings, 'SUGGESTION_POOL_SIZE', 12),
+            help='General suggestions to generate (each category gets a quarter, at least 3)'
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            default=0,
+            help='Keep running, refreshing every this many seconds (for a scheduler-less deployment)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            pool = SuggestionEngine().refresh_suggestion_pool(pool_size=options['pool_size'])
+            if pool is None:
+                self.stderr.write("Collection analysis failed; the previous pool is kept")
+            else:
+                self.stderr.write(
+                    f"Refreshed {len(pool['general'])} suggestions and {len(pool['categories'])} category pools "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+            if not options['every']:
+                break
+            time.sleep(options['every'])
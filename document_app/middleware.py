@@ -1,18 +1,45 @@
-import sys
-import os
+import logging
+import time
+
+from django.conf import settings
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
 
 class RequestLoggingMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
-        # Force unbuffered output
-        sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)
-        print("*** MIDDLEWARE INITIALIZED ***", flush=True)
+        logger.debug('Middleware initialized')
 
     def __call__(self, request):
-        print(f"*** REQUEST: {request.method} {request.path} ***", flush=True)
+        logger.debug('Request: %s %s', request.method, request.path)
         
         response = self.get_response(request)
         
-        print(f"*** RESPONSE: {response.status_code} ***", flush=True)
+        logger.debug('Response: %s', response.status_code)
         
-        return response
\ No newline at end of file
+        return response
+
+
+class RequestMetricsMiddleware:
+    """Attributes AWS calls to the request that made them and reports them
+    as a Server-Timing header, a structured log line and process metrics"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget_ms = getattr(settings, 'REQUEST_LATENCY_BUDGET_MS', 2000)
+
+    def __call__(self, request):
+        token = instrumentation.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            collected = instrumentation.finish_request(token)
+        elapsed = time.perf_counter() - started
+
+        response['Server-Timing'] = instrumentation.server_timing(collected, elapsed)
+        instrumentation.record_request(request, response, collected, elapsed, self.budget_ms)
+        return response
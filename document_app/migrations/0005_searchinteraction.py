@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-19 04:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_app', '0004_recentview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=500)),
+                ('normalized_query', models.CharField(help_text='Lower-cased, whitespace-collapsed query', max_length=500)),
+                ('result_clicked', models.BooleanField(default=False)),
+                ('user_session', models.CharField(blank=True, help_text='User session identifier', max_length=100)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_session', '-timestamp'], name='document_ap_user_se_8573e0_idx')],
+            },
+        ),
+    ]
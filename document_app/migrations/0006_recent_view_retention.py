@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_app', '0005_searchinteraction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentActivityDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('document_id', models.CharField(max_length=255)),
+                ('action_type', models.CharField(choices=[('view', 'View'), ('download', 'Download')], max_length=10)),
+                ('document_title', models.CharField(max_length=500)),
+                ('document_category', models.CharField(blank=True, max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='recentview',
+            name='document_ap_timesta_3a24d4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recentview',
+            index=models.Index(fields=['-timestamp', 'id', 'document_id', 'document_title', 'document_category', 'action_type', 'file_type', 'file_size'], name='recentview_home_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentactivitydaily',
+            index=models.Index(fields=['document_id', '-date'], name='document_ap_documen_5dbd2b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentactivitydaily',
+            constraint=models.UniqueConstraint(fields=('date', 'document_id', 'action_type'), name='unique_daily_activity'),
+        ),
+    ]
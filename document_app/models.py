@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 import uuid
 
+from .batch_writer import BatchWriter
+
 class Document(models.Model):
     STATUS_CHOICES = [
         ('uploaded', 'Uploaded'),
@@ -40,6 +43,11 @@ class Document(models.Model):
         return self.file_name
 
 
+# Columns read by the recent activity listing, led by the timestamp it is ordered by
+HOME_PAGE_FIELDS = ['timestamp', 'id', 'document_id', 'document_title', 'document_category',
+                    'action_type', 'file_type', 'file_size']
+
+
 class RecentView(models.Model):
     """Track user document views and downloads for recent activity"""
     
@@ -62,7 +70,9 @@ class RecentView(models.Model):
     class Meta:
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['-timestamp']),
+            # Covers the home page listing: every HOME_PAGE_FIELDS column is in
+            # the key, so the newest-first read never touches the table rows
+            models.Index(fields=['-timestamp', *HOME_PAGE_FIELDS[1:]], name='recentview_home_idx'),
             models.Index(fields=['user_session', '-timestamp']),
             models.Index(fields=['document_id']),
         ]
@@ -78,18 +88,31 @@ class RecentView(models.Model):
     
     @classmethod
     def get_recent_views(cls, limit=10, user_session=None):
-        """Get recent views, optionally filtered by user session"""
-        queryset = cls.objects.all()
+        """Get recent views, optionally filtered by user session.
+
+        Includes activity still queued in this process, so a view shows up
+        before activity_writer has written it.
+        """
+        queryset = cls.objects.only(*HOME_PAGE_FIELDS)
         if user_session:
             queryset = queryset.filter(user_session=user_session)
-        return queryset[:limit]
+        queued = activity_writer.pending(lambda view: not user_session or view.user_session == user_session)
+        if not queued:
+            return queryset[:limit]
+        views = list(queryset[:limit]) + queued
+        views.sort(key=lambda view: view.timestamp, reverse=True)
+        return views[:limit]
     
     @classmethod
     def track_document_activity(cls, document_id, document_title, action_type, 
                               user_session=None, user_ip=None, document_category='', 
                               file_type='', file_size=''):
-        """Track a document view or download activity"""
-        return cls.objects.create(
+        """Track a document view or download activity.
+
+        The row is queued on activity_writer and written in the background;
+        the returned instance already has its final id and timestamp.
+        """
+        view = cls(
             document_id=document_id,
             document_title=document_title,
             document_category=document_category,
@@ -98,4 +121,62 @@ class RecentView(models.Model):
             user_ip=user_ip,
             file_type=file_type,
             file_size=file_size
-        )
\ No newline at end of file
+        )
+        activity_writer.add(view)
+        return view
+
+
+# View and download tracking is written off the request path (see batch_writer)
+activity_writer = BatchWriter(
+    'document_app.RecentView', 'recent_views',
+    batch_size=getattr(settings, 'ACTIVITY_BATCH_SIZE', 100),
+    flush_seconds=getattr(settings, 'ACTIVITY_FLUSH_SECONDS', 2),
+    max_pending=getattr(settings, 'ACTIVITY_QUEUE_MAX', 5000),
+    when_full=getattr(settings, 'ACTIVITY_QUEUE_FULL', 'drop'),
+)
+
+
+class DocumentActivityDaily(models.Model):
+    """Views and downloads per document and day, rolled up from RecentView
+    rows older than RECENT_VIEW_RETENTION_DAYS (see document_app/retention.py)"""
+
+    date = models.DateField()
+    document_id = models.CharField(max_length=255)
+    action_type = models.CharField(max_length=10, choices=RecentView.ACTION_CHOICES)
+    document_title = models.CharField(max_length=500)
+    document_category = models.CharField(max_length=100, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'document_id', 'action_type'], name='unique_daily_activity'),
+        ]
+        indexes = [
+            models.Index(fields=['document_id', '-date']),
+        ]
+
+    def __str__(self):
+        return f"{self.document_title}: {self.count} {self.action_type}s on {self.date}"
+
+
+class SearchInteraction(models.Model):
+    """Append-only log of search interactions (document_app/interactions.py).
+
+    Rows are written in batches and never updated; popularity counters are
+    rolled up from the log rather than kept on the request path.
+    """
+
+    query = models.CharField(max_length=500)
+    normalized_query = models.CharField(max_length=500, help_text='Lower-cased, whitespace-collapsed query')
+    result_clicked = models.BooleanField(default=False)
+    user_session = models.CharField(max_length=100, blank=True, help_text='User session identifier')
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_session', '-timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.query} at {self.timestamp}"
@@ -0,0 +1,155 @@
+"""Answers for previously seen queries, matched up to paraphrase.
+
+Exact-text caching misses "find safety manual" vs "safety manual please".
+QueryCache normalizes a query to its content terms (lower-cased, search
+stopwords dropped, light suffix stemming), so those two share one key. For
+queries that still differ it keeps a MinHash signature of every cached
+query's terms and maps a new query onto the most similar one when their
+estimated Jaccard similarity reaches QUERY_CACHE_SIMILARITY.
+
+Entries and the signature index live in the shared cache; storing or
+deleting a document clears them, since search results may change. Lookups
+are counted in query_cache_requests_total (result exact, near or miss), and
+the best similarity seen on every lookup in query_cache_similarity_total by
+tenth, which shows how the hit rate would move with the threshold.
+"""
+import logging
+import time
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.dispatch import receiver
+
+from . import instrumentation
+from .cache import Namespace
+from .signals import document_deleted, document_stored
+from .text_utils import QUERY_CACHE_STOP_WORDS, stem
+
+logger = logging.getLogger(__name__)
+
+queries = Namespace('query_cache')
+
+NUM_PERM = 64
+MERSENNE_PRIME = (1 << 31) - 1
+# Fixed seed: signatures are compared across processes
+_rng = np.random.RandomState(20240607)
+_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.int64)
+_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.int64)
+
+INDEX_LEASE_TTL = 5
+
+
+def query_terms(query):
+    """Sorted distinct content terms of query, stemmed"""
+    terms = set()
+    for word in query.lower().split():
+        # Short words stay: acronyms and codes ("HR", "IT", "5S") are often the whole distinction
+        word = word.strip('.,;:!?"\'()[]')
+        if not word or word in QUERY_CACHE_STOP_WORDS:
+            continue
+        stemmed = stem(word)
+        if stemmed not in QUERY_CACHE_STOP_WORDS:
+            terms.add(stemmed)
+    return sorted(terms)
+
+
+def minhash(terms):
+    """MinHash signature (NUM_PERM values) of a set of terms"""
+    hashes = np.array([zlib.crc32(term.encode('utf-8')) for term in terms], dtype=np.int64)
+    return ((np.outer(hashes, _A) + _B) % MERSENNE_PRIME).min(axis=0).astype(np.uint32)
+
+
+class QueryCache:
+    """Values cached per query for one kind of answer.
+
+    name labels the metrics; scope separates answers that depend on more
+    than the query (filters, limits).
+    """
+
+    def __init__(self, name, ttl=None, tracked=None):
+        self.name = name
+        self.ttl = ttl
+        self.tracked = tracked
+
+    def _ttl(self):
+        return self.ttl or getattr(settings, 'QUERY_CACHE_TTL', 3600)
+
+    def get(self, query, scope=''):
+        """Cached value for query or a near-duplicate of it, or None"""
+        terms = query_terms(query)
+        if not terms:
+            return None
+        key = ' '.join(terms)
+        try:
+            value = queries.get(f'{self.name}:{scope}:{key}')
+            if value is not None:
+                self._count('exact', 1.0)
+                return value
+            index = queries.get(f'{self.name}:{scope}:index')
+            similarity, match = self._nearest(index, terms)
+            threshold = getattr(settings, 'QUERY_CACHE_SIMILARITY', 0.75)
+            if match is not None and similarity >= threshold:
+                value = queries.get(f'{self.name}:{scope}:{match}')
+                if value is not None:
+                    logger.debug('Query %r served from near-duplicate %r (%.2f)', query, match, similarity)
+                    self._count('near', similarity)
+                    return value
+        except Exception as e:
+            logger.warning('Query cache unavailable: %s', e)
+            return None
+        self._count('miss', similarity)
+        return None
+
+    def set(self, query, value, scope=''):
+        terms = query_terms(query)
+        if not terms or not value:
+            return
+        key = ' '.join(terms)
+        try:
+            queries.set(f'{self.name}:{scope}:{key}', value, self._ttl())
+            self._index(scope, key, terms)
+        except Exception as e:
+            logger.warning('Failed to cache answer for %r: %s', query, e)
+
+    def _nearest(self, index, terms):
+        if not index or not index['keys']:
+            return 0.0, None
+        similarities = (index['signatures'] == minhash(terms)).mean(axis=1)
+        best = int(similarities.argmax())
+        return float(similarities[best]), index['keys'][best]
+
+    def _index(self, scope, key, terms):
+        # Read-modify-write of a shared entry: skip it if another worker is updating
+        # (best-effort on FileBasedCache; a lost update only drops a key from the index)
+        index_key = f'{self.name}:{scope}:index'
+        lease = queries.key(index_key, 'lease')
+        if not queries.backend.add(lease, 1, INDEX_LEASE_TTL):
+            return
+        try:
+            index = queries.get(index_key) or {'keys': [], 'signatures': np.empty((0, NUM_PERM), dtype=np.uint32)}
+            keys, signatures = index['keys'], index['signatures']
+            if key in keys:
+                return
+            tracked = self.tracked or getattr(settings, 'QUERY_CACHE_TRACKED', 500)
+            keys = (keys + [key])[-tracked:]
+            signatures = np.vstack([signatures, minhash(terms)])[-tracked:]
+            queries.set(index_key, {'keys': keys, 'signatures': signatures, 'updated': time.time()}, self._ttl())
+        finally:
+            queries.backend.delete(lease)
+
+    def _count(self, result, similarity):
+        instrumentation.metrics.inc('query_cache_requests_total', {'cache': self.name, 'result': result},
+                                    help_text='Query cache lookups by exact, near-duplicate or missed match')
+        instrumentation.metrics.inc('query_cache_similarity_total',
+                                    {'cache': self.name, 'similarity': f'{int(similarity * 10) / 10:.1f}'},
+                                    help_text='Query cache lookups by best similarity found, in tenths')
+
+
+@receiver(document_stored)
+@receiver(document_deleted)
+def _forget_answers(sender, document_id, **kwargs):
+    try:
+        queries.clear()
+    except Exception as e:
+        logger.error('Failed to clear the query cache: %s', e)
@@ -0,0 +1,83 @@
+"""Retention for the RecentView activity table.
+
+Raw view/download rows are kept for RECENT_VIEW_RETENTION_DAYS. Older rows
+are rolled up into DocumentActivityDaily (one row per document, action and
+day) and deleted, oldest first, in chunks of RECENT_VIEW_PRUNE_CHUNK rows,
+each chunk in its own transaction. The rollup and the delete of a chunk
+commit together, so an interrupted run never counts a row twice, and no
+statement holds the write lock for long. Run it with the
+prune_recent_views management command.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentActivityDaily, RecentView
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_chunks(queryset, chunk_size=None):
+    """Delete queryset's rows chunk_size at a time; returns how many"""
+    chunk_size = chunk_size or getattr(settings, 'RECENT_VIEW_PRUNE_CHUNK', 1000)
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+
+
+def prune_recent_views(retention_days=None, chunk_size=None):
+    """Roll RecentView rows older than retention_days into daily aggregates
+    and delete them; returns the number of rows pruned"""
+    if retention_days is None:
+        retention_days = getattr(settings, 'RECENT_VIEW_RETENTION_DAYS', 30)
+    chunk_size = chunk_size or getattr(settings, 'RECENT_VIEW_PRUNE_CHUNK', 1000)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = RecentView.objects.filter(timestamp__lt=cutoff).order_by('timestamp')
+
+    pruned = 0
+    while True:
+        with transaction.atomic():
+            rows = list(expired.values_list('pk', 'timestamp', 'document_id', 'action_type',
+                                            'document_title', 'document_category')[:chunk_size])
+            if not rows:
+                break
+            _add_to_daily(rows)
+            RecentView.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        pruned += len(rows)
+        logger.debug('Pruned %d recent views (%d so far)', len(rows), pruned)
+    if pruned:
+        logger.info('Rolled %d recent views older than %s into daily aggregates', pruned, cutoff.date())
+    return pruned
+
+
+def _add_to_daily(rows):
+    counts = defaultdict(int)
+    details = {}
+    for _pk, timestamp, document_id, action_type, title, category in rows:
+        key = (timezone.localdate(timestamp), document_id, action_type)
+        counts[key] += 1
+        details[key] = (title, category)  # Latest title wins
+
+    existing = DocumentActivityDaily.objects.filter(
+        date__in={key[0] for key in counts},
+        document_id__in={key[1] for key in counts},
+    )
+    found = {(daily.date, daily.document_id, daily.action_type): daily.pk for daily in existing}
+    new = []
+    for key, count in counts.items():
+        if key in found:
+            DocumentActivityDaily.objects.filter(pk=found[key]).update(count=F('count') + count)
+        else:
+            title, category = details[key]
+            new.append(DocumentActivityDaily(date=key[0], document_id=key[1], action_type=key[2],
+                                             document_title=title, document_category=category,
+                                             count=count))
+    DocumentActivityDaily.objects.bulk_create(new)
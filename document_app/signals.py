@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent after a document's metadata is written to DynamoDB (new upload or
+# update). Arguments: document_id, document (the full stored item).
+document_stored = Signal()
+
+# Sent after a document is deleted. Arguments: document_id, document (the
+# item as it was before deletion, or None if it was not found).
+document_deleted = Signal()
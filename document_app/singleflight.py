@@ -0,0 +1,167 @@
+"""Coalescing of identical concurrent calls.
+
+SingleFlight.do(key, fn) runs fn once for all callers in this process that
+arrive with the same key while it is in flight; the others wait and share
+its result (or exception). With a shared cache namespace the coalescing
+also spans worker processes, best-effort: the leader takes a lease in the
+cache and publishes its result there for a few seconds, and callers in
+other processes that find the lease taken poll for that result instead of
+calling upstream themselves. On a cache without an atomic add
+(FileBasedCache) two processes can both take the lease, so this cuts
+duplicate upstream calls rather than guaranteeing a single one.
+
+CoalescingClient applies this to selected operations of an AWS client
+(Bedrock invoke_model, Kendra query), keyed by a hash of the request.
+"""
+import copy
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+
+from botocore.response import StreamingBody
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Shares one execution among concurrent callers with the same key.
+
+    namespace is a document_app.cache.Namespace for best-effort
+    cross-process coalescing (None keeps it per process); results are published there
+    for result_ttl seconds, and callers in other processes wait up to
+    `wait` seconds for them before running fn themselves.
+    """
+
+    def __init__(self, namespace=None, result_ttl=5, wait=30.0):
+        self.namespace = namespace
+        self.result_ttl = result_ttl
+        self.wait = wait
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """(result, shared): shared is True when another caller ran fn"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self._run(key, fn)
+            return call.result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run(self, key, fn):
+        if self.namespace is None:
+            return fn(), False
+
+        backend = self.namespace.backend
+        result_key = self.namespace.key(key, 'result')
+        lease_key = self.namespace.key(key, 'lease')
+        try:
+            published = backend.get(result_key)
+            if published is not None:
+                return published, True
+            leader = backend.add(lease_key, 1, int(self.wait) + 1)
+        except Exception as e:
+            # The cache is an optimisation here; never fail the call over it
+            logger.warning('Coalescing cache unavailable, running %s locally: %s', key, e)
+            return fn(), False
+
+        if leader:
+            try:
+                result = fn()
+                backend.set(result_key, result, self.result_ttl)
+                return result, False
+            finally:
+                backend.delete(lease_key)
+
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            published = backend.get(result_key)
+            if published is not None:
+                return published, True
+            if backend.get(lease_key) is None:
+                break  # The leader failed or gave up
+        return fn(), False
+
+
+def request_key(operation, kwargs):
+    """Stable hash of an API request"""
+    payload = json.dumps([operation, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CoalescingClient:
+    """Wraps an AWS client so identical concurrent calls to `operations`
+    share one upstream request; everything else passes through"""
+
+    def __init__(self, client, service, operations, flight):
+        object.__setattr__(self, 'client', client)
+        object.__setattr__(self, 'service', service)
+        object.__setattr__(self, 'operations', frozenset(operations))
+        object.__setattr__(self, 'flight', flight)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if name not in self.operations:
+            return attribute
+
+        def coalesced(**kwargs):
+            def call():
+                return _portable(attribute(**kwargs))
+
+            result, shared = self.flight.do(request_key(name, kwargs), call)
+            if shared:
+                instrumentation.metrics.inc('aws_calls_coalesced_total',
+                                            {'service': self.service, 'operation': name},
+                                            help_text='AWS calls served by an identical in-flight call')
+            return _rehydrate(result)
+
+        return coalesced
+
+    def __setattr__(self, name, value):
+        setattr(self.client, name, value)
+
+
+def _portable(response):
+    """Response with streaming bodies read into bytes, so it can be shared"""
+    body = response.get('body') if isinstance(response, dict) else None
+    if body is not None and hasattr(body, 'read'):
+        response = {**response, 'body': body.read()}
+    return response
+
+
+def _rehydrate(result):
+    """A private copy of a shared response for one caller"""
+    result = copy.deepcopy(result)
+    if isinstance(result, dict) and isinstance(result.get('body'), bytes):
+        data = result['body']
+        result['body'] = StreamingBody(io.BytesIO(data), len(data))
+    return result
@@ -0,0 +1,125 @@
+"""Per-process warm-up, run before a worker serves its first request.
+
+Without it the first request after a deploy or scale-out pays for importing
+the URLconf (and through it every view and engine module), creating the
+boto3 clients (endpoint and service model loading), opening the search
+backend and loading the vector index. warm_up() does that work up front
+and logs how long each phase took, as one structured record and in the
+startup_phase_seconds metric.
+
+document_project/wsgi.py calls it when the module is loaded, which is once
+per worker unless the application is preloaded. With gunicorn --preload,
+set STARTUP_WARM_UP_ON_IMPORT = False and call it from a post_fork hook
+instead, so the master starts no background threads and each worker
+builds its own clients after the fork:
+
+    def post_fork(server, worker):
+        from document_app.startup import warm_up
+        warm_up()
+"""
+import logging
+import time
+from importlib import import_module
+
+from django.conf import settings
+
+from . import instrumentation
+from .logging_utils import StructuredMessage
+
+logger = logging.getLogger(__name__)
+
+# Clients the request paths use; created once per process by the registry.
+# The search backend phase creates its own (Kendra, STS) when configured.
+WARM_CLIENTS = ['s3', 'bedrock-runtime']
+# Resources are per thread, but creating one here loads the resource model code
+WARM_RESOURCES = ['dynamodb']
+
+last_report = {}
+
+
+def _load_urlconf():
+    from django.urls import get_resolver
+
+    import_module(settings.ROOT_URLCONF)
+    get_resolver().url_patterns  # noqa: B018 -- resolves and caches the patterns
+
+
+def _create_clients():
+    from .aws_clients import get_client, get_resource
+
+    for service in WARM_CLIENTS:
+        get_client(service)
+    for service in WARM_RESOURCES:
+        get_resource(service)
+
+
+def _open_search_backend():
+    from .aws_document_pipeline.search_backend import get_search_backend
+
+    get_search_backend()
+
+
+def _load_vector_index():
+    from .aws_ai_search.vector_index import get_vector_index
+
+    if getattr(settings, 'SEMANTIC_SEARCH_MODE', 'fallback') != 'off':
+        get_vector_index()
+
+
+def _build_engines():
+    from .aws_ai_search.search_engine import AISearchEngine
+    from .aws_ai_search.suggestion_engine import SuggestionEngine
+    from .aws_chatbot.chatbot_engine import ChatbotEngine
+    from .aws_document_pipeline.pipeline import DocumentPipeline
+
+    for engine in (DocumentPipeline, AISearchEngine, SuggestionEngine, ChatbotEngine):
+        engine()
+
+
+def _start_metadata_index():
+    from .aws_document_pipeline.metadata_index import build_index_in_background
+
+    build_index_in_background()
+
+
+PHASES = [
+    ('urlconf', _load_urlconf),
+    ('clients', _create_clients),
+    ('search_backend', _open_search_backend),
+    ('vector_index', _load_vector_index),
+    ('engines', _build_engines),
+    ('metadata_index', _start_metadata_index),
+]
+
+
+def warm_up(boot_started=None):
+    """Run the warm-up phases and report their timings.
+
+    boot_started, a time.perf_counter() value taken before Django was set
+    up, adds the Django setup time as a 'django_setup' phase. A failing
+    phase is logged and skipped; the worker still starts.
+    """
+    if not getattr(settings, 'STARTUP_WARM_UP', True):
+        return {}
+
+    started = time.perf_counter()
+    phases = {}
+    if boot_started is not None:
+        phases['django_setup'] = started - boot_started
+    for name, phase in PHASES:
+        phase_started = time.perf_counter()
+        try:
+            phase()
+        except Exception as e:
+            logger.warning('Warm-up phase %s failed: %s', name, e)
+        phases[name] = time.perf_counter() - phase_started
+
+    for name, seconds in phases.items():
+        instrumentation.metrics.observe('startup_phase_seconds', {'phase': name}, seconds,
+                                        help_text='Worker warm-up time by phase')
+    total = sum(phases.values())
+    last_report.clear()
+    last_report.update({'total_ms': round(total * 1000, 1),
+                        'phases_ms': {name: round(seconds * 1000, 1) for name, seconds in phases.items()}})
+    logger.info(StructuredMessage(event='warm_up', **last_report))
+    return last_report
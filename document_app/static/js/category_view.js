@@ -3,6 +3,8 @@ let allDocuments = [];
 let filteredDocuments = [];
 let currentSort = 'upload_date_desc';
 let currentView = 'grid';
+let nextCursor = null;  // Cursor for the next page of this category, if any
+const PAGE_SIZE = 50;
 
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Category view loaded for:', window.categoryData);
@@ -39,12 +41,17 @@ function setupEventListeners() {
     }
 }
 
-async function loadDocuments() {
+async function loadDocuments(append = false) {
     try {
-        showLoadingState();
+        if (!append) {
+            showLoadingState();
+        }
         
-        // TEMPORARY: Use simple test endpoint to verify frontend works
-        const url = `/api/simple-test/`;
+        const params = new URLSearchParams({category: window.categoryData.category, limit: PAGE_SIZE});
+        if (append && nextCursor) {
+            params.set('cursor', nextCursor);
+        }
+        const url = `/api/documents/category/?${params}`;
         console.log('Loading documents from:', url);
         
         const response = await fetch(url);
@@ -55,27 +62,22 @@ async function loadDocuments() {
         }
         
         const data = await response.json();
-        console.log('Raw response data:', JSON.stringify(data, null, 2));
-        console.log('Response status field:', data.status);
-        console.log('Response status type:', typeof data.status);
-        console.log('Response documents:', data.documents);
-        console.log('Response count:', data.count);
         
         if (data.status === 'success') {
-            allDocuments = data.documents || [];
+            const page = data.documents || [];
+            allDocuments = append ? allDocuments.concat(page) : page;
             filteredDocuments = [...allDocuments];
+            nextCursor = data.next_cursor || null;
             
-            console.log('Loaded documents:', allDocuments.length);
-            console.log('First document:', allDocuments[0]);
+            console.log('Loaded documents:', allDocuments.length, 'more:', Boolean(nextCursor));
             
             updateDocumentCount(allDocuments.length);
             updateLastUpdatedTime();
+            updateLoadMore();
             
             if (allDocuments.length === 0) {
-                console.log('No documents found, showing empty state');
                 showEmptyState();
             } else {
-                console.log('Documents found, hiding loading state');
                 hideLoadingState();
                 sortDocuments();
             }
@@ -86,12 +88,34 @@ async function loadDocuments() {
         
     } catch (error) {
         console.error('Error loading documents:', error);
-        hideLoadingState();
-        showEmptyState(); // Show empty state instead of staying in loading
+        if (!append) {
+            hideLoadingState();
+            showEmptyState(); // Show empty state instead of staying in loading
+        }
         showToast('error', 'Failed to load documents: ' + error.message, 'fas fa-exclamation-triangle');
     }
 }
 
+async function loadMoreDocuments() {
+    const button = document.getElementById('load-more-btn');
+    if (!nextCursor || !button) {
+        return;
+    }
+    button.disabled = true;
+    try {
+        await loadDocuments(true);
+    } finally {
+        button.disabled = false;
+    }
+}
+
+function updateLoadMore() {
+    const loadMore = document.getElementById('load-more');
+    if (loadMore) {
+        loadMore.style.display = nextCursor ? 'block' : 'none';
+    }
+}
+
 function sortDocuments() {
     const sortSelect = document.getElementById('sort-select');
     currentSort = sortSelect.value;
@@ -0,0 +1,65 @@
+"""Tokenizing, stopwords, stemming and BM25 helpers shared by the search
+and chatbot code, so every index and ranker splits text the same way.
+"""
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Common English function words (extractive summaries, question matching)
+STOP_WORDS = frozenset("""
+    the and for are was were this that these those with from have has had not but all any can
+    will would should could into onto than then there their them they its our your you his her
+    she him who what when where which while how why also each other such only more most some
+    been being may might must shall upon about after before over under between within without
+    per via out off one two
+""".split())
+
+# Words that say how to search rather than what for
+SEARCH_STOP_WORDS = frozenset({
+    'search', 'find', 'look', 'for', 'the', 'a', 'an', 'show', 'me', 'get', 'retrieve',
+    'where', 'is', 'are', 'can', 'you', 'please', 'help', 'i', 'want', 'need', 'document',
+})
+# Query cache keys keep short words (acronyms), so they drop short connectives
+# explicitly; extract_search_terms() keeps SEARCH_STOP_WORDS alone
+QUERY_CACHE_STOP_WORDS = SEARCH_STOP_WORDS | {
+    'of', 'to', 'in', 'on', 'at', 'by', 'my', 'our', 'and', 'or', 'with', 'about',
+}
+
+SUFFIXES = ('ational', 'ations', 'ation', 'ments', 'ment', 'ings', 'ing', 'ies', 'ied', 'ers', 'er', 'ed', 'ly', 's')
+MIN_STEM = 3
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens; splits file names on _ - . as well"""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def content_terms(text):
+    """Tokens of three or more characters starting with a letter, without STOP_WORDS"""
+    return [token for token in tokenize(text)
+            if len(token) >= 3 and token[0].isalpha() and token not in STOP_WORDS]
+
+
+def stem(word):
+    """Crude suffix stripping, enough to conflate plurals and verb forms"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            if suffix == 's' and word.endswith('ss'):
+                continue
+            word = word[:-len(suffix)] + ('y' if suffix in ('ies', 'ied') else '')
+            break
+    if word.endswith('e') and len(word) > MIN_STEM + 1:
+        word = word[:-1]
+    return word
+
+
+def bm25_idf(n_docs, df):
+    """BM25 inverse document frequency (scalars or numpy arrays)"""
+    return np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+
+def bm25_term(tf, idf, k1, norm):
+    """One term's BM25 contribution; norm is k1 scaled by the length normalisation"""
+    return idf * tf * (k1 + 1) / (tf + norm)
@@ -25,6 +25,7 @@ urlpatterns = [
 
     # Other API endpoints
     path('api/test/', views.test_endpoint, name='test_endpoint'),
+    path('api/metrics/', views.metrics, name='metrics'),
     path('api/debug/', views.debug_documents, name='debug_documents'),
     path('api/test-upload/', views.test_document_upload, name='test_document_upload'),
     path('api/search/', views.search_documents, name='search_documents'),
@@ -42,6 +43,7 @@ urlpatterns = [
     
     # Recent views tracking
     path('api/recent-views/', views.get_recent_views, name='get_recent_views'),
+    path('api/trending-documents/', views.get_trending_documents, name='get_trending_documents'),
     path('api/track-activity/', views.track_document_activity, name='track_document_activity'),
     path('api/recent-views/clear/', views.clear_recent_views, name='clear_recent_views'),
     
@@ -1,19 +1,30 @@
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+import hashlib
+import hmac
+import ipaddress
 import json
+import logging
 import uuid
 from datetime import datetime
 from .aws_document_pipeline.pipeline import DocumentPipeline
-from .aws_document_pipeline.kendra_database import KendraDatabase
+from .aws_document_pipeline.search_backend import get_search_backend
+from .aws_clients import get_client
+from . import instrumentation
+from .aws_ai_search.vector_index import tiered_search
 from .aws_chatbot.chatbot_engine import ChatbotEngine
+from .aws_chatbot.conversation import Conversation
 from .aws_ai_search.search_engine import AISearchEngine
 from .aws_ai_search.suggestion_engine import SuggestionEngine
 from .aws_document_pipeline.dynamodb_storage import DynamoDBStorage
-from .models import RecentView
+from .models import RecentView, activity_writer
+from .retention import delete_in_chunks
+from .activity_feed import forget_feeds, recent_feed, trending_documents
 import threading
-import boto3
+
+logger = logging.getLogger(__name__)
 
 def get_client_ip(request):
     """Get client IP address from request"""
@@ -31,7 +42,7 @@ def get_user_session(request):
     return request.session.session_key
 
 def home(request):
-    print("*** HOME PAGE REQUEST ***")
+    logger.debug('Home page request')
     return render(request, 'document_app/home.html')
 
 def search(request):
@@ -53,7 +64,7 @@ def settings(request):
 @require_http_methods(["POST"])
 def upload_files(request):
     """File upload endpoint using Kendra as database"""
-    print("*** UPLOAD REQUEST RECEIVED ***")
+    logger.debug('Upload request received')
     try:
         files = request.FILES.getlist('files')
         if not files:
@@ -95,7 +106,7 @@ def upload_files(request):
                 thread.start()
                 
             except Exception as e:
-                print(f"Upload failed for {file.name}: {str(e)}")
+                logger.error('Upload failed for %s: %s', file.name, str(e))
         
         return JsonResponse({
             'status': 'success',
@@ -104,21 +115,21 @@ def upload_files(request):
         })
         
     except Exception as e:
-        print(f"Upload error: {e}")
+        logger.error('Upload error: %s', e)
         return JsonResponse({'error': f'Upload failed: {str(e)}'}, status=500)
 
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_document_status(request, document_id):
     """Get document status from DynamoDB first, then Kendra as fallback"""
-    print(f"*** REQUEST: GET /api/document-status/{document_id}/ ***")
+    logger.debug('Request: GET /api/document-status/%s/', document_id)
     try:
         # First try DynamoDB (has correct UUID mapping)
         dynamodb_storage = DynamoDBStorage()
         doc = dynamodb_storage.get_document_by_id(document_id)
         
         if doc:
-            print(f"*** FOUND IN DYNAMODB: {doc['filename']} ***")
+            logger.debug('Found in DynamoDB: %s', doc['filename'])
             response = JsonResponse({
                 'id': document_id,
                 'name': doc['filename'],
@@ -130,16 +141,16 @@ def get_document_status(request, document_id):
                 'file_type': doc.get('file_type', ''),
                 'content_length': len(doc.get('content_summary', ''))
             })
-            print(f"*** RESPONSE: 200 (DynamoDB) ***")
+            logger.debug('Response: 200 (DynamoDB)')
             return response
         
         # Fallback to Kendra if not found in DynamoDB
-        print(f"*** NOT FOUND IN DYNAMODB, TRYING KENDRA ***")
-        kendra_db = KendraDatabase()
-        doc = kendra_db.get_document_by_id(document_id)
+        logger.debug('Not found in DynamoDB, trying Kendra')
+        search_backend = get_search_backend()
+        doc = search_backend.get_document_by_id(document_id)
         
         if doc:
-            print(f"*** FOUND IN KENDRA: {doc['title']} ***")
+            logger.debug('Found in Kendra: %s', doc['title'])
             response = JsonResponse({
                 'id': doc['id'],
                 'name': doc['title'],
@@ -151,11 +162,11 @@ def get_document_status(request, document_id):
                 'file_type': doc['attributes'].get('file_type', ''),
                 'content_length': len(doc.get('content', ''))
             })
-            print(f"*** RESPONSE: 200 (Kendra) ***")
+            logger.debug('Response: 200 (Kendra)')
             return response
         else:
             # Return failed status if not found anywhere (stop polling)
-            print(f"*** DOCUMENT NOT FOUND, RETURNING FAILED STATUS ***")
+            logger.warning('Document %s not found, returning failed status', document_id)
             response = JsonResponse({
                 'id': document_id,
                 'name': 'Upload Failed',
@@ -168,11 +179,10 @@ def get_document_status(request, document_id):
                 'content_length': 0,
                 'error': 'Document not found in storage systems'
             })
-            print(f"*** RESPONSE: 200 (Failed) ***")
             return response
             
     except Exception as e:
-        print(f"*** ERROR: {e} ***")
+        logger.error('Document status error: %s', e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
@@ -180,14 +190,14 @@ def get_document_status(request, document_id):
 def list_documents(request):
     """List documents from Kendra database"""
     try:
-        kendra_db = KendraDatabase()
+        search_backend = get_search_backend()
         category = request.GET.get('category')
         
         if category:
-            documents = kendra_db.list_documents_by_category(category)
+            documents = search_backend.list_documents_by_category(category)
         else:
             # Get all documents by searching with wildcard
-            documents = kendra_db.search_documents('*', limit=100)
+            documents = search_backend.search_documents('*', limit=100)
         
         # Format documents for frontend
         formatted_docs = []
@@ -204,7 +214,7 @@ def list_documents(request):
             })
         
         # Get category statistics
-        category_stats = kendra_db.get_category_stats()
+        category_stats = search_backend.get_category_stats()
         
         return JsonResponse({
             'status': 'success',
@@ -228,8 +238,12 @@ def search_documents(request):
         if not query:
             return JsonResponse({'error': 'Query is required'}, status=400)
         
-        kendra_db = KendraDatabase()
-        results = kendra_db.search_documents(query, category_filter=category)
+        search_backend = get_search_backend()
+        results = tiered_search(
+            query,
+            lambda: search_backend.search_documents(query, category_filter=category),
+            category_filter=category
+        )
         
         # Format results for frontend
         formatted_results = []
@@ -258,15 +272,40 @@ def search_documents(request):
 @require_http_methods(["GET"])
 def test_endpoint(request):
     """Simple test endpoint"""
-    print("*** TEST ENDPOINT CALLED ***")
+    logger.debug('Test endpoint called')
     return JsonResponse({'status': 'success', 'message': 'API is working'})
 
+def _metrics_allowed(request):
+    """Staff users, the METRICS_TOKEN bearer token, or METRICS_ALLOWED_IPS"""
+    from django.conf import settings  # the module defines a settings view
+
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in getattr(settings, 'METRICS_ALLOWED_IPS', ()))
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Process-wide request and AWS call metrics in Prometheus text format"""
+    if not _metrics_allowed(request):
+        logger.warning('Metrics request from %s refused', request.META.get('REMOTE_ADDR'))
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(instrumentation.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def debug_documents(request):
     """Debug endpoint to see all available documents"""
     try:
-        kendra_db = KendraDatabase()
+        search_backend = get_search_backend()
         
         # Try multiple search strategies to find documents
         search_strategies = ["*", "document", "pdf", "interview", "policy", "process"]
@@ -274,12 +313,12 @@ def debug_documents(request):
         
         for strategy in search_strategies:
             try:
-                docs = kendra_db.search_documents(strategy, limit=10)
+                docs = search_backend.search_documents(strategy, limit=10)
                 all_docs.extend(docs)
                 if docs:
                     break  # If we find documents, stop searching
             except Exception as e:
-                print(f"*** SEARCH STRATEGY '{strategy}' FAILED: {e} ***")
+                logger.error("Search strategy '%s' failed: %s", strategy, e)
         
         # Remove duplicates
         seen_ids = set()
@@ -293,7 +332,7 @@ def debug_documents(request):
         debug_info = {
             'total_documents': len(unique_docs),
             'documents': [],
-            'kendra_index_id': kendra_db.index_id,
+            'kendra_index_id': search_backend.index_id,
             'search_strategies_tried': search_strategies
         }
         
@@ -315,11 +354,11 @@ def debug_documents(request):
 def test_document_upload(request):
     """Test endpoint to manually add a document to Kendra"""
     try:
-        kendra_db = KendraDatabase()
+        search_backend = get_search_backend()
         
         # Add a test document
         test_doc_id = f"test-doc-{uuid.uuid4().hex[:8]}"
-        success = kendra_db.store_document(
+        success = search_backend.store_document(
             document_id=test_doc_id,
             filename="test-interview-process.pdf",
             content="This is a test document about interview processes. It contains information about candidate evaluation, hiring procedures, and recruitment guidelines.",
@@ -347,15 +386,15 @@ def test_document_upload(request):
 def debug_specific_document(request, document_id):
     """Debug a specific document lookup"""
     try:
-        kendra_db = KendraDatabase()
+        search_backend = get_search_backend()
         
-        print(f"*** DEBUGGING SPECIFIC DOCUMENT: {document_id} ***")
+        logger.debug('Debugging specific document: %s', document_id)
         
         # Try direct lookup
-        doc = kendra_db.get_document_by_id(document_id)
+        doc = search_backend.get_document_by_id(document_id)
         
         # Also search for policy documents to see what's available
-        policy_docs = kendra_db.search_documents("policy", limit=10)
+        policy_docs = search_backend.search_documents("policy", limit=10)
         
         debug_info = {
             'requested_id': document_id,
@@ -385,7 +424,7 @@ def chatbot_api(request):
     try:
         data = json.loads(request.body)
         message = data.get('message', '')
-        context = data.get('context', None) # Get the document context from the request
+        context = data.get('context', None)  # Older clients send the document context
         
         if not message:
             return JsonResponse({'error': 'Message is required'}, status=400)
@@ -393,8 +432,10 @@ def chatbot_api(request):
         # Initialize chatbot engine
         chatbot = ChatbotEngine()
         
-        # Process message and get response, passing in the context
-        response = chatbot.process_message(message, context=context)
+        # The document and history are kept server-side per conversation
+        conversation = Conversation.load(data.get('conversation_id'), session=get_user_session(request))
+        response = chatbot.converse(message, conversation, context=context)
+        response['conversation_id'] = conversation.id
         
         return JsonResponse(response)
         
@@ -442,7 +483,7 @@ def ai_search(request):
         })
 
     except Exception as e:
-        print(f"*** AI SEARCH ERROR: {e} ***")
+        logger.error('AI search error: %s', e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @require_http_methods(["GET"])
@@ -454,38 +495,39 @@ def view_document(request):
         if not document_id:
             return JsonResponse({'error': 'Document ID is required'}, status=400)
         
-        print(f"*** VIEW REQUEST: document_id = {document_id} ***")
-        
-        kendra_db = KendraDatabase()
-        
-        # First, let's do a quick search to see what documents are available
-        print(f"*** DEBUGGING: Searching for policy documents ***")
-        search_results = kendra_db.search_documents("policy", limit=10)
-        print(f"*** AVAILABLE POLICY DOCUMENTS: ***")
-        target_found = False
-        for i, doc in enumerate(search_results):
-            doc_id = doc.get('id', '')
-            doc_title = doc.get('title', '')
-            print(f"  {i+1}. ID: '{doc_id}', Title: '{doc_title}'")
-            # Check if this is the exact document we're looking for
-            if doc_id == document_id:
-                print(f"    *** EXACT MATCH FOUND! ***")
-                target_found = True
-            elif document_id in doc_id or document_id in doc_title:
-                print(f"    *** PARTIAL MATCH FOUND! ***")
-        
-        if target_found:
-            print(f"*** TARGET DOCUMENT IS AVAILABLE IN SEARCH RESULTS ***")
-        else:
-            print(f"*** TARGET DOCUMENT NOT FOUND IN POLICY SEARCH ***")
-        print(f"*** END AVAILABLE DOCUMENTS ***")
+        logger.debug('View request: document_id = %s', document_id)
+        
+        search_backend = get_search_backend()
+        
+        # Diagnostic listing of policy documents; costs a search, so only when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Debugging: Searching for policy documents')
+            search_results = search_backend.search_documents("policy", limit=10)
+            logger.debug('Available policy documents:')
+            target_found = False
+            for i, doc in enumerate(search_results):
+                doc_id = doc.get('id', '')
+                doc_title = doc.get('title', '')
+                logger.debug("%s. ID: '%s', Title: '%s'", i+1, doc_id, doc_title)
+                # Check if this is the exact document we're looking for
+                if doc_id == document_id:
+                    logger.debug('Exact match found!')
+                    target_found = True
+                elif document_id in doc_id or document_id in doc_title:
+                    logger.debug('Partial match found!')
+        
+            if target_found:
+                logger.debug('Target document is available in search results')
+            else:
+                logger.debug('Target document not found in policy search')
+            logger.debug('End available documents')
         
         # Try to get document by ID first
-        doc = kendra_db.get_document_by_id(document_id)
+        doc = search_backend.get_document_by_id(document_id)
         
         if not doc:
             # If not found by ID, try searching by title (handle cases where title is used as ID)
-            print(f"*** Document not found by ID, searching by title: {document_id} ***")
+            logger.debug('Document not found by ID, searching by title: %s', document_id)
             # Clean up the document_id for search (remove underscores, add extensions)
             search_term = document_id.replace('_', ' ').replace('-', ' ')
             
@@ -499,8 +541,8 @@ def view_document(request):
             
             best_match = None
             for strategy in search_strategies:
-                print(f"*** TRYING SEARCH STRATEGY: '{strategy}' ***")
-                search_results = kendra_db.search_documents(strategy, limit=5)
+                logger.debug("Trying search strategy: '%s'", strategy)
+                search_results = search_backend.search_documents(strategy, limit=5)
                 
                 # Find best match by title similarity
                 for result in search_results:
@@ -512,7 +554,7 @@ def view_document(request):
                         result_id == document_id.lower() or
                         any(word in result_title for word in document_id.lower().replace('-', ' ').split() if len(word) > 2)):
                         best_match = result
-                        print(f"*** MATCH FOUND: Title='{result_title}', ID='{result_id}' ***")
+                        logger.debug("Match found: Title='%s', ID='%s'", result_title, result_id)
                         break
                 
                 if best_match:
@@ -520,11 +562,11 @@ def view_document(request):
             
             if best_match:
                 doc = best_match
-                print(f"*** Found document by search: {doc.get('title', 'Unknown')} ***")
+                logger.debug('Found document by search: %s', doc.get('title', 'Unknown'))
             else:
                 # Final fallback: search all policy documents and find the closest match
-                print(f"*** FINAL FALLBACK: Searching all policy documents ***")
-                all_policy_docs = kendra_db.search_documents("policy", limit=20)
+                logger.debug('Final fallback: Searching all policy documents')
+                all_policy_docs = search_backend.search_documents("policy", limit=20)
                 
                 for policy_doc in all_policy_docs:
                     policy_title = policy_doc.get('title', '').lower()
@@ -536,14 +578,14 @@ def view_document(request):
                         document_id.lower() in policy_id or
                         any(word in policy_title for word in document_id.lower().split('_') if len(word) > 3)):
                         doc = policy_doc
-                        print(f"*** FALLBACK MATCH FOUND: {policy_doc.get('title')} ***")
+                        logger.debug('Fallback match found: %s', policy_doc.get('title'))
                         break
                 
                 if not doc:
-                    print(f"*** Document not found: {document_id} ***")
+                    logger.debug('Document not found: %s', document_id)
                     return JsonResponse({'error': f'Document "{document_id}" not found in database'}, status=404)
         
-        print(f"*** Found document: {doc.get('title', 'Unknown')} ***")
+        logger.debug('Found document: %s', doc.get('title', 'Unknown'))
         
         content = doc.get('content', doc.get('excerpt', 'No content available'))
         attributes = doc.get('attributes', {})
@@ -551,7 +593,7 @@ def view_document(request):
 
         # If category is unknown, perform real-time analysis with Bedrock
         if category in ['Unknown', 'others'] and content and len(content) > 50:
-            print(f"*** Category is '{category}'. Performing real-time analysis. ***")
+            logger.debug("Category is '%s'. Performing real-time analysis.", category)
             from .aws_document_pipeline.pipeline import DocumentPipeline
             pipeline = DocumentPipeline()
             try:
@@ -561,12 +603,12 @@ def view_document(request):
                 attributes['category'] = analysis_results.get('category', category)
                 attributes['keywords'] = analysis_results.get('keywords', [])
                 attributes['summary'] = analysis_results.get('summary', 'Summary could not be generated.')
-                print(f"*** Real-time analysis complete. New category: {attributes['category']} ***")
+                logger.debug('Real-time analysis complete. New category: %s', attributes['category'])
             except Exception as e:
-                print(f"*** Real-time analysis failed: {e} ***")
+                logger.error('Real-time analysis failed: %s', e)
 
-        print(f"*** FINAL RESPONSE CONTENT LENGTH: {len(content)} ***")
-        print(f"*** FINAL RESPONSE CONTENT PREVIEW: {content[:100]}... ***")
+        logger.debug('Final response content length: %s', len(content))
+        logger.debug('Final response content preview: %s...', content[:100])
         
         # Track document view activity
         try:
@@ -582,9 +624,9 @@ def view_document(request):
                 file_type=attributes.get('file_type', ''),
                 file_size=attributes.get('file_size', '')
             )
-            print(f"*** TRACKED VIEW ACTIVITY FOR: {doc['title']} ***")
+            logger.debug('Tracked view activity for: %s', doc['title'])
         except Exception as track_error:
-            print(f"*** FAILED TO TRACK VIEW ACTIVITY: {track_error} ***")
+            logger.error('Failed to track view activity: %s', track_error)
         
         response_data = {
             'id': doc['id'],
@@ -599,7 +641,7 @@ def view_document(request):
         return JsonResponse(response_data)
         
     except Exception as e:
-        print(f"*** VIEW ERROR: {str(e)} ***")
+        logger.error('View error: %s', str(e))
         return JsonResponse({'error': f'Error retrieving document: {str(e)}'}, status=500)
 
 @require_http_methods(["GET"])
@@ -611,22 +653,22 @@ def download_document(request):
         if not document_id:
             return JsonResponse({'error': 'Document ID is required'}, status=400)
         
-        print(f"*** DOWNLOAD REQUEST: document_id = {document_id} ***")
+        logger.debug('Download request: document_id = %s', document_id)
         
-        kendra_db = KendraDatabase()
+        search_backend = get_search_backend()
         
         # Try to get document by ID first
-        doc = kendra_db.get_document_by_id(document_id)
+        doc = search_backend.get_document_by_id(document_id)
         
         if not doc:
             # If not found by ID, try searching by title (handle cases where title is used as ID)
-            print(f"*** Document not found by ID, searching by title: {document_id} ***")
+            logger.debug('Document not found by ID, searching by title: %s', document_id)
             # Clean up the document_id for search
             search_term = document_id.replace('_', ' ').replace('-', ' ')
             if not search_term.endswith('.pdf'):
                 search_term += ' pdf'
             
-            search_results = kendra_db.search_documents(search_term, limit=5)
+            search_results = search_backend.search_documents(search_term, limit=5)
             
             # Find best match by title similarity
             best_match = None
@@ -638,12 +680,12 @@ def download_document(request):
             
             if best_match:
                 doc = best_match
-                print(f"*** Found document by title search: {doc.get('title', 'Unknown')} ***")
+                logger.debug('Found document by title search: %s', doc.get('title', 'Unknown'))
             else:
-                print(f"*** Document not found: {document_id} ***")
+                logger.debug('Document not found: %s', document_id)
                 return JsonResponse({'error': f'Document "{document_id}" not found in database'}, status=404)
         
-        print(f"*** Found document: {doc.get('title', 'Unknown')} ***")
+        logger.debug('Found document: %s', doc.get('title', 'Unknown'))
         
         s3_key = doc.get('attributes', {}).get('s3_key', '')
         from django.conf import settings
@@ -651,7 +693,7 @@ def download_document(request):
 
         # Enhanced S3 key resolution with multiple fallback strategies
         if not s3_key and doc.get('id', '').startswith('s3://'):
-            print(f"*** No 's3_key' attribute found, attempting to parse from Document ID: {doc['id']} ***")
+            logger.debug("No 's3_key' attribute found, attempting to parse from Document ID: %s", doc['id'])
             from urllib.parse import urlparse
             parsed_url = urlparse(doc['id'])
             s3_bucket = parsed_url.netloc
@@ -670,37 +712,24 @@ def download_document(request):
                 doc_title
             ]
             
-            print(f"*** Trying multiple S3 key patterns for: {doc_title} ***")
+            logger.debug('Trying multiple S3 key patterns for: %s', doc_title)
             
             # Test each possible key
-            from .aws_credential_keys.config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-                region_name=AWS_REGION
-            )
+            s3_client = get_client('s3')
             
             for test_key in possible_keys:
                 try:
                     s3_client.head_object(Bucket=s3_bucket, Key=test_key)
                     s3_key = test_key
-                    print(f"*** Found S3 object at: {test_key} ***")
+                    logger.debug('Found S3 object at: %s', test_key)
                     break
                 except:
                     continue
 
-        print(f"*** S3 Bucket: {s3_bucket}, S3 Key: {s3_key} ***")
+        logger.debug('S3 Bucket: %s, S3 Key: %s', s3_bucket, s3_key)
 
         if s3_key and s3_bucket:
-            from .aws_credential_keys.config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION
-
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-                region_name=AWS_REGION
-            )
+            s3_client = get_client('s3')
 
             try:
                 # Check if the object exists before generating a URL
@@ -726,24 +755,24 @@ def download_document(request):
                         file_type=doc.get('attributes', {}).get('file_type', ''),
                         file_size=doc.get('attributes', {}).get('file_size', '')
                     )
-                    print(f"*** TRACKED DOWNLOAD ACTIVITY FOR: {doc['title']} ***")
+                    logger.debug('Tracked download activity for: %s', doc['title'])
                 except Exception as track_error:
-                    print(f"*** FAILED TO TRACK DOWNLOAD ACTIVITY: {track_error} ***")
+                    logger.error('Failed to track download activity: %s', track_error)
 
                 response_data = {
                     'download_url': download_url,
                     'filename': doc['title']
                 }
 
-                print(f"*** Generated download URL successfully ***")
+                logger.info('Generated download URL successfully')
                 return JsonResponse(response_data)
 
             except Exception as s3_error:
-                print(f"*** S3 Error: {str(s3_error)} ***")
+                logger.error('S3 Error: %s', str(s3_error))
                 
                 # Provide alternative: generate downloadable text file
                 if 'NoSuchKey' in str(s3_error) or 'Not Found' in str(s3_error):
-                    print(f"*** S3 file not found, offering text content download ***")
+                    logger.warning('S3 file not found, offering text content download')
                     return _generate_text_download(doc, request)
                 else:
                     return JsonResponse({
@@ -752,11 +781,11 @@ def download_document(request):
                         'suggestion': 'The original file may have been moved or deleted, but the text content is still available.'
                     }, status=500)
         else:
-            print(f"*** No S3 key found for document ***")
+            logger.debug('No S3 key found for document')
             return _generate_text_download(doc, request)
             
     except Exception as e:
-        print(f"*** DOWNLOAD ERROR: {str(e)} ***")
+        logger.error('Download error: %s', str(e))
         return JsonResponse({'error': f'Error retrieving document: {str(e)}'}, status=500)
 
 def _generate_text_download(doc, request=None):
@@ -785,9 +814,9 @@ def _generate_text_download(doc, request=None):
                     file_type='text/plain',
                     file_size='N/A'
                 )
-                print(f"*** TRACKED TEXT DOWNLOAD ACTIVITY FOR: {doc_title} ***")
+                logger.debug('Tracked text download activity for: %s', doc_title)
             except Exception as track_error:
-                print(f"*** FAILED TO TRACK TEXT DOWNLOAD ACTIVITY: {track_error} ***")
+                logger.error('Failed to track text download activity: %s', track_error)
         
         # Create formatted text content
         text_content = f"""Document: {doc_title}
@@ -825,7 +854,7 @@ The original file format may not be available.
         })
         
     except Exception as e:
-        print(f"*** TEXT DOWNLOAD ERROR: {e} ***")
+        logger.error('Text download error: %s', e)
         return JsonResponse({
             'error': 'Could not generate text download. Please use "View Details" to see the content.',
             'suggestion': 'The document content is available for viewing but cannot be downloaded.'
@@ -840,7 +869,7 @@ def get_dynamic_suggestions(request):
         limit = int(request.GET.get('limit', 3))
         user_session = request.GET.get('session', None)
         
-        print(f"*** DYNAMIC SUGGESTIONS REQUEST: limit={limit} ***")
+        logger.debug('Dynamic suggestions request: limit=%s', limit)
         
         # Initialize suggestion engine
         suggestion_engine = SuggestionEngine()
@@ -859,7 +888,7 @@ def get_dynamic_suggestions(request):
         })
         
     except Exception as e:
-        print(f"*** DYNAMIC SUGGESTIONS ERROR: {e} ***")
+        logger.error('Dynamic suggestions error: %s', e)
         return JsonResponse({
             'status': 'error',
             'error': f'Failed to generate suggestions: {str(e)}',
@@ -883,7 +912,7 @@ def track_search_interaction(request):
         if not query:
             return JsonResponse({'error': 'Query is required'}, status=400)
         
-        print(f"*** TRACKING INTERACTION: '{query}' clicked={result_clicked} ***")
+        logger.debug("Tracking interaction: '%s' clicked=%s", query, result_clicked)
         
         # Initialize suggestion engine and track interaction
         suggestion_engine = SuggestionEngine()
@@ -899,7 +928,7 @@ def track_search_interaction(request):
         })
         
     except Exception as e:
-        print(f"*** INTERACTION TRACKING ERROR: {e} ***")
+        logger.error('Interaction tracking error: %s', e)
         return JsonResponse({'error': f'Failed to track interaction: {str(e)}'}, status=500)
 
 @csrf_exempt
@@ -907,7 +936,7 @@ def track_search_interaction(request):
 def get_suggestion_analytics(request):
     """Get analytics about suggestion usage and effectiveness"""
     try:
-        print(f"*** SUGGESTION ANALYTICS REQUEST ***")
+        logger.debug('Suggestion analytics request')
         
         # Initialize suggestion engine
         suggestion_engine = SuggestionEngine()
@@ -922,7 +951,7 @@ def get_suggestion_analytics(request):
         })
         
     except Exception as e:
-        print(f"*** SUGGESTION ANALYTICS ERROR: {e} ***")
+        logger.error('Suggestion analytics error: %s', e)
         return JsonResponse({
             'status': 'error',
             'error': f'Failed to get analytics: {str(e)}'
@@ -933,7 +962,7 @@ def get_suggestion_analytics(request):
 def clear_suggestion_cache(request):
     """Clear suggestion cache for fresh results"""
     try:
-        print(f"*** CLEAR SUGGESTION CACHE REQUEST ***")
+        logger.debug('Clear suggestion cache request')
         
         # Initialize suggestion engine
         suggestion_engine = SuggestionEngine()
@@ -954,7 +983,7 @@ def clear_suggestion_cache(request):
             }, status=500)
         
     except Exception as e:
-        print(f"*** CLEAR CACHE ERROR: {e} ***")
+        logger.error('Clear cache error: %s', e)
         return JsonResponse({
             'status': 'error',
             'error': f'Failed to clear cache: {str(e)}'
@@ -969,7 +998,7 @@ def get_personalized_suggestions(request):
         limit = int(request.GET.get('limit', 3))
         user_session = request.GET.get('session', None)
         
-        print(f"*** PERSONALIZED SUGGESTIONS REQUEST: session={user_session} ***")
+        logger.debug('Personalized suggestions request: session=%s', user_session)
         
         # Initialize suggestion engine
         suggestion_engine = SuggestionEngine()
@@ -989,7 +1018,7 @@ def get_personalized_suggestions(request):
         })
         
     except Exception as e:
-        print(f"*** PERSONALIZED SUGGESTIONS ERROR: {e} ***")
+        logger.error('Personalized suggestions error: %s', e)
         return JsonResponse({
             'status': 'error',
             'error': f'Failed to generate personalized suggestions: {str(e)}',
@@ -1023,7 +1052,7 @@ def track_document_activity(request):
         user_session = get_user_session(request)
         user_ip = get_client_ip(request)
         
-        print(f"*** TRACKING DOCUMENT ACTIVITY: {action_type} - {document_title} ***")
+        logger.debug('Tracking document activity: %s - %s', action_type, document_title)
         
         # Track the activity
         recent_view = RecentView.track_document_activity(
@@ -1045,7 +1074,7 @@ def track_document_activity(request):
         })
         
     except Exception as e:
-        print(f"*** TRACK ACTIVITY ERROR: {e} ***")
+        logger.error('Track activity error: %s', e)
         return JsonResponse({'error': f'Failed to track activity: {str(e)}'}, status=500)
 
 @csrf_exempt
@@ -1054,67 +1083,85 @@ def get_recent_views(request):
     """Get recent document views and downloads for the home page"""
     try:
         # Get parameters
-        limit = int(request.GET.get('limit', 10))
+        limit = min(int(request.GET.get('limit', 10)), 100)
         user_session_only = request.GET.get('user_session_only', 'false').lower() == 'true'
         
-        print(f"*** GET RECENT VIEWS REQUEST: limit={limit}, user_session_only={user_session_only} ***")
+        logger.debug('Get recent views request: limit=%s, user_session_only=%s', limit, user_session_only)
         
         # Get user session if filtering by user
         user_session = None
         if user_session_only:
             user_session = get_user_session(request)
         
-        # Get recent views
-        recent_views = RecentView.get_recent_views(limit=limit, user_session=user_session)
-        
-        # Format for frontend
-        formatted_views = []
-        for view in recent_views:
-            # Determine file icon based on file type
-            file_icon = 'fas fa-file'
-            if view.file_type:
-                if 'pdf' in view.file_type.lower():
-                    file_icon = 'fas fa-file-pdf'
-                elif any(word in view.file_type.lower() for word in ['word', 'doc']):
-                    file_icon = 'fas fa-file-word'
-                elif any(word in view.file_type.lower() for word in ['excel', 'sheet']):
-                    file_icon = 'fas fa-file-excel'
-                elif any(word in view.file_type.lower() for word in ['powerpoint', 'presentation']):
-                    file_icon = 'fas fa-file-powerpoint'
-                elif any(word in view.file_type.lower() for word in ['image', 'png', 'jpg', 'jpeg']):
-                    file_icon = 'fas fa-file-image'
-                elif any(word in view.file_type.lower() for word in ['text', 'txt']):
-                    file_icon = 'fas fa-file-alt'
-            
-            formatted_views.append({
-                'id': str(view.id),
-                'document_id': view.document_id,
-                'document_title': view.document_title,
-                'document_category': view.document_category,
-                'action_type': view.action_type,
-                'timestamp': view.timestamp.isoformat(),
-                'time_ago': view.time_ago,
-                'file_type': view.file_type,
-                'file_size': view.file_size,
-                'file_icon': file_icon
-            })
+        # Materialized feed: one cache read (document_app/activity_feed.py)
+        formatted_views = recent_feed(user_session=user_session, limit=limit)
         
-        return JsonResponse({
+        # Polling clients revalidate with If-None-Match and get a 304 until it changes;
+        # time_ago changes on every poll, so only ids and timestamps are hashed
+        etag = _etag([(view['id'], view['timestamp']) for view in formatted_views], user_session_only)
+        if etag in request.headers.get('If-None-Match', ''):
+            return _not_modified(etag)
+        
+        response = JsonResponse({
             'status': 'success',
             'recent_views': formatted_views,
             'count': len(formatted_views),
             'user_session_filtered': user_session_only,
             'generated_at': datetime.now().isoformat()
         })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
-        print(f"*** GET RECENT VIEWS ERROR: {e} ***")
+        logger.error('Get recent views error: %s', e)
         return JsonResponse({
             'status': 'error',
             'error': f'Failed to get recent views: {str(e)}',
             'recent_views': []
         }, status=500)
 
+def _etag(*content):
+    digest = hashlib.md5(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+def _not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_trending_documents(request):
+    """Documents with the most recent views and downloads (decayed counts)"""
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+        documents = trending_documents(limit=limit)
+        
+        # Weak: scores decay continuously, so only a change in the ranking counts
+        etag = 'W/' + _etag([document['document_id'] for document in documents])
+        if etag in request.headers.get('If-None-Match', ''):
+            return _not_modified(etag)
+        
+        response = JsonResponse({
+            'status': 'success',
+            'documents': documents,
+            'count': len(documents),
+            'generated_at': datetime.now().isoformat()
+        })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+        
+    except Exception as e:
+        logger.error('Trending documents error: %s', e)
+        return JsonResponse({
+            'status': 'error',
+            'error': f'Failed to get trending documents: {str(e)}',
+            'documents': []
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["DELETE"])
 def clear_recent_views(request):
@@ -1122,13 +1169,17 @@ def clear_recent_views(request):
     try:
         user_session_only = request.GET.get('user_session_only', 'false').lower() == 'true'
         
-        print(f"*** CLEAR RECENT VIEWS REQUEST: user_session_only={user_session_only} ***")
+        logger.debug('Clear recent views request: user_session_only=%s', user_session_only)
         
         if user_session_only:
             user_session = get_user_session(request)
-            deleted_count = RecentView.objects.filter(user_session=user_session).delete()[0]
+            deleted_count = activity_writer.discard(lambda view: view.user_session == user_session)
+            deleted_count += delete_in_chunks(RecentView.objects.filter(user_session=user_session))
+            forget_feeds(user_session)
         else:
-            deleted_count = RecentView.objects.all().delete()[0]
+            deleted_count = activity_writer.discard()
+            deleted_count += delete_in_chunks(RecentView.objects.all())
+            forget_feeds()
         
         return JsonResponse({
             'status': 'success',
@@ -1138,7 +1189,7 @@ def clear_recent_views(request):
         })
         
     except Exception as e:
-        print(f"*** CLEAR RECENT VIEWS ERROR: {e} ***")
+        logger.error('Clear recent views error: %s', e)
         return JsonResponse({'error': f'Failed to clear recent views: {str(e)}'}, status=500)
 
 @csrf_exempt
@@ -1148,48 +1199,32 @@ def get_documents_by_category(request):
     try:
         category = request.GET.get('category')
         limit = int(request.GET.get('limit', 50))
+        cursor = request.GET.get('cursor')
         
-        print(f"*** GET DOCUMENTS BY CATEGORY: {category} ***")
-        print(f"*** REQUEST PARAMS: category={category}, limit={limit} ***")
+        logger.debug('Get documents by category: %s', category)
+        logger.debug('Request params: category=%s, limit=%s', category, limit)
         
         # Initialize DynamoDB storage
         dynamodb_storage = DynamoDBStorage()
+        next_cursor = None
         
         if category:
-            # Get documents for specific category from DynamoDB only
-            print(f"*** USING DYNAMODB ONLY FOR CATEGORY: {category} ***")
-            documents = dynamodb_storage.list_documents_by_category(category, limit)
-            print(f"*** DYNAMODB RETURNED {len(documents)} DOCUMENTS FOR CATEGORY ***")
-            
-            # TEMPORARY: Also get all documents to compare
-            all_documents = dynamodb_storage.get_all_documents(limit)
-            print(f"*** DYNAMODB HAS {len(all_documents)} TOTAL DOCUMENTS ***")
-            
-            # If no documents found for category, show what categories exist
-            if len(documents) == 0 and len(all_documents) > 0:
-                print("*** NO DOCUMENTS FOUND FOR CATEGORY, SHOWING ALL AVAILABLE CATEGORIES: ***")
-                categories_found = set()
-                for doc in all_documents:
-                    doc_category = doc.get('category', 'unknown')
-                    categories_found.add(doc_category)
-                    print(f"*** AVAILABLE CATEGORY: {doc_category} ***")
-                
-                # TEMPORARY FIX: Return all documents if category filter fails
-                print(f"*** TEMPORARILY RETURNING ALL DOCUMENTS INSTEAD OF EMPTY RESULT ***")
-                documents = all_documents
+            # One bounded query on the category GSI, newest first
+            documents, next_cursor = dynamodb_storage.query_documents_by_category(category, limit, cursor)
+            logger.debug('DynamoDB returned %s documents for category', len(documents))
         else:
             # Get all documents from DynamoDB only
-            print(f"*** USING DYNAMODB ONLY FOR ALL DOCUMENTS ***")
+            logger.debug('Using DynamoDB only for all documents')
             documents = dynamodb_storage.get_all_documents(limit)
-            print(f"*** DYNAMODB RETURNED {len(documents)} TOTAL DOCUMENTS ***")
+            logger.debug('DynamoDB returned %s total documents', len(documents))
         
         # Format documents for frontend
         formatted_docs = []
-        print(f"*** FORMATTING {len(documents)} DOCUMENTS ***")
+        logger.debug('Formatting %s documents', len(documents))
         
         for i, doc in enumerate(documents):
             try:
-                print(f"*** FORMATTING DOCUMENT {i+1}: {doc.get('DocumentID', 'NO_ID')} ***")
+                logger.debug('Formatting document %s: %s', i+1, doc.get('DocumentID', 'NO_ID'))
                 
                 # Determine file icon based on file type
                 file_icon = 'fas fa-file'
@@ -1215,31 +1250,30 @@ def get_documents_by_category(request):
                 }
                 
                 formatted_docs.append(formatted_doc)
-                print(f"*** FORMATTED DOCUMENT: {formatted_doc['title']} ***")
+                logger.debug('Formatted document: %s', formatted_doc['title'])
                 
             except Exception as format_error:
-                print(f"*** ERROR FORMATTING DOCUMENT {i+1}: {format_error} ***")
-                print(f"*** PROBLEMATIC DOCUMENT: {doc} ***")
+                logger.error('Error formatting document %s: %s', i+1, format_error)
+                logger.debug('Problematic document: %s', doc)
                 continue
         
-        print(f"*** RETURNING {len(formatted_docs)} FORMATTED DOCUMENTS ***")
+        logger.debug('Returning %s formatted documents', len(formatted_docs))
         
         # Create simple, clean response
         final_response = {}
         final_response['documents'] = formatted_docs
         final_response['count'] = len(formatted_docs)  
         final_response['category'] = category
+        final_response['next_cursor'] = next_cursor
         final_response['status'] = 'success'  # Set this absolutely last
         
-        print(f"*** FINAL RESPONSE STATUS: {final_response['status']} ***")
-        print(f"*** FINAL RESPONSE COUNT: {final_response['count']} ***")
+        logger.debug('Final response status: %s', final_response['status'])
+        logger.debug('Final response count: %s', final_response['count'])
         
         return JsonResponse(final_response)
         
     except Exception as e:
-        print(f"*** GET DOCUMENTS BY CATEGORY ERROR: {e} ***")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Get documents by category error: %s', e)
         return JsonResponse({
             'status': 'error',
             'error': str(e),
@@ -1283,16 +1317,14 @@ def simple_test_documents(request):
 def get_folder_structure(request):
     """Get folder structure with document counts for upload page"""
     try:
-        print(f"*** GET FOLDER STRUCTURE REQUEST ***")
+        logger.debug('Get folder structure request')
         
         # Initialize DynamoDB storage
         dynamodb_storage = DynamoDBStorage()
         
-        # Get category statistics
-        category_stats = dynamodb_storage.get_category_stats()
-        
-        # Get all documents to calculate file type stats per category
-        all_documents = dynamodb_storage.get_all_documents(1000)  # Get more for accurate stats
+        # Category x file-type counters (single BatchGetItem)
+        file_type_stats = dynamodb_storage.get_category_file_type_stats()
+        category_stats = {category: sum(buckets.values()) for category, buckets in file_type_stats.items()}
         
         # Calculate detailed stats per category
         folder_structure = {
@@ -1334,19 +1366,13 @@ def get_folder_structure(request):
         }
         
         # Calculate file type distribution
-        for doc in all_documents:
-            category = doc.get('category', 'others')
-            file_type = doc.get('file_type', '').lower()
-            
-            if category in folder_structure:
-                if 'pdf' in file_type:
-                    folder_structure[category]['file_types']['pdf'] += 1
-                elif any(word in file_type for word in ['word', 'doc']):
-                    folder_structure[category]['file_types']['doc'] += 1
-                elif any(word in file_type for word in ['image', 'png', 'jpg', 'jpeg']):
-                    folder_structure[category]['file_types']['image'] += 1
-                else:
-                    folder_structure[category]['file_types']['other'] += 1
+        for category, buckets in file_type_stats.items():
+            if category not in folder_structure:
+                continue
+            file_types = folder_structure[category]['file_types']
+            for bucket, count in buckets.items():
+                # Buckets without their own column are shown as 'other'
+                file_types[bucket if bucket in file_types else 'other'] += count
         
         return JsonResponse({
             'status': 'success',
@@ -1355,7 +1381,7 @@ def get_folder_structure(request):
         })
         
     except Exception as e:
-        print(f"*** GET FOLDER STRUCTURE ERROR: {e} ***")
+        logger.error('Get folder structure error: %s', e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
@@ -1369,7 +1395,7 @@ def delete_document(request):
         if not document_id:
             return JsonResponse({'error': 'document_id is required'}, status=400)
         
-        print(f"*** DELETE DOCUMENT REQUEST: {document_id} ***")
+        logger.debug('Delete document request: %s', document_id)
         
         # Initialize storage
         dynamodb_storage = DynamoDBStorage()
@@ -1403,7 +1429,7 @@ def delete_document(request):
             return JsonResponse({'error': 'Failed to delete document'}, status=500)
         
     except Exception as e:
-        print(f"*** DELETE DOCUMENT ERROR: {e} ***")
+        logger.error('Delete document error: %s', e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
@@ -1411,10 +1437,10 @@ def delete_document(request):
 def debug_storage(request):
     """Debug endpoint to check what's in storage"""
     try:
-        kendra_db = KendraDatabase()
+        search_backend = get_search_backend()
         
         # Try a broad search to see what documents exist
-        documents = kendra_db.search_documents("*", limit=10)
+        documents = search_backend.search_documents("*", limit=10)
         
         return JsonResponse({
             'status': 'success',
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'document_app.middleware.RequestMetricsMiddleware',  # Server-Timing, AWS call accounting
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,31 +54,38 @@ MIDDLEWARE = [
 ]
 
 # Logging configuration
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-        },
-    },
-    'root': {
-        'handlers': ['console'],
-        'level': 'INFO',
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'document_app.middleware': {
-            'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-    },
+# Hot paths log at DEBUG with lazy %-formatting, so at INFO they cost a level check.
+# LOG_LEVELS overrides the level per module (e.g. DEBUG for one engine while
+# investigating), LOG_SAMPLE_RATES keeps a fraction of a logger's DEBUG/INFO
+# records, and LOG_FORMAT = 'json' writes one JSON object per line.
+LOG_LEVEL = 'INFO'
+LOG_FORMAT = 'plain'
+LOG_LEVELS = {
+    'botocore': 'WARNING',
+    'urllib3': 'WARNING',
 }
+LOG_SAMPLE_RATES = {}
+
+from document_app.logging_utils import build_logging_config  # noqa: E402
+
+LOGGING = build_logging_config(LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_SAMPLE_RATES)
+
+# Warm each worker up (imports, AWS clients, search indexes) before it serves
+# requests; see document_app/startup.py. Timings are logged and exported.
+STARTUP_WARM_UP = True
+# document_project/wsgi.py warms up when it is imported. Set this to False
+# when the application is preloaded (gunicorn --preload) and warm_up() is
+# called from a post_fork hook, so the master process starts no threads.
+STARTUP_WARM_UP_ON_IMPORT = True
+
+# Requests slower than this are logged at WARNING by RequestMetricsMiddleware
+REQUEST_LATENCY_BUDGET_MS = 2000
+
+# /api/metrics/ is served to staff users, to requests from these addresses or
+# networks (REMOTE_ADDR, so list the scraper, not a proxy in front of the app),
+# and to requests with 'Authorization: Bearer <METRICS_TOKEN>' when it is set.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = None
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
@@ -115,6 +123,42 @@ DATABASES = {
 }
 
 
+# Identical concurrent AWS calls share one upstream request (document_app/singleflight.py).
+# With AWS_COALESCE_SHARED the coalescing spans worker processes through the cache
+# below, and a finished result is reused for AWS_COALESCE_RESULT_TTL seconds.
+AWS_COALESCE_OPERATIONS = {
+    'bedrock-runtime': ['invoke_model'],
+    'kendra': ['query', 'retrieve'],
+}
+AWS_COALESCE_SHARED = True
+AWS_COALESCE_RESULT_TTL = 5
+
+# Cache shared by all worker processes (suggestions, document analysis, search
+# history; see document_app/cache.py). File-based works for every worker on one
+# host; set CACHE_REDIS_URL (e.g. 'redis://cache.internal:6379/1', needs the
+# redis package) when the app runs on several hosts. Cross-process leases and
+# counters are only atomic on Redis; on files they are best-effort.
+CACHE_REDIS_URL = None
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'apadocs',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'django_cache',
+            'KEY_PREFIX': 'apadocs',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -198,3 +242,132 @@ except ImportError:
 AWS_DEFAULT_REGION = 'ap-southeast-1'  # Singapore (your current region)
 AWS_TEXTRACT_REGION = 'us-east-1'  # US East (Textract availability)
 AWS_BEDROCK_REGION = 'us-east-1'  # US East (Bedrock availability)
+
+# DynamoDB counter table (category x file-type document counts)
+DYNAMODB_STATS_TABLE = 'DocumentStats'
+
+# GSI on Documents (partition: category, sort: upload_date) for category folders
+DYNAMODB_CATEGORY_INDEX = 'category-upload_date-index'
+
+# Parallel scan segments (threads) used for full-table stats and exports
+DYNAMODB_SCAN_SEGMENTS = 4
+
+# In-process metadata search index: rescanned in the background when the corpus
+# version shows documents ingested by other worker processes, at most once per
+# METADATA_INDEX_REFRESH_SECONDS; a failed build is retried after
+# METADATA_INDEX_RETRY_SECONDS (searches use the scan fallback meanwhile)
+METADATA_INDEX_REFRESH_SECONDS = 60
+METADATA_INDEX_RETRY_SECONDS = 60
+
+# Minimum blended relevance (0-1) for AI search results
+AI_SEARCH_SIMILARITY_THRESHOLD = 0.6
+
+# Local semantic search tier (document chunk embeddings on disk)
+VECTOR_INDEX_DIR = BASE_DIR / 'vector_index'
+EMBEDDING_BACKEND = 'hashing'  # 'hashing' (local, no AWS calls) or 'bedrock' (Titan embeddings)
+EMBEDDING_DIM = 512
+VECTOR_INDEX_ANN_THRESHOLD = 20000  # Rows before switching from exact to IVF search
+# 'off', 'fallback' (when Kendra finds nothing), 'merge' or 'primary'
+SEMANTIC_SEARCH_MODE = 'fallback'
+
+# Chatbot intent: the local rule classifier (document_app/aws_chatbot/intent_classifier.py)
+# decides without a Bedrock call when its best intent has at least this share of
+# the matched weight and this absolute score
+CHATBOT_INTENT_CONFIDENCE = 0.75
+CHATBOT_INTENT_MIN_SCORE = 1.0
+
+# Chatbot conversations are kept server-side (document_app/aws_chatbot/conversation.py):
+# the client sends a conversation_id, follow-ups reuse the document's full text
+# (cached per document) and a history trimmed to about this many tokens.
+CHATBOT_CONVERSATION_TTL = 7200
+CHATBOT_DOCUMENT_TEXT_TTL = 3600
+CHATBOT_HISTORY_TOKEN_BUDGET = 600
+
+# Follow-up prompts (document_app/aws_chatbot/prompt_context.py): documents longer
+# than CHATBOT_DOCUMENT_CONTEXT_CHARS are sent as a locally computed extractive
+# summary of that size, plus up to CHATBOT_RELEVANT_PASSAGE_CHARS of sentences
+# related to the question. The instructions and document form a stable prefix,
+# marked for Bedrock prompt caching on the model families listed here once it
+# reaches the family's minimum cacheable length in tokens (about 3,700 characters
+# of document text for Nova, so raise CHATBOT_DOCUMENT_CONTEXT_CHARS towards its
+# 4000-character cap to have summarized documents cached).
+CHATBOT_DOCUMENT_CONTEXT_CHARS = 2500
+CHATBOT_RELEVANT_PASSAGE_CHARS = 800
+BEDROCK_PROMPT_CACHING = True
+BEDROCK_PROMPT_CACHE_MIN_TOKENS = {
+    'amazon.nova-micro': 1000,
+    'amazon.nova-lite': 1000,
+    'amazon.nova-pro': 1000,
+    'amazon.nova-premier': 1000,
+}
+
+# Bedrock responses for fixed, low-temperature prompt templates are cached in the
+# shared cache (document_app/llm_cache.py), keyed by model, template, normalized
+# inputs and inference parameters. Only the templates listed here are cached,
+# for the given number of seconds; change a template's id when its prompt changes.
+LLM_CACHE_TEMPLATES = {
+    'chatbot.intent': 86400,
+    'chatbot.search_terms': 86400,
+    'chatbot.select_result': 3600,
+    'chatbot.query_suggestions': 21600,
+    'search.search_terms': 86400,
+}
+LLM_CACHE_MAX_ENTRY_BYTES = 16384
+LLM_CACHE_MAX_ENTRIES = 10000
+
+# Chatbot search answers and AI search results are reused for near-duplicate
+# queries (document_app/query_cache.py): same content terms after stopwords and
+# stemming, or an estimated term similarity of at least QUERY_CACHE_SIMILARITY
+# with one of the QUERY_CACHE_TRACKED most recently answered queries. Tune the
+# threshold with the query_cache_similarity_total metric.
+QUERY_CACHE_TTL = 3600
+QUERY_CACHE_SIMILARITY = 0.75
+QUERY_CACHE_TRACKED = 500
+
+# Search suggestions are served from a precomputed pool (refresh_suggestions command).
+# A read schedules a background refresh once the pool is older than
+# SUGGESTION_REFRESH_SECONDS or the corpus changed; ingestion schedules one after
+# SUGGESTION_REFRESH_DEBOUNCE seconds, folding bursts of uploads together.
+SUGGESTION_POOL_SIZE = 12
+SUGGESTION_POOL_TTL = 86400
+SUGGESTION_REFRESH_SECONDS = 1500
+SUGGESTION_REFRESH_DEBOUNCE = 30
+SUGGESTION_REFRESH_ON_INGEST = True
+
+# Document view/download tracking (RecentView) is queued in memory and written
+# with bulk_create by a background thread. With ACTIVITY_QUEUE_MAX rows waiting,
+# 'drop' discards new activity and 'block' waits briefly for the writer first.
+ACTIVITY_BATCH_SIZE = 100
+ACTIVITY_FLUSH_SECONDS = 2
+ACTIVITY_QUEUE_MAX = 5000
+ACTIVITY_QUEUE_FULL = 'drop'
+
+# Materialized home-page activity (document_app/activity_feed.py): the latest
+# ACTIVITY_FEED_SIZE views per session and overall, and the TRENDING_SIZE most
+# viewed/downloaded documents, with counts halving every TRENDING_HALF_LIFE_HOURS
+ACTIVITY_FEED_SIZE = 20
+TRENDING_SIZE = 10
+TRENDING_HALF_LIFE_HOURS = 24
+
+# RecentView rows older than this are rolled into DocumentActivityDaily and deleted,
+# RECENT_VIEW_PRUNE_CHUNK rows per transaction (prune_recent_views command)
+RECENT_VIEW_RETENTION_DAYS = 30
+RECENT_VIEW_PRUNE_CHUNK = 1000
+
+# Search interactions are buffered per process and written to the SearchInteraction
+# log in batches (document_app/interactions.py), then rolled up into totals and
+# the INTERACTION_TOP_K most popular queries for the analytics API.
+INTERACTION_BATCH_SIZE = 200
+INTERACTION_FLUSH_SECONDS = 5
+INTERACTION_TOP_K = 200
+
+# Document search backend: Kendra, or the local SQLite FTS5 stand-in
+# 'document_app.aws_document_pipeline.sqlite_search.SQLiteSearchBackend'
+SEARCH_BACKEND = 'document_app.aws_document_pipeline.kendra_database.KendraDatabase'
+SEARCH_SQLITE_PATH = BASE_DIR / 'search_index.sqlite3'
+
+# In-process fakes for Bedrock, S3 and DynamoDB (document_app.aws_stubs), for
+# offline development and load testing. Pair with the SQLite SEARCH_BACKEND.
+AWS_STUBS = False
+AWS_STUB_S3_ROOT = BASE_DIR / 'stub_s3'
+AWS_STUB_LATENCY = {}  # Seconds per call by service, e.g. {'bedrock-runtime': 0.8}
@@ -8,9 +8,22 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
-from django.core.wsgi import get_wsgi_application
+_boot_started = time.perf_counter()
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'document_project.settings')
 
 application = get_wsgi_application()
+
+# Import the views, create the AWS clients and start the metadata search index
+# before the first request needs them (document_app/startup.py). A preloaded
+# application warms up from a post_fork hook instead, after the fork.
+from django.conf import settings  # noqa: E402
+
+from document_app.startup import warm_up  # noqa: E402
+
+if getattr(settings, 'STARTUP_WARM_UP_ON_IMPORT', True):
+    warm_up(boot_started=_boot_started)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""The in-process AWS fakes, installed through document_app.aws_clients"""
+import io
+import json
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app import aws_clients
+from document_app.aws_document_pipeline.dynamodb_storage import DynamoDBStorage
+from document_app.aws_stubs import FakeBedrockRuntime, FakeDynamoDB, FakeS3
+
+
+def test_aws_stubs_setting_installs_the_fakes():
+    aws_clients.reset()
+    assert isinstance(aws_clients.get_client('s3'), FakeS3)
+    assert isinstance(aws_clients.get_resource('dynamodb'), FakeDynamoDB)
+    bedrock = aws_clients.get_client('bedrock-runtime')
+    assert isinstance(getattr(bedrock, 'client', bedrock), FakeBedrockRuntime)
+
+
+def test_s3_fake_round_trip():
+    aws_clients.reset()
+    s3 = aws_clients.get_client('s3')
+    s3.upload_fileobj(io.BytesIO(b'forklift checklist'), 'benchmark-documents', 'documents/manuals/checklist.txt')
+    body = s3.get_object(Bucket='benchmark-documents', Key='documents/manuals/checklist.txt')['Body'].read()
+    assert body == b'forklift checklist'
+    assert s3.calls['PutObject'] == 1 and s3.calls['GetObject'] == 1
+
+
+def test_installed_bedrock_fake_answers_nova_requests():
+    aws_clients.reset()
+    fake = FakeBedrockRuntime(responses=[(r'forklift', 'Inspect the forks daily.')])
+    aws_clients.install('bedrock-runtime', client=fake)
+    body = {'messages': [{'role': 'user', 'content': [{'text': 'How often is the forklift inspected?'}]}],
+            'inferenceConfig': {'maxTokens': 100, 'temperature': 0.0}}
+    response = aws_clients.get_client('bedrock-runtime').invoke_model(
+        modelId='amazon.nova-lite-v1:0', body=json.dumps(body))
+    result = json.loads(response['body'].read())
+    assert result['output']['message']['content'][0]['text'] == 'Inspect the forks daily.'
+    assert fake.calls['InvokeModel'] == 1
+    aws_clients.reset()
+
+
+def test_dynamodb_storage_runs_on_the_fake():
+    aws_clients.reset()
+    storage = DynamoDBStorage()
+    assert storage.table_accessible
+    assert storage.store_document('stub-doc-1', 'forklift_manual.pdf', 'Forklift inspection steps.', 'manuals',
+                                  ['forklift'], 'documents/manuals/forklift_manual.pdf', 1024, 'pdf', 0.9)
+    document = storage.get_document_by_id('stub-doc-1')
+    assert document['filename'] == 'forklift_manual.pdf'
+    assert document['category'] == 'manuals'
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Bounded queue, drops and requeues of the background batch writer"""
+import os
+import sys
+
+import django
+from django.core.management import call_command
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app.batch_writer import BatchWriter
+from document_app.models import SearchInteraction
+
+
+def writer(model='document_app.SearchInteraction', **options):
+    # A long flush interval keeps the background thread out of the way
+    return BatchWriter(model, 'test', batch_size=1000, flush_seconds=3600, **options)
+
+
+def test_full_queue_drops_new_rows():
+    queue = writer(max_pending=2, when_full='drop')
+    assert queue.add('first') and queue.add('second')
+    assert queue.add('third') is False
+    assert queue.pending() == ['first', 'second']
+    assert queue._dropped == 1
+    queue.discard()
+
+
+def test_failed_write_requeues_rows_ahead_of_new_ones():
+    queue = writer(model='document_app.NoSuchModel', max_pending=3)
+    queue.add('a')
+    queue.add('b')
+    assert queue.flush() == 0
+    assert queue.pending() == ['a', 'b']
+    queue.add('c')
+    assert queue.pending() == ['a', 'b', 'c']
+    queue.discard()
+
+
+def test_requeue_keeps_the_newest_rows_that_fit():
+    queue = writer(model='document_app.NoSuchModel', max_pending=3)
+    for row in 'abc':
+        queue.add(row)
+    rows = list(queue.pending())
+    queue.discard()
+    queue.add('d')
+    queue.add('e')
+    queue._requeue(rows)
+    assert queue.pending() == ['c', 'd', 'e']
+    assert queue._dropped == 2
+    queue.discard()
+
+
+def test_batch_that_keeps_failing_is_dropped_after_max_attempts():
+    queue = writer(model='document_app.NoSuchModel', max_attempts=2)
+    queue.add('a')
+    assert queue.flush() == 0
+    assert queue.pending() == ['a']
+    assert queue.flush() == 0
+    assert queue.pending() == []
+    queue.discard()
+
+
+def test_rows_are_isolated_so_only_the_bad_one_is_dropped():
+    call_command('migrate', verbosity=0)
+    SearchInteraction.objects.filter(user_session='isolate').delete()
+    queue = writer(max_attempts=1)
+    queue.add(SearchInteraction(query='good', normalized_query='good', user_session='isolate'))
+    queue.add(SearchInteraction(query=None, normalized_query='bad', user_session='isolate'))
+    assert queue.flush() == 1
+    assert queue.pending() == []
+    assert list(SearchInteraction.objects.filter(user_session='isolate').values_list('query', flat=True)) == ['good']
+    queue.discard()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""Opaque pagination cursors for the DynamoDB category listing"""
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app.aws_document_pipeline.dynamodb_storage import _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    position = {'DocumentID': 'doc-123', 'category': 'manuals', 'upload_date': '2024-06-07T10:00:00'}
+    cursor = _encode_cursor(position)
+    assert isinstance(cursor, str)
+    assert all(ch.isalnum() or ch in '-_=' for ch in cursor)
+    assert _decode_cursor(cursor) == position
+
+
+def test_no_position_means_no_cursor():
+    assert _encode_cursor(None) is None
+    assert _encode_cursor({}) is None
+    assert _decode_cursor(None) is None
+    assert _decode_cursor('') is None
+
+
+def test_invalid_cursor_restarts_from_first_page():
+    assert _decode_cursor('not a cursor!') is None
+    assert _decode_cursor('bm90IGpzb24') is None  # base64 of 'not json'
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Phrase scoring and word-boundary matching of the chatbot intent classifiers"""
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app.aws_chatbot.intent_classifier import CONVERSATION, FOLLOW_UP, IntentClassifier
+
+classifier = IntentClassifier({
+    'search': {'find': 1.0, 'look for': 1.0, 'get': 0.3},
+    'analyze': {'summarize': 1.0, 'explain': 0.6},
+})
+
+
+def test_scores_sum_phrase_weights_per_intent():
+    assert classifier.scores('find and get the manual') == {'search': 1.3}
+    assert classifier.scores('explain, then find it') == {'analyze': 0.6, 'search': 1.0}
+
+
+def test_repeated_phrase_counts_once():
+    assert classifier.scores('find find find') == {'search': 1.0}
+
+
+def test_longer_phrase_also_counts_its_prefix_phrase():
+    reading = IntentClassifier({'read_aloud': {'read this': 1.0}, 'open': {'read': 0.5}})
+    assert reading.phrases('please read this') == ['read this']
+    assert reading.scores('please read this') == {'read_aloud': 1.0, 'open': 0.5}
+    assert reading.scores('read it') == {'open': 0.5}
+
+
+def test_phrases_match_on_word_boundaries():
+    assert classifier.scores('findings of the summarized report') == {}
+    assert not CONVERSATION.matches('is this the latest version?', 'greeting')
+    assert CONVERSATION.matches('hi there', 'greeting')
+    assert not FOLLOW_UP.matches('itinerary', 'follow_up')
+
+
+def test_classify_reports_share_of_total_score():
+    intent, confidence, score = classifier.classify('summarize and explain, then find it')
+    assert intent == 'analyze'
+    assert score == 1.6
+    assert abs(confidence - 1.6 / 2.6) < 1e-9
+    assert classifier.classify('nothing relevant') == (None, 0.0, 0.0)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
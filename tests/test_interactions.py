@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Space-Saving top-K counts used for the popular-query rollup"""
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app.interactions import SpaceSaving
+
+
+def test_counts_exactly_within_capacity():
+    top = SpaceSaving(3)
+    for item in ['a', 'b', 'a', 'c', 'a', 'b']:
+        top.add(item)
+    assert top.top(3) == [('a', 3), ('b', 2), ('c', 1)]
+    assert all(error == 0 for _, error in top.counters.values())
+
+
+def test_new_item_replaces_smallest_and_inherits_its_count():
+    top = SpaceSaving(2)
+    for item in ['a', 'a', 'a', 'b', 'c']:
+        top.add(item)
+    assert set(top.counters) == {'a', 'c'}
+    assert top.counters['c'] == [2, 1]
+
+
+def test_frequent_items_survive_a_long_tail():
+    top = SpaceSaving(10)
+    for i in range(1000):
+        top.add('popular' if i % 4 == 0 else f'rare-{i}')
+    item, count = top.top(1)[0]
+    assert item == 'popular'
+    count_error = top.counters['popular'][1]
+    assert count - count_error <= 250 <= count
+
+
+def test_restores_from_stored_counters():
+    top = SpaceSaving(2, {'a': (5, 0), 'b': (2, 1)})
+    top.add('b', 3)
+    assert top.top(2) == [('a', 5), ('b', 5)]
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
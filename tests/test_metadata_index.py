@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Rebuilds of the in-process metadata index"""
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from unittest import mock
+
+from document_app.aws_document_pipeline.metadata_index import MetadataIndex
+
+
+def document(document_id, filename, **fields):
+    return {'DocumentID': document_id, 'filename': filename, 'category': 'manuals', **fields}
+
+
+def test_rebuild_replays_changes_made_during_the_scan():
+    index = MetadataIndex()
+    index.add(document('old', 'old_forklift_manual.pdf'))
+
+    def scan():
+        yield document('a', 'forklift_manual.pdf')
+        # Signals handled while the scan is still running
+        index.add(document('new', 'forklift_checklist.pdf'))
+        index.remove('a')
+        yield document('b', 'crane_manual.pdf')
+
+    index.rebuild(scan(), version=lambda: 41)
+
+    assert {doc['DocumentID'] for doc in index.search('*')} == {'new', 'b'}
+    assert [doc['DocumentID'] for doc in index.search('forklift')] == ['new']
+    assert index.is_built
+    assert index.version == 41
+    assert index._local_changes == 2
+    assert index._journal is None
+
+
+def test_failed_scan_keeps_previous_contents():
+    index = MetadataIndex()
+    index.rebuild([document('a', 'forklift_manual.pdf')])
+
+    def scan():
+        yield document('b', 'crane_manual.pdf')
+        raise RuntimeError('scan interrupted')
+
+    try:
+        index.rebuild(scan())
+    except RuntimeError:
+        pass
+    assert [doc['DocumentID'] for doc in index.search('*')] == ['a']
+    assert index._journal is None
+
+
+
+def test_lost_local_version_bump_does_not_hide_later_remote_changes():
+    index = MetadataIndex()
+    index.rebuild([document('a', 'forklift_manual.pdf')], version=lambda: 10)
+    index.add(document('b', 'crane_manual.pdf'))
+    index.note_local_change()  # Its corpus version bump was lost: the counter stays at 10
+    with mock.patch('document_app.aws_document_pipeline.metadata_index.corpus_version', return_value=10):
+        assert not index.is_stale()
+    # Another process stores a document
+    with mock.patch('document_app.aws_document_pipeline.metadata_index.corpus_version', return_value=11):
+        assert index.is_stale()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Extractive summaries and related passages for follow-up prompts"""
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from django.test import override_settings
+
+from document_app.aws_chatbot.prompt_context import (MAX_DOCUMENT_CONTEXT_CHARS, PromptContext, _sentences,
+                                                     extractive_summary, relevant_passages)
+
+TEXT = ' '.join([
+    'Forklift operators must inspect the forklift before every shift.',
+    'The canteen opens at eight in the morning.',
+    'A forklift inspection covers brakes, forks, tyres and the hydraulic system.',
+    'Parking is available behind the main building.',
+    'Report any forklift defect to the shift supervisor before operating it.',
+    'Visitors sign in at reception.',
+])
+
+
+def test_summary_keeps_document_order_within_budget():
+    summary = extractive_summary(TEXT, 200)
+    assert len(summary) <= 200
+    lines = summary.split('\n')
+    positions = [_sentences(TEXT).index(line) for line in lines]
+    assert positions == sorted(positions)
+
+
+def test_summary_prefers_sentences_about_the_main_topic():
+    summary = extractive_summary(TEXT, 200)
+    assert 'forklift inspection covers' in summary
+    assert 'Visitors sign in' not in summary
+
+
+def test_summary_of_text_without_sentences_is_truncated():
+    assert extractive_summary('forklift', 100) == 'forklift'
+    assert extractive_summary('x' * 500, 100) == 'x' * 100
+
+
+def test_relevant_passages_match_the_question():
+    passages = relevant_passages(TEXT, 'Where do I report a defect?', 300)
+    assert passages == 'Report any forklift defect to the shift supervisor before operating it.'
+    assert relevant_passages(TEXT, 'Where do I report a defect?', 300, exclude=passages) == ''
+
+
+
+def long_document(sentences):
+    return ' '.join(f'Section {i} covers forklift inspection step {i} in detail.' for i in range(sentences))
+
+
+def test_short_prefix_gets_no_cache_point():
+    context = PromptContext('Doc', TEXT, 'amazon.nova-lite-v1:0')
+    assert not context.cacheable
+    assert len(context.request('What about brakes?', 'Answer.')['system']) == 1
+
+
+def test_summary_is_not_grown_for_prompt_caching():
+    context = PromptContext('Doc', long_document(400), 'amazon.nova-lite-v1:0')
+    assert context.summarized
+    assert len(context.document_text) <= 2500
+    assert not context.cacheable
+
+
+def test_prefix_long_enough_on_its_own_gets_a_cache_point():
+    with override_settings(CHATBOT_DOCUMENT_CONTEXT_CHARS=10000):
+        context = PromptContext('Doc', long_document(400), 'amazon.nova-lite-v1:0')
+        assert len(context.document_text) <= MAX_DOCUMENT_CONTEXT_CHARS
+        assert context.cacheable
+        system = context.request('What about brakes?', 'Answer.')['system']
+        assert system[-1] == {'cachePoint': {'type': 'default'}}
+        assert not PromptContext('Doc', long_document(400), 'meta.llama3-8b').cacheable
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Query normalization and near-duplicate matching used by QueryCache"""
+import os
+import sys
+
+import django
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app.aws_chatbot.chatbot_engine import ChatbotEngine
+from document_app.query_cache import minhash, query_terms
+
+
+def similarity(a, b):
+    return float((minhash(query_terms(a)) == minhash(query_terms(b))).mean())
+
+
+def test_paraphrases_share_terms():
+    assert query_terms('find safety manual') == query_terms('Safety manuals, please')
+    assert query_terms('search for the inspection procedures') == ['inspection', 'procedur']
+
+
+def test_acronyms_are_kept():
+    assert query_terms('HR policy') == ['hr', 'policy']
+    assert query_terms('5S audit') == ['5s', 'audit']
+
+
+def test_queries_differing_in_an_acronym_do_not_collide():
+    keys = {' '.join(query_terms(query)) for query in ('HR policy', 'IT policy', 'policy')}
+    assert len(keys) == 3
+    assert similarity('HR policy', 'IT policy') < 0.75
+
+
+def test_minhash_estimates_jaccard_similarity():
+    assert similarity('forklift safety training', 'safety training forklift') == 1.0
+    assert similarity('forklift safety training', 'quarterly revenue report') < 0.2
+    estimate = similarity('forklift safety training records', 'forklift safety training schedule')
+    assert 0.4 <= estimate <= 0.8  # true Jaccard 3/5
+
+
+
+def test_connectives_are_dropped_from_cache_keys_only():
+    assert query_terms('policy on travel and leave') == ['leav', 'policy', 'travel']
+    # Chatbot search terms keep their connectives
+    assert ChatbotEngine().extract_search_terms('find the policy on travel and leave') == 'policy travel and leave'
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Searches of the local embedding index"""
+import os
+import sys
+import tempfile
+import threading
+
+import django
+import numpy as np
+
+# The project root, for document_app and benchmarks.settings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from document_app.aws_ai_search.embeddings import HashingEmbedder
+from document_app.aws_ai_search.vector_index import VectorIndex
+
+
+class LockCheckingEmbedder(HashingEmbedder):
+    """Records whether another thread could take the index lock during embed()"""
+
+    index = None
+    lock_free = None
+
+    def embed(self, texts):
+        if self.index is not None:
+            def probe():
+                acquired = self.index._lock.acquire(timeout=1)
+                if acquired:
+                    self.index._lock.release()
+                self.lock_free = acquired
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+        return super().embed(texts)
+
+
+def make_index(embedder=None, **options):
+    index = VectorIndex(tempfile.mkdtemp(prefix='vector-index-test-'), embedder or HashingEmbedder(), **options)
+    index.add_document('forklift', 'Forklift manual', 'Inspect the forklift brakes and forks before every shift.')
+    index.add_document('crane', 'Crane manual', 'Crane operators check the hoist cables every week.')
+    return index
+
+
+def test_search_finds_the_matching_document():
+    results = make_index().search('forklift brakes', min_score=0.0)
+    assert results[0]['document_id'] == 'forklift'
+
+
+def test_query_is_embedded_outside_the_index_lock():
+    embedder = LockCheckingEmbedder()
+    index = make_index(embedder)
+    embedder.index = index
+    index.search('forklift brakes')
+    assert embedder.lock_free is True
+
+
+def test_ann_search_without_candidates_returns_nothing():
+    index = make_index(ann_threshold=1)
+    index.build_ann()
+    assert index._ivf is not None
+    index._ivf_candidates = lambda query_vector, rows: np.empty(0, dtype=np.int64)
+    assert index.search('forklift brakes', min_score=0.0) == []
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f'{name}: ok')